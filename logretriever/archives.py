@@ -0,0 +1,84 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+""" Reading of compressed (rotated) logs.
+
+Logs compressed with gzip, bzip2 or xz are recognized by file name extension
+and decompressed on the fly in large blocks, nothing is written to disk.
+Compressed logs never grow, thus they are not followed, but can be replayed
+(see replay.py).
+"""
+
+import bz2
+import gzip
+import io
+import os
+# NOTE(aovchinnikov): there is no lzma module in Py2 standard library.
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
+
+# NOTE(aovchinnikov): decompressors are given file names rather than file
+# objects, since they do not close file objects passed in.
+decompressors = {'.gz': lambda fname: gzip.GzipFile(fname, 'rb'),
+                 '.bz2': bz2.BZ2File}
+if lzma is not None:
+    decompressors['.xz'] = lzma.LZMAFile
+
+
+def is_archive(fname):
+    """ Tells whether a file is a compressed log judging by its name."""
+    return os.path.splitext(fname)[1] in decompressors
+
+
+def open_log(fname, buffer_size):
+    """ Opens a plain or a compressed log for reading in binary mode.
+
+    :param fname: file name.
+    :param buffer_size: size of reads from disk for plain logs, compressed
+        ones are read by their decompressors.
+    :return: file-like object yielding decompressed data.
+    :raises: ValueError for xz archives when lzma is not available.
+    """
+    ext = os.path.splitext(fname)[1]
+    if ext == '.xz' and lzma is None:
+        raise ValueError("xz compressed logs are not supported: %s" % fname)
+    if ext not in decompressors:
+        return io.open(fname, 'rb', buffering=buffer_size)
+    return decompressors[ext](fname)
+
+
+def read_lines(f, buffer_size, limit=None):
+    """ Reads a file in chunks of complete lines.
+
+    An incomplete line at the end of the data is handed out as well.
+    :param f: binary file-like object.
+    :param buffer_size: maximum number of bytes to read at once. Chunks may
+        be larger if lines are.
+    :param limit: maximum number of bytes to read, None to read up to EOF.
+    :return: generator of bytes objects.
+    """
+    rest = b''
+    while limit is None or limit > 0:
+        size = buffer_size if limit is None else min(buffer_size, limit)
+        data = f.read(size)
+        if not data:
+            break
+        if limit is not None:
+            limit -= len(data)
+        data = rest + data
+        cut = data.rfind(b'\n') + 1
+        rest = data[cut:]
+        if cut:
+            yield data[:cut]
+    if rest:
+        yield rest
@@ -11,6 +11,12 @@
 from .simple_collector import SimpleCollector
 from .section_collector import SectionCollector
 from .user_collector import UserCollector
+from .distinct_collector import DistinctCollector
+from .size_collector import SizeCollector
+from .status_collector import StatusCollector
+from .abuse_collector import AbuseCollector
 
 # NOTE(aovchinnikov): to simplify things add new collectors to __all__:
-__all__ = ['SimpleCollector', 'SectionCollector', 'UserCollector']
+__all__ = ['SimpleCollector', 'SectionCollector', 'UserCollector',
+           'DistinctCollector', 'SizeCollector', 'StatusCollector',
+           'AbuseCollector']
@@ -0,0 +1,148 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+import collections
+
+from .. import columns
+from .. import utils
+from .base import BaseCollector
+
+
+class AbuseCollector(BaseCollector):
+    """ Collector which alerts on clients exceeding a request rate.
+
+    Every client IP gets a token bucket holding up to ip_burst tokens and
+    refilled with ip_rate_limit tokens per second; every request takes a
+    token and a client whose bucket runs dry is abusive. Buckets are refilled
+    lazily, i.e. when the client shows up again, and kept in a table of
+    limited size: the least recently seen client is forgotten first, thus
+    scanning through many addresses does not make the table grow. Requests
+    are applied to buckets once a second, on tick.
+
+    Alarms are coalesced: a single alarm per tick lists clients which have
+    become abusive, another one lists clients which have not been abusive
+    for alarm_interval seconds.
+    """
+
+    config_section = 'AbuseCollector'
+    required_fields = frozenset(['ip'])
+    state_attributes = ('pending', 'buckets', 'abusive', 'ticks')
+    stat_msg = "Abusive clients: %d%s"
+    lh_msg = ("%(time)s: WARNING! %(n)d clients exceed %(rate)g requests per"
+              " second: %(ips)s.")
+    hl_msg = "%(time)s: INFO: %(n)d clients are back to normal: %(ips)s."
+    ips_shown = 5
+
+    def __init__(self, config):
+        super(AbuseCollector, self).__init__(config)
+        self.alarm_period = config.getint(self.config_section,
+                                          'alarm_interval')
+        self.rate = utils.get_option(config, self.config_section,
+                                     'ip_rate_limit', 10.0)
+        self.burst = utils.get_option(config, self.config_section,
+                                      'ip_burst', self.rate)
+        self.table_size = utils.get_option(config, self.config_section,
+                                           'ip_table_size', 10000)
+        self.pending = collections.Counter()  # Requests since last tick.
+        # IP -> [tokens, time of last refill], least recently seen first.
+        self.buckets = collections.OrderedDict()
+        # Abusive IP -> time it was last seen abusive, oldest first.
+        self.abusive = collections.OrderedDict()
+        self.ticks = 0
+
+    def process_line(self, line):
+        self.pending[line.ip] += 1
+
+    def process_batch(self, lines):
+        if isinstance(lines, columns.LogBatch):
+            self.pending.update(lines.column('ip').counts())
+        else:
+            self.pending.update(x.ip for x in lines)
+
+    def take_partial(self):
+        partial, self.pending = self.pending, collections.Counter()
+        return partial
+
+    def merge_partial(self, partial):
+        self.pending.update(partial)
+
+    def reconfigure(self, config):
+        fresh = AbuseCollector(config)
+        self._adopt(fresh, ('alarm_period', 'rate', 'burst', 'table_size'))
+        while len(self.buckets) > self.table_size:
+            self.buckets.popitem(last=False)
+        return True
+
+    def consume(self, ip, count, timestamp):
+        """ Takes tokens from the client's bucket.
+
+        :return: True if the bucket has run dry, False otherwise.
+        """
+        bucket = self.buckets.pop(ip, None)
+        if bucket is None:
+            bucket = [self.burst, timestamp]
+            if len(self.buckets) >= self.table_size:
+                self.buckets.popitem(last=False)
+        else:
+            bucket[0] = min(self.burst,
+                            bucket[0] + (timestamp - bucket[1]) * self.rate)
+            bucket[1] = timestamp
+        bucket[0] -= count
+        dry = bucket[0] < 0
+        if dry:
+            # Requests over the limit would have been rejected, they do not
+            # make the client a debtor.
+            bucket[0] = 0
+        # NOTE(aovchinnikov): re-inserting moves the IP to the end, which
+        # OrderedDict.move_to_end() does not do on Py2.
+        self.buckets[ip] = bucket
+        return dry
+
+    def tick(self):
+        self.ticks += 1
+        timestamp = self.clock()
+        fresh = []
+        for ip, count in self.pending.items():
+            if not self.consume(ip, count, timestamp):
+                continue
+            if self.abusive.pop(ip, None) is None:
+                fresh.append(ip)
+            self.abusive[ip] = self.ticks
+        self.pending = collections.Counter()
+        while len(self.abusive) > self.table_size:
+            self.abusive.popitem(last=False)
+        self.alarm(fresh)
+
+    def _format(self, ips):
+        shown = ', '.join(ips[:self.ips_shown])
+        if len(ips) > self.ips_shown:
+            shown += ' and %d more' % (len(ips) - self.ips_shown)
+        return shown
+
+    def alarm(self, fresh=()):
+        if fresh:
+            self.alarm_callback(self.lh_msg % {
+                'n': len(fresh), 'rate': self.rate, 'ips': self._format(fresh),
+                'time': self.now()})
+        calm = []
+        for ip, seen in self.abusive.items():
+            if self.ticks - seen < self.alarm_period:
+                break
+            calm.append(ip)
+        for ip in calm:
+            del self.abusive[ip]
+        if calm:
+            self.alarm_callback(self.hl_msg % {
+                'n': len(calm), 'ips': self._format(calm), 'time': self.now()})
+
+    def get_stats(self):
+        ips = list(reversed(self.abusive))
+        return self.stat_msg % (len(ips),
+                                ': ' + self._format(ips) if ips else '')
@@ -10,6 +10,9 @@
 
 import abc
 import datetime
+import time
+
+from .. import utils
 
 
 # TODO: consider splitting alarming and non-alarming base classes when more
@@ -20,15 +23,34 @@ class BaseCollector(object):
 
     __metaclass__ = abc.ABCMeta
 
+    # Fields of a log line the collector reads (see utils.all_fields). Only
+    # fields required by at least one collector in use are parsed, the rest
+    # are left None. None means that the collector needs all of them.
+    required_fields = None
+    # Attributes making up the state of the collector (see get_state()), and
+    # the version of their layout. The version must be bumped whenever the
+    # attributes or the classes of their values change.
+    state_attributes = ()
+    state_version = 1
+
     def __init__(self, config):
         super(BaseCollector, self).__init__()
         if not config.has_section(self.config_section):
             self.config_section = 'DEFAULT'
         self.statsize = config.getint(self.config_section,
                                       'statistics_interval')
+        # Whether to attribute events to the second they were read in
+        # ('arrival') or to the second they happened in ('event'), and how
+        # long to wait for late events in the latter case. It is up to a
+        # specific Collector to support event time.
+        self.time_mode = utils.get_option(config, self.config_section,
+                                          'time_mode', 'arrival')
+        self.allowed_lateness = utils.get_option(config, self.config_section,
+                                                 'allowed_lateness', 2)
         # TODO: make this a list of callbacks, one might want to add an email
         # sender or something similar.
         self.alarm_callback = lambda *x, **k: True
+        self.clock = time.time
 
     def tick(self):
         """ Handler for clock signal.
@@ -61,6 +83,80 @@ class BaseCollector(object):
         """
         self.alarm_callback = callback
 
+    def set_clock(self, clock):
+        """ Replaces the source of current time.
+
+        Wall clock time is used by default. Replaying a log calls for time
+        according to the log instead (see replay.py).
+        :param clock: function returning seconds since the epoch.
+        """
+        self.clock = clock
+
+    def now(self):
+        """ Returns current time as datetime, e.g. to timestamp alarms."""
+        return datetime.datetime.fromtimestamp(self.clock())
+
+    def reconfigure(self, config):
+        """ Applies changed configuration keeping the state.
+
+        Called when configuration is reloaded and settings of the collector
+        have changed (see utils.reload()). Thresholds and the like are simply
+        replaced, windows are resized keeping the most recent data. The
+        default refuses any change, so that the collector is replaced with a
+        fresh one.
+        :param config: initialized ConfigParser object.
+        :return: True if the collector has been reconfigured, False
+            otherwise.
+        """
+        return False
+
+    def _adopt(self, fresh, names=()):
+        """ Takes configured values over from a fresh collector."""
+        for name in ('config_section', 'statsize', 'time_mode',
+                     'allowed_lateness') + tuple(names):
+            setattr(self, name, getattr(fresh, name))
+
+    def take_partial(self):
+        """ Hands out state accumulated since the previous call and resets it.
+
+        Partial state is what a collector in a worker process sends to the
+        main process (see pipeline.WorkerPool). It must be picklable and
+        small: counters rather than lines. Collectors which do not support
+        worker processes keep this default.
+        """
+        raise NotImplementedError("%s does not support worker processes" %
+                                  self.__class__.__name__)
+
+    def merge_partial(self, partial):
+        """ Merges partial state produced by take_partial() of a peer.
+
+        Merging partial states of several peers in order must give the same
+        result as processing all of their lines by this collector.
+        """
+        raise NotImplementedError("%s does not support worker processes" %
+                                  self.__class__.__name__)
+
+    def get_state(self):
+        """ Hands out everything the collector has learnt from the log.
+
+        State is saved to a snapshot (see snapshot.py), so that a restarted
+        collector carries on with full windows. It must be picklable. The
+        default takes attributes listed in state_attributes, which is enough
+        for most Collectors; the ones with nothing worth saving keep the list
+        empty.
+        """
+        return dict((name, getattr(self, name))
+                    for name in self.state_attributes)
+
+    def set_state(self, state):
+        """ Restores state handed out by get_state().
+
+        The state must come from a collector of the same class and
+        state_version configured the same way.
+        """
+        for name in self.state_attributes:
+            setattr(self, name, state[name])
+
     @abc.abstractmethod
     def process_line(self, line):
         """ Log line processing happens here.
@@ -70,6 +166,26 @@ class BaseCollector(object):
         a specific Collector and thus must be implemented explicitly.
         """
 
+    def process_batch(self, lines):
+        """ Processes a batch of log lines at once.
+
+        This is what the main program calls with every portion of fresh
+        lines. The default just calls process_line() for each line, specific
+        Collectors are welcome to override it with bulk operations to avoid
+        a Python call per line.
+        """
+        for line in lines:
+            self.process_line(line)
+
+    def get_metrics(self, top_k=10):
+        """ Provides statistics as numbers for storage (see store.py).
+
+        Unlike get_stats() must not reset anything. The default provides
+        nothing, specific Collectors return a dictionary of named values.
+        :param top_k: number of entries to provide for rankings.
+        """
+        return {}
+
     @abc.abstractmethod
     def get_stats(self):
         """ Provides statistics representation for displaying.
@@ -0,0 +1,120 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+from .. import columns
+from .. import utils
+from .base import BaseCollector
+from .hyperloglog import HyperLogLog, hash_value
+
+
+class DistinctCollector(BaseCollector):
+    """ Collector which counts distinct visitors, e.g. unique IPs and users.
+
+    Counting is done with HyperLogLog counters, thus memory use does not
+    depend on the number of visitors and counts are approximate. Besides
+    counts per statistics interval the collector reports counts over a longer
+    rolling horizon, which is split into slots of equal length: a counter per
+    slot is kept and the counters are merged when statistics are requested.
+    """
+
+    config_section = 'DistinctCollector'
+    state_attributes = ('ticks', 'interval', 'slot', 'past')
+    message = "Unique %s: %d (%d over last %ds)"
+    slots = 60
+
+    def __init__(self, config):
+        super(DistinctCollector, self).__init__(config)
+        fields = utils.get_option(config, self.config_section,
+                                  'distinct_fields', 'ip, userid')
+        self.fields = [x.strip() for x in fields.split(',') if x.strip()]
+        unknown = set(self.fields) - set(utils.all_fields)
+        if unknown:
+            raise ValueError("Unknown fields: %s" % ', '.join(sorted(unknown)))
+        self.required_fields = frozenset(self.fields)
+        self.precision = utils.get_option(config, self.config_section,
+                                          'hll_precision', 12)
+        self.horizon = utils.get_option(config, self.config_section,
+                                        'distinct_horizon', 3600)
+        self.slot_length = max(1, self.horizon // self.slots)
+        self.ticks = 0
+        self.interval = dict((f, HyperLogLog(self.precision))
+                             for f in self.fields)
+        self.slot = dict((f, HyperLogLog(self.precision))
+                         for f in self.fields)
+        # Counters of past slots, the oldest one is replaced first.
+        self.past = dict((f, [HyperLogLog(self.precision)
+                              for _ in range(self.slots - 1)])
+                         for f in self.fields)
+
+    def _add(self, field, value):
+        hashed = hash_value(value)
+        self.interval[field].add_hash(hashed)
+        self.slot[field].add_hash(hashed)
+
+    def process_line(self, line):
+        for field in self.fields:
+            if field in utils.request_fields:
+                self._add(field, getattr(line.request, field))
+            else:
+                self._add(field, getattr(line, field))
+
+    def process_batch(self, lines):
+        if not isinstance(lines, columns.LogBatch):
+            return super(DistinctCollector, self).process_batch(lines)
+        for field in self.fields:
+            column = lines.column(field)
+            # Every distinct value of a batch is hashed once.
+            values = (column.values if isinstance(column, columns.DictColumn)
+                      else set(column))
+            for value in values:
+                self._add(field, value)
+
+    def take_partial(self):
+        partial = dict((f, self.interval[f].copy()) for f in self.fields)
+        for field in self.fields:
+            self.interval[field].clear()
+            self.slot[field].clear()
+        return partial
+
+    def merge_partial(self, partial):
+        for field, counter in partial.items():
+            self.interval[field].merge(counter)
+            self.slot[field].merge(counter)
+
+    def reconfigure(self, config):
+        fresh = DistinctCollector(config)
+        if ((fresh.fields, fresh.precision, fresh.horizon) !=
+                (self.fields, self.precision, self.horizon)):
+            return False
+        self._adopt(fresh)
+        return True
+
+    def tick(self):
+        self.ticks += 1
+        if self.ticks % self.slot_length:
+            return
+        index = self.ticks // self.slot_length % len(self.past[self.fields[0]])
+        for field in self.fields:
+            self.past[field][index], self.slot[field] = (
+                self.slot[field], self.past[field][index])
+            self.slot[field].clear()
+
+    def count_rolling(self, field):
+        """ Estimates the number of distinct values over the horizon."""
+        return HyperLogLog.union([self.slot[field]] +
+                                 self.past[field]).count()
+
+    def get_stats(self):
+        stats = [self.message % (field, self.interval[field].count(),
+                                 self.count_rolling(field), self.horizon)
+                 for field in self.fields]
+        for counter in self.interval.values():
+            counter.clear()
+        return ', '.join(stats)
@@ -0,0 +1,177 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+""" Counters for finding the most frequent values in a stream.
+
+collections.Counter keeps every distinct value it has seen, which is exact,
+but a scanner hitting millions of distinct paths in a single interval makes
+it grow without a limit. SpaceSaving keeps a fixed number of values instead
+and trades exactness of counts for bounded memory.
+"""
+
+import collections
+import heapq
+
+from .. import utils
+
+
+engines = ('exact', 'space-saving')
+
+
+class SpaceSaving(object):
+    """ Approximate counter keeping at most capacity distinct values.
+
+    When a value which is not being counted arrives and there is no room for
+    it, the value with the smallest count is evicted and the newcomer takes
+    over its count (Metwally et al., "Efficient Computation of Frequent and
+    Top-k Elements in Data Streams"). Hence counts are never underestimated
+    and are overestimated by at most total/capacity, where total is the sum
+    of all counts; any value occurring more often than that is guaranteed to
+    be kept. Supports the subset of collections.Counter interface collectors
+    use.
+    """
+
+    def __init__(self, capacity):
+        super(SpaceSaving, self).__init__()
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}  # Maximum overestimation of every count.
+        # NOTE(aovchinnikov): heap entries are not updated when counts grow,
+        # so they are lower bounds which are fixed lazily when an entry gets
+        # to the top. This way there is exactly one entry per value. Entries
+        # are (count, sequence number, value) tuples: values are never
+        # compared, as they are not necessarily comparable (e.g. None and a
+        # string).
+        self.heap = []
+        self.sequence = 0
+        self.total = 0
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __getitem__(self, key):
+        return self.counts.get(key, 0)
+
+    def __setitem__(self, key, value):
+        """ Makes 'hist[key] += count' work like with collections.Counter."""
+        self.add(key, value - self[key])
+
+    def items(self):
+        return self.counts.items()
+
+    def error(self, key):
+        """ Returns the maximum overestimation of the key's count."""
+        return self.errors.get(key, 0)
+
+    def add(self, key, count=1):
+        """ Counts count occurrences of key."""
+        self.total += count
+        self.sequence += 1
+        counts = self.counts
+        if key in counts:
+            counts[key] += count
+        elif len(counts) < self.capacity:
+            counts[key] = count
+            self.errors[key] = 0
+            heapq.heappush(self.heap, (count, self.sequence, key))
+        else:
+            # The newcomer replaces the value with the smallest count right
+            # in the heap.
+            heap = self.heap
+            while True:
+                smallest, seq, evicted = heap[0]
+                actual = counts[evicted]
+                if smallest == actual:
+                    break
+                heapq.heapreplace(heap, (actual, seq, evicted))
+            heapq.heapreplace(heap, (smallest + count, self.sequence, key))
+            del counts[evicted]
+            del self.errors[evicted]
+            counts[key] = smallest + count
+            self.errors[key] = smallest
+
+    def update(self, values):
+        """ Counts values of an iterable or adds counts of a mapping.
+
+        Mappings include collections.Counter and SpaceSaving objects, thus
+        counters filled by different workers can be merged; the error bound
+        of the result is the sum of the bounds of the parts.
+        """
+        if hasattr(values, 'items'):
+            for key, count in values.items():
+                self.add(key, count)
+                if isinstance(values, SpaceSaving):
+                    self.errors[key] += values.error(key)
+        else:
+            for key in values:
+                self.add(key)
+
+    def copy(self):
+        other = SpaceSaving(self.capacity)
+        other.counts = dict(self.counts)
+        other.errors = dict(self.errors)
+        other.heap = list(self.heap)
+        other.total = self.total
+        other.sequence = self.sequence
+        return other
+
+    def __getstate__(self):
+        # NOTE(aovchinnikov): pickling dictionaries and a heap of tuples as
+        # they are takes twice the space and time of flat lists, which
+        # matters for snapshots (see snapshot.py) of large counters. The
+        # heap is rebuilt from actual counts.
+        keys = list(self.counts)
+        return (self.capacity, self.total, self.sequence, keys,
+                [self.counts[k] for k in keys],
+                [self.errors[k] for k in keys])
+
+    def __setstate__(self, state):
+        self.capacity, self.total, self.sequence, keys, counts, errors = state
+        self.counts = dict(zip(keys, counts))
+        self.errors = dict(zip(keys, errors))
+        # Sequence numbers of the entries are below the ones to come.
+        self.heap = list(zip(counts, range(len(keys)), keys))
+        heapq.heapify(self.heap)
+
+    def most_common(self, n):
+        """ Returns n values with largest counts along with the counts."""
+        return heapq.nlargest(n, self.counts.items(), key=lambda x: x[1])
+
+    def clear(self):
+        self.counts.clear()
+        self.errors.clear()
+        del self.heap[:]
+        self.total = 0
+        self.sequence = 0
+
+
+def same_engine(counter, other):
+    """ Tells whether two counters made by make_counter() count alike."""
+    return (type(counter) is type(other) and
+            getattr(counter, 'capacity', None) ==
+            getattr(other, 'capacity', None))
+
+
+def make_counter(config, section):
+    """ Creates a counter according to configuration.
+
+    :param config: initialized ConfigParser object.
+    :param section: section to read top_k_engine and top_k_capacity from.
+    :return: collections.Counter for 'exact' engine, SpaceSaving for
+        'space-saving' one.
+    :raises: ValueError in case of an unknown engine.
+    """
+    engine = utils.get_option(config, section, 'top_k_engine', 'exact')
+    if engine == 'exact':
+        return collections.Counter()
+    if engine == 'space-saving':
+        return SpaceSaving(utils.get_option(config, section,
+                                            'top_k_capacity', 1000))
+    raise ValueError("Unknown top_k_engine: %s" % engine)
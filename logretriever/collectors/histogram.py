@@ -0,0 +1,113 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+""" Log-bucketed histogram for streaming percentiles.
+
+Values are counted in buckets whose width grows with magnitude, in the
+manner of HdrHistogram: values below 2**significant_bits have buckets of
+their own, larger ones share a bucket with neighbours which differ only in
+bits below the significant_bits most significant ones. Thus percentiles are
+reported with a relative error below 2**(1 - significant_bits), memory is
+fixed, inserting a value takes constant time and histograms are merged by
+adding bucket counts.
+"""
+
+import array
+
+from .windows import count_typecode
+
+
+class LogHistogram(object):
+    """ Counts non-negative integers to report percentiles of."""
+
+    def __init__(self, significant_bits=7, max_bits=40):
+        """ :param significant_bits: number of most significant bits of a value
+            which are kept exactly.
+        :param max_bits: values of more bits are counted as
+            2**max_bits - 1.
+        """
+        super(LogHistogram, self).__init__()
+        self.significant_bits = significant_bits
+        self.half = 1 << (significant_bits - 1)
+        self.max_value = (1 << max_bits) - 1
+        self.counts = array.array(count_typecode, [0]) * (
+            self.index(self.max_value) + 1)
+        self.total = 0
+        self.max = 0
+
+    def index(self, value):
+        """ Returns the number of the bucket a value is counted in."""
+        shift = value.bit_length() - self.significant_bits
+        if shift <= 0:
+            return value
+        return (shift << (self.significant_bits - 1)) + (value >> shift)
+
+    def highest(self, index):
+        """ Returns the largest value counted in the bucket."""
+        shift = index // self.half - 1
+        if shift <= 0:
+            return index
+        return ((index - shift*self.half + 1) << shift) - 1
+
+    def add(self, value, count=1):
+        value = min(value, self.max_value)
+        self.add_index(self.index(value), count)
+        if value > self.max:
+            self.max = value
+
+    def add_index(self, index, count=1):
+        """ Counts values by bucket, see index(). Note, that max is not
+        updated.
+        """
+        self.counts[index] += count
+        self.total += count
+
+    def remove_index(self, index, count=1):
+        self.counts[index] -= count
+        self.total -= count
+
+    def merge(self, other):
+        """ Adds counts of another histogram of the same layout."""
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentiles(self, ps):
+        """ Computes several percentiles in a single pass over buckets.
+
+        :param ps: sequence of percentiles, each in (0, 100].
+        :return: list of values (0 for an empty histogram), in order of ps.
+            A value is the upper bound of the bucket it falls into, but never
+            above the maximum value counted.
+        """
+        out = dict((p, 0) for p in ps)
+        if not self.total:
+            return [0] * len(ps)
+        # Rank of a p-th percentile value (1-based): ceil(p * total / 100).
+        wanted = sorted((-(-p * self.total // 100), p) for p in ps)
+        seen = 0
+        i = 0
+        for index, count in enumerate(self.counts):
+            if not count:
+                continue
+            seen += count
+            while i < len(wanted) and wanted[i][0] <= seen:
+                out[wanted[i][1]] = min(self.highest(index), self.max)
+                i += 1
+            if i == len(wanted):
+                break
+        return [out[p] for p in ps]
+
+    def clear(self):
+        self.counts = array.array(count_typecode, [0]) * len(self.counts)
+        self.total = 0
+        self.max = 0
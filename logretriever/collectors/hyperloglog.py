@@ -0,0 +1,122 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+""" HyperLogLog distinct value counter.
+
+See Flajolet et al., "HyperLogLog: the analysis of a near-optimal
+cardinality estimation algorithm". A counter takes 2**precision bytes
+regardless of the number of values added and estimates their number with a
+standard error of about 1.04/sqrt(2**precision), e.g. 1.6% for precision 12.
+"""
+
+import hashlib
+import math
+import struct
+
+
+min_precision = 4
+max_precision = 16
+
+
+def hash_value(value):
+    """ Hashes a value into a 64-bit integer.
+
+    NOTE(aovchinnikov): the built-in hash() is salted differently in every
+    process, while counters filled in worker processes have to agree on
+    hashes to be merged.
+    """
+    if not isinstance(value, bytes):
+        value = str(value).encode('utf-8')
+    return struct.unpack('<Q', hashlib.md5(value).digest()[:8])[0]
+
+
+class HyperLogLog(object):
+    """ Estimates the number of distinct values added to it."""
+
+    def __init__(self, precision=12):
+        """ :param precision: number of hash bits used to select a register.
+        :raises: ValueError if precision is out of [4, 16].
+        """
+        super(HyperLogLog, self).__init__()
+        if not min_precision <= precision <= max_precision:
+            raise ValueError("HyperLogLog precision must be in [%d, %d]" %
+                             (min_precision, max_precision))
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value):
+        self.add_hash(hash_value(value))
+
+    def add_hash(self, hashed):
+        """ Adds a value by its hash_value(), so that a value can be added to
+        several counters while being hashed once.
+        """
+        rest_bits = 64 - self.precision
+        index = hashed >> rest_bits
+        rank = rest_bits - (hashed & ((1 << rest_bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values):
+        for value in values:
+            self.add_hash(hash_value(value))
+
+    def merge(self, other):
+        """ Makes the counter account for values added to another one.
+
+        :raises: ValueError if precisions differ.
+        """
+        if other.precision != self.precision:
+            raise ValueError("Can not merge HyperLogLog counters of different"
+                             " precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    @classmethod
+    def union(cls, counters):
+        """ Creates a counter accounting for values added to any of counters.
+
+        Unlike consecutive merge() calls takes a single pass over registers.
+        :param counters: non-empty list of counters of the same precision.
+        :raises: ValueError if precisions differ.
+        """
+        precision = counters[0].precision
+        if any(x.precision != precision for x in counters):
+            raise ValueError("Can not merge HyperLogLog counters of different"
+                             " precision")
+        out = cls(precision)
+        if len(counters) == 1:
+            out.registers[:] = counters[0].registers
+        else:
+            out.registers = bytearray(map(max, *[x.registers
+                                                 for x in counters]))
+        return out
+
+    def copy(self):
+        other = HyperLogLog(self.precision)
+        other.registers[:] = self.registers
+        return other
+
+    def clear(self):
+        self.registers[:] = bytearray(len(self.registers))
+
+    def count(self):
+        """ Returns the estimated number of distinct values."""
+        m = len(self.registers)
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213/(1 + 1.079/m))
+        estimate = alpha*m*m/sum(_powers[r] for r in self.registers)
+        if estimate <= 2.5*m:
+            zeros = self.registers.count(0)
+            if zeros:
+                # Linear counting is more precise for small cardinalities.
+                estimate = m*math.log(float(m)/zeros)
+        return int(round(estimate))
+
+
+_powers = [2.0 ** -r for r in range(65)]
@@ -8,35 +8,98 @@
 # For full license agreement please see:
 # http://creativecommons.org/licenses/by-nc-nd/4.0/
 
-import collections
-
+from .. import columns
+from .. import utils
 from .base import BaseCollector
+from .heavy_hitters import make_counter, same_engine
+from .windows import SlidingCounter
 
 
 class SectionCollector(BaseCollector):
     """ Collector which keeps track of visits to particular sections of a site.
 
-    Note, that this class implements non-overlapping hit rate calculation.
+    By default this class implements non-overlapping hit rate calculation:
+    sections are ranked by hits during the last statistics interval. With
+    section_window set sections are ranked by hits during that many most
+    recent seconds instead, regardless of when statistics are requested.
     """
 
     config_section = 'SectionCollector'
+    required_fields = frozenset(['path'])
+    state_attributes = ('hist', 'window', 'interval')
     message = "%d most hit sections are: %s"
+    window_message = "%d most hit sections over last %ds are: %s"
 
     def __init__(self, config):
         super(SectionCollector, self).__init__(config)
-        self.hist = collections.Counter()
+        # Either an exact collections.Counter or a bounded approximate one
+        # (see heavy_hitters.py). Counts hits during the current second when
+        # a window is in use.
+        self.hist = make_counter(config, self.config_section)
+        self.window_length = utils.get_option(config, self.config_section,
+                                              'section_window', 0)
+        self.window = None
+        # Hits during the current statistics interval except the current
+        # second, kept for storage only when a window is in use.
+        self.interval = None
+        if self.window_length:
+            self.window = SlidingCounter(self.window_length)
+            self.interval = make_counter(config, self.config_section)
 
     def process_line(self, line):
         """ Extracts section and counts how often it occurs."""
-        l = line.request.path.split('/')[1]
-        self.hist.update([l])
+        self.hist[line.request.path.split('/')[1]] += 1
+
+    def process_batch(self, lines):
+        if isinstance(lines, columns.LogBatch):
+            # Every distinct path is split once, not once per line.
+            for path, count in lines.column('path').counts().items():
+                self.hist[path.split('/')[1]] += count
+        else:
+            self.hist.update(x.request.path.split('/')[1] for x in lines)
+
+    def take_partial(self):
+        partial = self.hist.copy()
+        self.hist.clear()
+        return partial
+
+    def merge_partial(self, partial):
+        self.hist.update(partial)
+
+    def reconfigure(self, config):
+        fresh = SectionCollector(config)
+        if (fresh.window_length != self.window_length or
+                not same_engine(fresh.hist, self.hist)):
+            return False
+        self._adopt(fresh)
+        return True
+
+    def tick(self):
+        if self.window is not None:
+            self.window.push(self.hist)
+            self.interval.update(self.hist)
+            self.hist.clear()
+
+    def get_metrics(self, top_k=10):
+        # NOTE(aovchinnikov): stored records are summed up over periods,
+        # thus they hold hits of the interval, not of the window.
+        source = self.hist
+        if self.window is not None:
+            source = self.interval.copy()
+            source.update(self.hist)
+        return {'sections': source.most_common(top_k)}
 
     def get_stats(self):
         """ Prepares statistics in ready to display format."""
-        most_common = self.hist.most_common(self.statsize)
+        source = self.hist if self.window is None else self.window
+        most_common = source.most_common(self.statsize)
         stats = ["%s %d" % (x, y) for x, y in most_common]
         if len(stats) < self.statsize:
             stats.extend(["- -"]*(self.statsize - len(stats)))
+        if self.window is not None:
+            self.interval.clear()
+            return self.window_message % (self.statsize, self.window_length,
+                                          ", ".join(stats))
         res = self.message % (self.statsize, ", ".join(stats))
         self.hist.clear()
         return res
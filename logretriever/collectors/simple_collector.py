@@ -8,12 +8,11 @@
 # For full license agreement please see:
 # http://creativecommons.org/licenses/by-nc-nd/4.0/
 
-import datetime
 
 from .base import BaseCollector
-
-
-now = datetime.datetime.now
+from .windows import EventTimeWindow, RateHistory, RingBuffer
+from .. import columns
+from .. import utils
 
 
 class SimpleCollector(BaseCollector):
@@ -29,7 +28,11 @@ class SimpleCollector(BaseCollector):
     """
 
     config_section = 'SimpleCollector'
+    required_fields = frozenset()
+    state_attributes = ('alarm_window', 'stats_window', 'history',
+                        'alarm_is_on', 'events_count')
     stat_msg = "Hit rate: %d"
+    horizon_msg = "%ds average: %.1f"
     lh_msg = "%(time)s: WARNING! High traffic: average %(hr)d hits per second."
     hl_msg = "%(time)s: INFO: Traffic is back to normal."
 
@@ -39,30 +42,127 @@ class SimpleCollector(BaseCollector):
                                           'alarm_interval')
         self.alarm_threshold = config.getint(self.config_section,
                                              'alarm_threshold')
-        self.rates_window = [0] * max(self.alarm_period, self.statsize)
+        self.alarm_window = RingBuffer(self.alarm_period)
+        self.stats_window = RingBuffer(self.statsize)
+        # Longer horizons to report average hit rates over, in seconds.
+        horizons = utils.get_option(config, self.config_section,
+                                    'rate_horizons', '')
+        self.horizons = [int(x) for x in horizons.split(',') if x.strip()]
+        self.history = None
+        if self.horizons:
+            self.history = RateHistory()
+            self.horizons = [min(h, self.history.span) for h in self.horizons]
         self.alarm_is_on = False
-        self.window_total = 0
         self.events_count = 0
+        self.event_window = None
+        if self.time_mode == 'event':
+            # NOTE(aovchinnikov): an instance attribute, so that the parser
+            # extracts dates only when they are really needed.
+            self.required_fields = frozenset(['date'])
+            self.event_window = EventTimeWindow(self.allowed_lateness,
+                                                lambda: self.clock())
 
     def process_line(self, logline):
-        self.events_count += 1
+        if self.event_window is None:
+            self.events_count += 1
+            return
+        timestamp = utils.parse_clf_date(logline.date)
+        if timestamp is not None:
+            self.event_window.add(timestamp)
+
+    def process_batch(self, lines):
+        if self.event_window is None:
+            self.events_count += len(lines)
+        elif isinstance(lines, columns.LogBatch):
+            # Every distinct date is parsed only once per batch.
+            for date, count in lines.column('date').counts().items():
+                timestamp = utils.parse_clf_date(date)
+                if timestamp is not None:
+                    self.event_window.add(timestamp, count)
+        else:
+            for line in lines:
+                self.process_line(line)
+
+    def take_partial(self):
+        if self.event_window is not None:
+            return self.event_window.take_buckets()
+        partial, self.events_count = self.events_count, 0
+        return partial
+
+    def merge_partial(self, partial):
+        if self.event_window is not None:
+            self.event_window.merge_buckets(partial)
+        else:
+            self.events_count += partial
+
+    def get_state(self):
+        state = super(SimpleCollector, self).get_state()
+        if self.event_window is not None:
+            # NOTE(aovchinnikov): the window refers to the clock of the
+            # collector, which can not be pickled, thus only its contents
+            # are saved.
+            window = self.event_window
+            state['event_window'] = (window.buckets, window.closed,
+                                     window.late)
+        return state
+
+    def set_state(self, state):
+        super(SimpleCollector, self).set_state(state)
+        if self.event_window is not None:
+            window = self.event_window
+            window.buckets, window.closed, window.late = state['event_window']
+
+    def reconfigure(self, config):
+        fresh = SimpleCollector(config)
+        if (fresh.time_mode, fresh.horizons) != (self.time_mode,
+                                                 self.horizons):
+            return False
+        self.alarm_window.resize(fresh.alarm_period)
+        self.stats_window.resize(fresh.statsize)
+        self._adopt(fresh, ('alarm_period', 'alarm_threshold'))
+        if self.event_window is not None:
+            self.event_window.allowed_lateness = self.allowed_lateness
+        return True
 
     def tick(self):
-        self.window_total -= self.rates_window.pop(0)
-        self.window_total += self.events_count
-        self.rates_window.append(self.events_count)
-        self.events_count = 0
+        if self.event_window is None:
+            self._push(self.events_count)
+            self.events_count = 0
+        else:
+            # Normally exactly one second becomes final per tick; after a
+            # stall all of them are accounted for, up to the window size.
+            limit = max(self.alarm_period, self.statsize)
+            for count in self.event_window.close(limit):
+                self._push(count)
         self.alarm()
 
+    def _push(self, count):
+        self.alarm_window.push(count)
+        self.stats_window.push(count)
+        if self.history is not None:
+            self.history.push(count)
+
     def alarm(self):
-        hit_rate = int(float(self.window_total)/self.alarm_period)
+        hit_rate = int(float(self.alarm_window.total)/self.alarm_period)
         if hit_rate >= self.alarm_threshold and not self.alarm_is_on:
             self.alarm_is_on = True
-            self.alarm_callback(self.lh_msg % {'hr': hit_rate, 'time': now()})
+            self.alarm_callback(self.lh_msg % {'hr': hit_rate,
+                                               'time': self.now()})
         elif hit_rate < self.alarm_threshold and self.alarm_is_on:
             self.alarm_is_on = False
-            self.alarm_callback(self.hl_msg % {'time': now()})
+            self.alarm_callback(self.hl_msg % {'time': self.now()})
+
+    def get_metrics(self, top_k=10):
+        return {'hits': self.stats_window.total}
 
     def get_stats(self):
-        return self.stat_msg % (
-            sum(self.rates_window[-self.statsize:])/self.statsize)
+        msg = self.stat_msg % (self.stats_window.total/self.statsize)
+        if self.history is None:
+            return msg
+        rates = []
+        for h in self.horizons:
+            # NOTE(aovchinnikov): the horizon may be rounded up to whole
+            # buckets, the average is taken over the seconds covered.
+            count, seconds = self.history.total(h)
+            rates.append(self.horizon_msg % (h, float(count)/seconds))
+        return ', '.join([msg] + rates)
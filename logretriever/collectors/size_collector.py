@@ -0,0 +1,144 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+import collections
+
+from .. import columns
+from .. import utils
+from .base import BaseCollector
+from .histogram import LogHistogram
+
+
+class SizeCollector(BaseCollector):
+    """ Collector which reports percentiles of response sizes.
+
+    Percentiles are reported per statistics interval and over the alarm
+    interval, the latter is also checked against a threshold. Sizes are
+    counted in log-bucketed histograms (see histogram.py), thus reported
+    values are approximate. The alarm window histogram is kept up to date by
+    adding fresh counts and subtracting the ones of a second which falls out
+    of the window, every second is remembered as a sparse dict of non-empty
+    buckets.
+    """
+
+    config_section = 'SizeCollector'
+    required_fields = frozenset(['size'])
+    state_attributes = ('interval', 'window', 'pending', 'pending_max',
+                        'seconds', 'maxes', 'pos', 'alarm_is_on')
+    stat_msg = "Response size %s: %s bytes, over %ds: %s bytes"
+    lh_msg = ("%(time)s: WARNING! Large responses: p%(p)s response size %(v)d"
+              " bytes.")
+    hl_msg = "%(time)s: INFO: Response sizes are back to normal."
+
+    def __init__(self, config):
+        super(SizeCollector, self).__init__(config)
+        self.alarm_period = config.getint(self.config_section,
+                                          'alarm_interval')
+        percentiles = utils.get_option(config, self.config_section,
+                                       'size_percentiles', '50, 95, 99')
+        self.percentiles = [float(x) for x in percentiles.split(',')
+                            if x.strip()]
+        # Percentile to alarm on and its threshold in bytes, 0 disables
+        # alarms.
+        self.alarm_percentile = utils.get_option(
+            config, self.config_section, 'size_alarm_percentile', 99.0)
+        self.alarm_threshold = utils.get_option(
+            config, self.config_section, 'size_alarm_threshold', 0)
+        self.interval = LogHistogram()
+        self.window = LogHistogram()
+        # Non-empty buckets and maximum size of the current second and of the
+        # ones in the alarm window, the oldest one is replaced first.
+        self.pending = collections.Counter()
+        self.pending_max = 0
+        self.seconds = [{} for _ in range(self.alarm_period)]
+        self.maxes = [0] * self.alarm_period
+        self.pos = 0
+        self.alarm_is_on = False
+
+    def _add(self, size, count):
+        size = min(size, self.interval.max_value)
+        index = self.interval.index(size)
+        self.interval.add_index(index, count)
+        self.pending[index] += count
+        if size > self.pending_max:
+            self.pending_max = size
+            self.interval.max = max(self.interval.max, size)
+
+    def process_line(self, line):
+        self._add(int(line.size), 1)
+
+    def process_batch(self, lines):
+        if isinstance(lines, columns.LogBatch):
+            # Every distinct size is bucketed once.
+            sizes = collections.Counter(lines.column('size'))
+        else:
+            sizes = collections.Counter(int(x.size) for x in lines)
+        for size, count in sizes.items():
+            self._add(size, count)
+
+    def take_partial(self):
+        partial = (self.pending, self.pending_max)
+        self.pending = collections.Counter()
+        self.pending_max = 0
+        self.interval.clear()
+        return partial
+
+    def merge_partial(self, partial):
+        buckets, max_size = partial
+        for index, count in buckets.items():
+            self.interval.add_index(index, count)
+        self.interval.max = max(self.interval.max, max_size)
+        self.pending.update(buckets)
+        self.pending_max = max(self.pending_max, max_size)
+
+    def reconfigure(self, config):
+        fresh = SizeCollector(config)
+        if fresh.alarm_period != self.alarm_period:
+            return False
+        self._adopt(fresh, ('percentiles', 'alarm_percentile',
+                            'alarm_threshold'))
+        return True
+
+    def tick(self):
+        for index, count in self.seconds[self.pos].items():
+            self.window.remove_index(index, count)
+        for index, count in self.pending.items():
+            self.window.add_index(index, count)
+        self.seconds[self.pos] = self.pending
+        self.maxes[self.pos] = self.pending_max
+        self.pos = (self.pos + 1) % self.alarm_period
+        self.window.max = max(self.maxes)
+        self.pending = collections.Counter()
+        self.pending_max = 0
+        self.alarm()
+
+    def alarm(self):
+        if not self.alarm_threshold:
+            return
+        value = self.window.percentiles([self.alarm_percentile])[0]
+        if value >= self.alarm_threshold and not self.alarm_is_on:
+            self.alarm_is_on = True
+            self.alarm_callback(self.lh_msg % {
+                'p': '%g' % self.alarm_percentile, 'v': value,
+                'time': self.now()})
+        elif value < self.alarm_threshold and self.alarm_is_on:
+            self.alarm_is_on = False
+            self.alarm_callback(self.hl_msg % {'time': self.now()})
+
+    def _format(self, histogram):
+        values = histogram.percentiles(self.percentiles) + [histogram.max]
+        return '/'.join(str(x) for x in values)
+
+    def get_stats(self):
+        names = '/'.join(['p%g' % p for p in self.percentiles] + ['max'])
+        res = self.stat_msg % (names, self._format(self.interval),
+                               self.alarm_period, self._format(self.window))
+        self.interval.clear()
+        return res
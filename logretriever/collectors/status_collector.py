@@ -0,0 +1,138 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+import array
+import collections
+
+from .. import columns
+from .. import utils
+from .base import BaseCollector
+from .windows import RingBuffer, count_typecode
+
+# NOTE(aovchinnikov): looking a code up is notably cheaper than converting it
+# to int and checking the range.
+slot_of = dict((str(x), x) for x in range(100, 600))
+
+
+class StatusCollector(BaseCollector):
+    """ Collector which counts response codes and alerts on server errors.
+
+    Codes are counted in an array indexed by code, the codes outside of
+    [100, 600) are counted at index 0. Like SimpleCollector this one uses
+    sliding window: in case the share of 5xx responses over alarm interval
+    exceeds preconfigured threshold an alert will be issued, and another
+    one once the share is back to normal.
+    """
+
+    config_section = 'StatusCollector'
+    required_fields = frozenset(['response_code'])
+    state_attributes = ('codes', 'pending', 'total_window', 'errors_window',
+                        'alarm_is_on')
+    slots = 600
+    stat_msg = ("Responses 2xx/3xx/4xx/5xx: %d/%d/%d/%d (%s), 5xx over %ds:"
+                " %.1f%%")
+    lh_msg = ("%(time)s: WARNING! High error rate: %(ratio).1f%% of requests"
+              " failed with 5xx.")
+    hl_msg = "%(time)s: INFO: Error rate is back to normal."
+
+    def __init__(self, config):
+        super(StatusCollector, self).__init__(config)
+        self.alarm_period = config.getint(self.config_section,
+                                          'alarm_interval')
+        # Share of 5xx responses over alarm_interval, in percent, which is
+        # considered anomalous.
+        self.alarm_threshold = utils.get_option(
+            config, self.config_section, 'error_ratio_threshold', 5.0)
+        # Number of most frequent individual codes to report.
+        self.codes_shown = utils.get_option(config, self.config_section,
+                                            'status_codes_shown', 3)
+        # Codes counted since stats were shown last time, and since the last
+        # clock pulse. The latter are kept apart, as stats are shown (and
+        # reset) before the collector gets a pulse.
+        self.codes = array.array(count_typecode, [0]) * self.slots
+        self.pending = array.array(count_typecode, [0]) * self.slots
+        self.total_window = RingBuffer(self.alarm_period)
+        self.errors_window = RingBuffer(self.alarm_period)
+        self.alarm_is_on = False
+
+    def process_line(self, line):
+        slot = slot_of.get(line.response_code, 0)
+        self.codes[slot] += 1
+        self.pending[slot] += 1
+
+    def process_batch(self, lines):
+        codes, pending = self.codes, self.pending
+        if isinstance(lines, columns.LogBatch):
+            for code, count in collections.Counter(
+                    lines.column('response_code')).items():
+                slot = code if 100 <= code < 600 else 0
+                codes[slot] += count
+                pending[slot] += count
+            return
+        for code, count in collections.Counter(
+                x.response_code for x in lines).items():
+            slot = slot_of.get(code, 0)
+            codes[slot] += count
+            pending[slot] += count
+
+    def take_partial(self):
+        partial = self.pending
+        self.codes = array.array(count_typecode, [0]) * self.slots
+        self.pending = array.array(count_typecode, [0]) * self.slots
+        return partial
+
+    def merge_partial(self, partial):
+        codes, pending = self.codes, self.pending
+        for code, count in enumerate(partial):
+            if count:
+                codes[code] += count
+                pending[code] += count
+
+    def reconfigure(self, config):
+        fresh = StatusCollector(config)
+        self.total_window.resize(fresh.alarm_period)
+        self.errors_window.resize(fresh.alarm_period)
+        self._adopt(fresh, ('alarm_period', 'alarm_threshold', 'codes_shown'))
+        return True
+
+    def tick(self):
+        pending = self.pending
+        self.total_window.push(sum(pending))
+        self.errors_window.push(sum(pending[500:600]))
+        self.pending = array.array(count_typecode, [0]) * self.slots
+        self.alarm()
+
+    def error_ratio(self):
+        """ Returns the share of 5xx responses over alarm interval, %."""
+        if not self.total_window.total:
+            return 0.0
+        return 100.0 * self.errors_window.total / self.total_window.total
+
+    def alarm(self):
+        ratio = self.error_ratio()
+        if ratio >= self.alarm_threshold and not self.alarm_is_on:
+            self.alarm_is_on = True
+            self.alarm_callback(self.lh_msg % {'ratio': ratio,
+                                               'time': self.now()})
+        elif ratio < self.alarm_threshold and self.alarm_is_on:
+            self.alarm_is_on = False
+            self.alarm_callback(self.hl_msg % {'time': self.now()})
+
+    def get_stats(self):
+        codes = self.codes
+        classes = [sum(codes[x:x + 100]) for x in (200, 300, 400, 500)]
+        top = sorted((x for x in enumerate(codes) if x[1]),
+                     key=lambda x: -x[1])[:self.codes_shown]
+        shown = ', '.join('%s: %d' % (code or 'other', count)
+                          for code, count in top) or '-'
+        res = self.stat_msg % tuple(classes + [shown, self.alarm_period,
+                                               self.error_ratio()])
+        self.codes = array.array(count_typecode, [0]) * self.slots
+        return res
@@ -8,9 +8,9 @@
 # For full license agreement please see:
 # http://creativecommons.org/licenses/by-nc-nd/4.0/
 
-import collections
-
+from .. import columns
 from .base import BaseCollector
+from .heavy_hitters import make_counter, same_engine
 
 
 class UserCollector(BaseCollector):
@@ -20,14 +20,39 @@ class UserCollector(BaseCollector):
     """
 
     config_section = 'UserCollector'
+    required_fields = frozenset(['userid'])
+    state_attributes = ('hist',)
     message = "Most active user: %s"
 
     def __init__(self, config):
         super(UserCollector, self).__init__(config)
-        self.hist = collections.Counter()
+        # Either an exact collections.Counter or a bounded approximate one
+        # (see heavy_hitters.py).
+        self.hist = make_counter(config, self.config_section)
 
     def process_line(self, line):
-        self.hist.update([line.userid])
+        self.hist[line.userid] += 1
+
+    def process_batch(self, lines):
+        if isinstance(lines, columns.LogBatch):
+            self.hist.update(lines.column('userid').counts())
+        else:
+            self.hist.update(x.userid for x in lines)
+
+    def take_partial(self):
+        partial = self.hist.copy()
+        self.hist.clear()
+        return partial
+
+    def merge_partial(self, partial):
+        self.hist.update(partial)
+
+    def reconfigure(self, config):
+        fresh = UserCollector(config)
+        if not same_engine(fresh.hist, self.hist):
+            return False
+        self._adopt(fresh)
+        return True
 
     def get_stats(self):
         most_common = self.hist.most_common(1)
@@ -0,0 +1,238 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+""" Helpers for collectors computing statistics over time windows."""
+
+import array
+import collections
+import time
+
+
+# NOTE(aovchinnikov): Py2 arrays have no 'Q' type code.
+try:
+    array.array('Q')
+    count_typecode = 'Q'
+except ValueError:
+    count_typecode = 'L'
+
+# Resolution in seconds and number of buckets for every level of RateHistory:
+# a minute of seconds, an hour of minutes and a day of hours.
+default_resolutions = ((1, 60), (60, 60), (3600, 24))
+
+
+class EventTimeWindow(object):
+    """ Groups events into seconds by the time they happened.
+
+    By default collectors attribute events to the second in which they have
+    been read (arrival time). Delayed writes and backfills then land in a
+    wrong second. This class keeps a bucket per second of event time instead
+    and considers a second final only when the clock is allowed_lateness
+    seconds past it. Events arriving for an already final second are late:
+    they are counted, but not attributed to any second.
+    """
+
+    def __init__(self, allowed_lateness, clock=time.time):
+        """ :param allowed_lateness: how many seconds to wait for late events
+            before a second is considered final.
+        :param clock: function returning current time in seconds since the
+            epoch. Replaying historic logs calls for a clock of its own.
+        """
+        super(EventTimeWindow, self).__init__()
+        self.allowed_lateness = allowed_lateness
+        self.clock = clock
+        self.buckets = {}
+        self.closed = None  # The last final second.
+        self.late = 0
+
+    def add(self, timestamp, count=1):
+        """ Accounts for events which happened at the given second.
+
+        :return: False if the events are late, True otherwise.
+        """
+        if self.closed is not None and timestamp <= self.closed:
+            self.late += count
+            return False
+        self.buckets[timestamp] = self.buckets.get(timestamp, 0) + count
+        return True
+
+    def close(self, limit=None):
+        """ Finalizes seconds which are old enough.
+
+        :param limit: maximum number of seconds to hand out; if more have
+            become final, only the most recent ones are returned.
+        :return: list of event counts for every newly final second, oldest
+            first (normally one per second of the clock).
+        """
+        until = int(self.clock()) - self.allowed_lateness
+        if self.closed is None:
+            self.closed = until - 1
+        start = self.closed + 1
+        if limit is not None:
+            start = max(start, until - limit + 1)
+        out = [self.buckets.pop(s, 0) for s in range(start, until + 1)]
+        self.closed = max(self.closed, until)
+        for stale in [s for s in self.buckets if s <= self.closed]:
+            self.late += self.buckets.pop(stale)
+        return out
+
+    def take_buckets(self):
+        """ Hands out and forgets pending buckets (see merge_buckets())."""
+        buckets, self.buckets = self.buckets, {}
+        return buckets
+
+    def merge_buckets(self, buckets):
+        """ Adds buckets of a peer window."""
+        for timestamp, count in buckets.items():
+            self.add(timestamp, count)
+
+
+class RingBuffer(object):
+    """ Fixed size window of counters with a running total.
+
+    Pushing a value evicts the oldest one, both in constant time, and the
+    total over the window is always at hand.
+    """
+
+    def __init__(self, size):
+        super(RingBuffer, self).__init__()
+        self.values = array.array(count_typecode, [0]) * size
+        self.pos = 0  # Index of the oldest value.
+        self.total = 0
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        """ Yields values oldest first."""
+        for i in range(len(self.values)):
+            yield self.values[(self.pos + i) % len(self.values)]
+
+    def push(self, value):
+        """ Adds the most recent value.
+
+        :return: the evicted value.
+        """
+        old = self.values[self.pos]
+        self.values[self.pos] = value
+        self.pos = (self.pos + 1) % len(self.values)
+        self.total += value - old
+        return old
+
+    def resize(self, size):
+        """ Changes the size of the window keeping the most recent values."""
+        values = list(self)[-size:]
+        self.values = array.array(count_typecode, [0]) * (size - len(values))
+        self.values.extend(values)
+        self.pos = 0
+        self.total = sum(values)
+
+    def last(self, n):
+        """ Sums n most recent values (all of them if n exceeds the size).
+
+        Takes constant time for the whole window and O(n) otherwise.
+        """
+        size = len(self.values)
+        if n >= size:
+            return self.total
+        return sum(self.values[(self.pos - i) % size] for i in range(1, n + 1))
+
+
+class RateHistory(object):
+    """ Per second counts rolled up to coarser resolutions.
+
+    Every level is a RingBuffer of buckets covering several buckets of the
+    previous one, e.g. seconds are summed up into minutes and minutes into
+    hours. Memory use is fixed regardless of the horizon covered, while
+    totals over a horizon are exact up to the resolution of the level
+    covering it.
+    """
+
+    def __init__(self, resolutions=default_resolutions):
+        """ :param resolutions: sequence of (seconds per bucket, number of
+            buckets) pairs, finest first. Every resolution must be a multiple
+            of the previous one.
+        """
+        super(RateHistory, self).__init__()
+        self.resolutions = [r for r, _ in resolutions]
+        self.levels = [RingBuffer(size) for _, size in resolutions]
+        # Sums of buckets not yet rolled up into the next level and their
+        # number.
+        self.pending = [0] * len(self.levels)
+        self.pushed = [0] * len(self.levels)
+
+    @property
+    def span(self):
+        """ The longest horizon covered, in seconds."""
+        return self.resolutions[-1] * len(self.levels[-1])
+
+    def push(self, count):
+        """ Accounts for the count of events in the second just passed."""
+        value = count
+        for i, level in enumerate(self.levels):
+            level.push(value)
+            if i + 1 == len(self.levels):
+                break
+            self.pending[i] += value
+            self.pushed[i] += 1
+            if self.pushed[i] < self.resolutions[i + 1] // self.resolutions[i]:
+                break
+            value, self.pending[i], self.pushed[i] = self.pending[i], 0, 0
+
+    def total(self, seconds):
+        """ Counts events over the given number of most recent seconds.
+
+        The finest level covering the horizon is used, thus horizons which
+        are not a multiple of its resolution are rounded up, and the most
+        recent seconds not rolled up yet are not accounted for.
+        :param seconds: the horizon, clamped to span.
+        :return: (number of events, number of seconds actually covered).
+        """
+        for resolution, level in zip(self.resolutions, self.levels):
+            if seconds <= resolution * len(level):
+                break
+        buckets = min(-(-seconds // resolution), len(level))
+        return level.last(buckets), buckets * resolution
+
+
+class SlidingCounter(object):
+    """ Counts of values over a sliding window of ticks.
+
+    Counts of every tick are kept in a bucket of their own. A running
+    aggregate is updated with a bucket as it enters the window and as it
+    leaves it, thus querying the aggregate does not involve buckets at all.
+    """
+
+    def __init__(self, length):
+        """ :param length: window length in ticks."""
+        super(SlidingCounter, self).__init__()
+        self.buckets = [[] for _ in range(length)]
+        self.pos = 0  # Index of the oldest bucket.
+        self.total = collections.Counter()
+
+    def push(self, counts):
+        """ Adds counts of a tick just passed, forgets the oldest one.
+
+        :param counts: mapping of values to counts, e.g. collections.Counter.
+        """
+        total = self.total
+        for key, count in self.buckets[self.pos]:
+            left = total[key] - count
+            if left:
+                total[key] = left
+            else:
+                del total[key]
+        bucket = list(counts.items())
+        for key, count in bucket:
+            total[key] += count
+        self.buckets[self.pos] = bucket
+        self.pos = (self.pos + 1) % len(self.buckets)
+
+    def most_common(self, n):
+        return self.total.most_common(n)
@@ -0,0 +1,185 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+""" Columnar representation of parsed log lines.
+
+A LogBatch keeps one column per field instead of a namedtuple per line.
+Only the fields asked for are parsed. Numeric fields are stored in arrays,
+text fields are dictionary-encoded: every distinct value is kept (and
+decoded) once and the column itself is an array of codes. Collectors can
+work on columns directly, e.g. count distinct values with
+DictColumn.counts(), while iterating over a batch still yields ordinary
+utils.log_line objects for those which do not care.
+"""
+
+import array
+import collections
+import itertools
+import sys
+
+from . import utils
+
+
+# NOTE(aovchinnikov): Py2 arrays have no 'Q' type code.
+size_typecode = 'Q' if 'Q' in array.typecodes else 'L'
+# Plain dicts keep insertion order since Py3.7 and are faster to build.
+ordered_dict = dict if sys.version_info >= (3, 7) else collections.OrderedDict
+
+
+def int_array(typecode, values):
+    """ Makes an array of integers given as strings.
+
+    Values too large for the type code (a malformed line) are clamped to its
+    maximum rather than fail the whole chunk.
+    """
+    try:
+        return array.array(typecode, map(int, values))
+    except OverflowError:
+        limit = (1 << (8 * array.array(typecode).itemsize)) - 1
+        return array.array(typecode, [min(int(x), limit) for x in values])
+
+
+class DictColumn(object):
+    """ A dictionary-encoded column of text values."""
+
+    def __init__(self, raw, decode=None):
+        """ :param raw: sequence of values.
+        :param decode: optional function to apply to every distinct value.
+        """
+        super(DictColumn, self).__init__()
+        distinct = list(ordered_dict.fromkeys(raw))
+        index = dict(zip(distinct, range(len(distinct))))
+        self.codes = array.array('I', map(index.__getitem__, raw))
+        self.values = list(map(decode, distinct)) if decode else distinct
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        return self.values[self.codes[i]]
+
+    def __iter__(self):
+        return map(self.values.__getitem__, self.codes)
+
+    def counts(self):
+        """ Counts occurrences of every value in the column.
+
+        :return: collections.Counter with values in order of first
+            occurrence, just like counting the column value by value.
+        """
+        out = collections.Counter()
+        values = self.values
+        for code, count in collections.Counter(self.codes).items():
+            out[values[code]] += count
+        return out
+
+
+class LogBatch(object):
+    """ A batch of parsed log lines stored column by column."""
+
+    def __init__(self, length, columns, source=None):
+        """ :param length: number of lines in the batch.
+        :param columns: dictionary of columns by field name (see
+            utils.all_fields): DictColumn objects for text fields, arrays
+            for 'response_code' and 'size'. Fields nobody needs may be
+            missing.
+        :param source: name of a file all the lines came from.
+        """
+        super(LogBatch, self).__init__()
+        self.length = length
+        self.columns = columns
+        self.source = source
+
+    def __len__(self):
+        return self.length
+
+    def column(self, name):
+        """ Returns a column by field name.
+
+        :raises: KeyError if the field has not been parsed.
+        """
+        return self.columns[name]
+
+    def __iter__(self):
+        """ Yields lines as utils.log_line objects (compatibility view).
+
+        Fields which have not been parsed are None.
+        """
+        def missing():
+            return itertools.repeat(None, self.length)
+        c = dict((f, self.columns[f] if f in self.columns else missing())
+                 for f in utils.all_fields)
+        if set(utils.request_fields) & set(self.columns):
+            requests = map(utils.request_line, c['method'], c['path'],
+                           c['protocol'])
+        else:
+            requests = missing()
+        codes = (map(str, c['response_code']) if 'response_code' in
+                 self.columns else missing())
+        sizes = map(str, c['size']) if 'size' in self.columns else missing()
+        for ip, ident, user, date, req, code, size in zip(
+                c['ip'], c['identifier'], c['userid'], c['date'], requests,
+                codes, sizes):
+            yield utils.log_line(ip, ident, user, date, req, code, size,
+                                 self.source)
+
+
+def parse_chunk(chunk, source=None, fields=None):
+    """ CLF parser producing a LogBatch.
+
+    Accepts the same input as utils.parse_chunk() and skips the same lines.
+    For bytes-like input only distinct values of text fields get decoded.
+    :param chunk: a string or a bytes-like object with complete lines.
+    :param source: name of a file the chunk came from.
+    :param fields: names of fields to build columns for (see
+        utils.all_fields), None for all of them.
+    :return: LogBatch object.
+    """
+    fields = set(utils.all_fields if fields is None else fields)
+    binary = (isinstance(chunk, (bytes, bytearray, memoryview)) and
+              bytes is not str)
+    captured = [f for f in utils.group_fields
+                if f in fields or f == 'request']
+    rows = utils.make_chunk_pattern(captured, binary).findall(chunk)
+    if len(captured) == 1:  # findall() returns bare strings then.
+        rows = [(x,) for x in rows]
+    ri = captured.index('request')
+    requests = [x[ri].split() for x in rows]
+    if any(len(x) != 3 for x in requests):
+        keep = [i for i, x in enumerate(requests) if len(x) == 3]
+        rows = [rows[i] for i in keep]
+        requests = [requests[i] for i in keep]
+    values = dict(zip(captured, zip(*rows) if rows else [()] * len(captured)))
+    values.update(zip(utils.request_fields,
+                      zip(*requests) if requests else [()] * 3))
+    decode = ((lambda x: x.decode(utils.encoding, 'replace')) if binary
+              else None)
+    columns = {}
+    for field in fields:
+        if field == 'response_code':
+            columns[field] = int_array('H', values[field])
+        elif field == 'size':
+            columns[field] = int_array(size_typecode, values[field])
+        else:
+            columns[field] = DictColumn(values[field], decode)
+    return LogBatch(len(rows), columns, source)
+
+
+def make_parser(fields=None):
+    """ Builds a LogBatch parser extracting only the given fields.
+
+    :param fields: iterable of names from utils.all_fields, None for all.
+    :return: function with the same signature as utils.parse_chunk().
+    """
+    fields = utils.all_fields if fields is None else frozenset(fields)
+    unknown = set(fields) - set(utils.all_fields)
+    if unknown:
+        raise ValueError("Unknown fields: %s" % ', '.join(sorted(unknown)))
+    return lambda chunk, source=None: parse_chunk(chunk, source, fields)
@@ -15,26 +15,40 @@ try:
     import ConfigParser
 except ImportError:
     import configparser as ConfigParser
-import datetime
 import os
 import signal
 import sys
-import time
 import threading
 
-import collectors as _collectors
-import representers
-import utils
+# NOTE(aovchinnikov): modules of the package are imported by their full names
+# so that they can import each other and be imported in worker processes. The
+# block below makes it work when main.py is run directly as well.
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))))
+from logretriever import collectors as _collectors
+from logretriever import pipeline
+from logretriever import replay
+from logretriever import representers
+from logretriever import scheduler
+from logretriever import snapshot
+from logretriever import store
+from logretriever import tail
+from logretriever import utils
+from logretriever import watchers
 
 
 sig_names = {2: 'SIGINT', 1: 'SIGHUP', 15: 'SIGTERM'}
 just_continue = None
+# Interval in seconds between clock pulses sent to the representer.
+tick_interval = 1
 
 parser = argparse.ArgumentParser()
 parser.add_argument("--config", default="/etc/logretriever/config.cfg",
                     help="Path to configuration file with settings.")
 parser.add_argument('--log_file', default=argparse.SUPPRESS,
-                    help="Location of a log file to monitor.")
+                    help="Location of a log file to monitor. A comma-separated"
+                    " list of files and glob patterns is accepted.")
 parser.add_argument('--check_interval', default=argparse.SUPPRESS,
                     help="How often to read updates from log file (in seconds)"
                     ".")
@@ -46,6 +60,42 @@ parser.add_argument('--alarm_interval', default=argparse.SUPPRESS,
 parser.add_argument('--alarm_threshold', default=argparse.SUPPRESS,
                     help="Number of events per second during alarm interval"
                     " which is considered an anomaly.")
+parser.add_argument('--time_mode', default=argparse.SUPPRESS,
+                    choices=['arrival', 'event'],
+                    help="Whether to account events by read time or by"
+                    " their timestamps.")
+parser.add_argument('--allowed_lateness', default=argparse.SUPPRESS,
+                    help="Seconds to wait for late events in event time"
+                    " mode.")
+parser.add_argument('--watch_mode', default=argparse.SUPPRESS,
+                    choices=['auto', 'inotify', 'poll'],
+                    help="How to learn about log file updates.")
+parser.add_argument('--read_buffer_size', default=argparse.SUPPRESS,
+                    help="Maximum number of bytes to read from log file at"
+                    " once.")
+parser.add_argument('--state_file', default=argparse.SUPPRESS,
+                    help="Where to keep log file position between runs.")
+parser.add_argument('--snapshot_file', default=argparse.SUPPRESS,
+                    help="Where to keep state of collectors between runs.")
+parser.add_argument('--workers', default=argparse.SUPPRESS,
+                    help="Number of worker processes to parse log lines in"
+                    " (0 to parse in the main process).")
+parser.add_argument('--queue_size', default=argparse.SUPPRESS,
+                    help="Maximum number of chunks of fresh data waiting to"
+                    " be processed.")
+parser.add_argument('--queue_policy', default=argparse.SUPPRESS,
+                    choices=pipeline.BoundedQueue.policies,
+                    help="What to do with fresh data when processing can not"
+                    " keep up with reading.")
+parser.add_argument('--batch_format', default=argparse.SUPPRESS,
+                    choices=['rows', 'columns'],
+                    help="How to represent parsed log lines.")
+parser.add_argument('--store_dir', default=argparse.SUPPRESS,
+                    help="Directory to save stats of every interval to.")
+parser.add_argument('--replay', action='store_true',
+                    default=argparse.SUPPRESS,
+                    help="Process complete logs as fast as possible, taking"
+                    " time from log timestamps, and exit.")
 parser.add_argument('--ignore_missing_bits', type=bool,
                     default=argparse.SUPPRESS,
                     help="Number of events per second during alarm interval"
@@ -56,8 +106,56 @@ config = ConfigParser.SafeConfigParser()
 sys.exit(1) if utils.file_has_problems(cliargs.config) else just_continue
 config.read([cliargs.config])
 
+# Options which are applied once at start, a change of them on reload takes a
+# restart to apply.
+restart_options = ('representer', 'log_file', 'rescan_interval', 'state_file',
+                   'state_save_interval', 'check_interval', 'watch_mode',
+                   'read_buffer_size', 'queue_size', 'queue_policy',
+                   'queue_sample_ratio', 'workers', 'store_dir', 'store_top_k',
+                   'snapshot_file', 'snapshot_interval')
+
+
+def reload_config(collectors, workers):
+    """ Re-reads configuration file and reloads collectors from it.
+
+    :param collectors: list of collector objects configured with config.
+    :param workers: number of worker processes in use.
+    :return: (new config, list of collectors) or None if the new
+        configuration is broken, in which case the old one stays in effect.
+    """
+    # NOTE(aovchinnikov): configuration problems stop the program at start,
+    # but not while it is running, thus SystemExit of utils.load() is caught.
+    new_config = ConfigParser.SafeConfigParser()
+    try:
+        if utils.file_has_problems(cliargs.config):
+            raise ValueError("can not read %s" % cliargs.config)
+        new_config.read([cliargs.config])
+        utils.update_config_from_cli_arguments(new_config, cliargs)
+        # NOTE(aovchinnikov): fresh collectors must support worker processes
+        # if those are in use, which is checked before any of the running
+        # collectors is reconfigured.
+        check = ((lambda c: c.merge_partial(c.take_partial())) if workers > 0
+                 else None)
+        new_collectors = utils.reload(config, new_config, 'collectors',
+                                      _collectors, collectors, check=check)
+    except (ConfigParser.Error, NotImplementedError, ValueError,
+            SystemExit) as e:
+        sys.stderr.write("WARNING: Configuration is not reloaded: %s\n" % e)
+        sys.stderr.flush()
+        return None
+    changed = [x for x in restart_options
+               if utils.get_option(config, 'DEFAULT', x, '') !=
+               utils.get_option(new_config, 'DEFAULT', x, '')]
+    if changed:
+        sys.stderr.write("WARNING: A restart is needed to apply %s\n" %
+                         ', '.join(changed))
+        sys.stderr.flush()
+    return new_config, new_collectors
+
 
 def main():
+    global config
+
     # Graceful interruption handler.
     def quit(signum, frame):
         """ Handler to catch interrupting signals.
@@ -70,7 +168,17 @@ def main():
         sys.stderr.write("\nInterrupted by %s, exiting.\n" % sig_names[signum])
         sys.stderr.flush()
         exit.set()
-    exit = threading.Event()
+        if watcher is not None:
+            watcher.wake()
+
+    def hup(signum, frame):
+        """ Handler to catch SIGHUP while logs are being followed.
+
+        :side-effects: Requests configuration reload.
+        """
+        reload_requested.set()
+    exit, watcher = threading.Event(), None
+    reload_requested = threading.Event()
     for s in sig_names.values():
         signal.signal(getattr(signal, s), quit)
 
@@ -80,29 +188,138 @@ def main():
     display = utils.load(config, 'representer', representers,
                          args=[collectors])[0]
     check_interval = config.getint('DEFAULT', 'check_interval')
-    fname = config.get('DEFAULT', 'log_file')
-    sys.exit(1) if utils.file_has_problems(fname) else just_continue
+    patterns = [x.strip() for x in config.get('DEFAULT',
+                                              'log_file').split(',')]
+    for fname in patterns:
+        if not tail.glob_ptr.search(fname) and utils.file_has_problems(fname):
+            sys.exit(1)
 
-    # The processing itself.
-    with open(fname, 'r') as f:
-        f.seek(0, 2)  # Ignore historic data.
-        display.show_stats()
-        while True and not exit.is_set():
-            start = datetime.datetime.now()
-            data = list(filter(None, [utils.parse_line(x) for x in
-                                      utils.get_fresh_events(f)]))
+    buffer_size = utils.get_option(config, 'DEFAULT', 'read_buffer_size',
+                                   tail.DEFAULT_BUFFER_SIZE)
+    watch_mode = utils.get_option(config, 'DEFAULT', 'watch_mode', 'auto')
+    state_file = utils.get_option(config, 'DEFAULT', 'state_file', '')
+    state_save_interval = utils.get_option(config, 'DEFAULT',
+                                           'state_save_interval', 10)
+    rescan_interval = utils.get_option(config, 'DEFAULT', 'rescan_interval',
+                                       10)
+    positions = tail.load_positions(state_file) if state_file else {}
+    workers = utils.get_option(config, 'DEFAULT', 'workers', 0)
+    if workers > 0:
+        try:
             for collector in collectors:
-                for line in data:
-                    collector.process_line(line)
-            duration = (datetime.datetime.now() - start).total_seconds()
-            to_wait = check_interval - duration
-            if to_wait > 0:
-                exit.wait(to_wait)
-            else:
-                sys.stderr.write("WARNING: too many events! Can not process"
-                                 " them in %d second(s)!\n" % check_interval)
-                sys.stderr.flush()
-            display.tick()
+                collector.merge_partial(collector.take_partial())
+        except NotImplementedError as e:
+            sys.stderr.write("ERROR: %s\n" % e)
+            sys.exit(1)
+
+    store_dir = utils.get_option(config, 'DEFAULT', 'store_dir', '')
+    sink = None
+    if store_dir:
+        sink = store.StoreSink(store_dir, utils.get_option(
+            config, 'DEFAULT', 'store_top_k', 5))
+        display.add_sink(sink)
+
+    if utils.get_option(config, 'DEFAULT', 'replay', False):
+        display.live = False
+        replay.replay(config, collectors, display, replay.expand(patterns),
+                      workers, buffer_size, exit)
+        if sink is not None:
+            sink.close()
+        return
+
+    snapshot_file = utils.get_option(config, 'DEFAULT', 'snapshot_file', '')
+    snapshot_interval = utils.get_option(config, 'DEFAULT',
+                                         'snapshot_interval', 60)
+    if snapshot_file:
+        snapshot.restore(snapshot_file, config, collectors, utils.get_option(
+            config, 'DEFAULT', 'snapshot_max_age', 300))
+
+    pool = pipeline.WorkerPool(config, workers) if workers > 0 else None
+    signal.signal(signal.SIGHUP, hup)
+
+    queue = pipeline.BoundedQueue(
+        utils.get_option(config, 'DEFAULT', 'queue_size', 64),
+        utils.get_option(config, 'DEFAULT', 'queue_policy', 'block'),
+        utils.get_option(config, 'DEFAULT', 'queue_sample_ratio', 10))
+    display.add_monitor(queue)
+
+    # The processing itself.
+    # NOTE(aovchinnikov): reading is driven by the watcher (file change
+    # notifications or check_interval polling) in a thread of its own,
+    # collectors are fed in another thread, while clock pulses follow their
+    # own schedule in the main thread, so that neither a busy nor an idle log
+    # affects the pace of statistics.
+    lock = threading.Lock()
+    try:
+        with tail.MultiTail(patterns, buffer_size, positions) as tails:
+            watcher = watchers.make_watcher(tails.fnames, watch_mode,
+                                            check_interval)
+            reader = pipeline.Reader(tails, watcher, queue, exit,
+                                     rescan_interval)
+            # Files which get no fresh data before the first save keep their
+            # positions.
+            positions.update((t.fname, t.position) for t in tails)
+            parse = pipeline.get_parser(config, collectors)
+            processor = pipeline.Processor(collectors, queue, lock, pool,
+                                           parse, positions)
+            positions = processor.positions
+            display.show_stats()
+            reader.start()
+            processor.start()
+            ticker = scheduler.Ticker(tick_interval)
+            next_save = scheduler.monotonic() + state_save_interval
+            next_snapshot = scheduler.monotonic() + snapshot_interval
+            while True and not exit.is_set():
+                exit.wait(ticker.timeout())
+                due = ticker.due()
+                if due:
+                    # Missed pulses are sent too, so that collectors account
+                    # for every second (the missed ones simply see no new
+                    # events).
+                    with lock:
+                        for _ in range(due):
+                            display.tick()
+                if due > 1:
+                    sys.stderr.write("WARNING: %d clock pulses were late!\n" %
+                                     (due - 1))
+                    sys.stderr.flush()
+                if reload_requested.is_set():
+                    reload_requested.clear()
+                    with lock:
+                        reloaded = reload_config(collectors, workers)
+                        if reloaded is not None:
+                            config, collectors[:] = reloaded
+                            display.reconfigure(config, collectors)
+                            processor.parse = pipeline.get_parser(config,
+                                                                  collectors)
+                            if pool is not None:
+                                # Workers have collectors of their own.
+                                pool = pipeline.WorkerPool(config, workers)
+                                processor.replace_pool(pool)
+                now = scheduler.monotonic()
+                if state_file and now >= next_save:
+                    with lock:
+                        tail.save_positions(state_file, positions)
+                    next_save = now + state_save_interval
+                if snapshot_file and now >= next_snapshot:
+                    with lock:
+                        snapshot.save(snapshot_file, config, collectors)
+                    next_snapshot = now + snapshot_interval
+            queue.close()
+            reader.join()
+            processor.join()
+            if state_file:
+                tail.save_positions(state_file, positions)
+            if snapshot_file:
+                snapshot.save(snapshot_file, config, collectors)
+    finally:
+        if watcher is not None:
+            watcher.close()
+    if pool is not None:
+        pool.close()
+    if sink is not None:
+        sink.close()
+
 
 if __name__ == '__main__':
     main()
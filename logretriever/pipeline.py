@@ -0,0 +1,414 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+""" Processing of fresh log data: parsing and feeding collectors."""
+
+import collections
+import multiprocessing
+import re
+import signal
+import threading
+import time
+
+from . import collectors as _collectors
+from . import columns
+from . import utils
+
+
+# Chunks smaller than that are not worth splitting between workers.
+MIN_PIECE_SIZE = 1 << 16
+
+eol_ptr = re.compile(b'\n')
+
+
+def required_fields(collectors):
+    """ Collects fields needed by any of collectors.
+
+    :param collectors: list of collector objects.
+    :return: set of field names or None if all the fields are needed.
+    """
+    fields = set()
+    for collector in collectors:
+        if collector.required_fields is None:
+            return None
+        fields.update(collector.required_fields)
+    return fields
+
+
+def get_parser(config, collectors):
+    """ Builds a chunk parser according to configuration and collectors.
+
+    The parser extracts only the fields collectors need.
+    :param config: initialized ConfigParser object.
+    :param collectors: list of collector objects.
+    :return: LogBatch parser if batch_format is 'columns', log_line parser
+        otherwise.
+    """
+    batch_format = utils.get_option(config, 'DEFAULT', 'batch_format', 'rows')
+    make_parser = (columns.make_parser if batch_format == 'columns' else
+                   utils.make_parser)
+    return make_parser(required_fields(collectors))
+
+
+def process_chunk(collectors, chunk, source=None, parse=utils.parse_chunk):
+    """ Parses a chunk of log lines and feeds them to collectors.
+
+    :param collectors: list of collector objects.
+    :param chunk: a string or a bytes-like object with complete lines.
+    :param source: name of a file the chunk came from.
+    :param parse: chunk parser to use (see get_parser()).
+    :return: None
+    """
+    data = parse(chunk, source)
+    for collector in collectors:
+        collector.process_batch(data)
+
+
+def split_chunk(chunk, parts, min_size=MIN_PIECE_SIZE):
+    """ Splits a chunk of complete lines into pieces on line boundaries.
+
+    :param chunk: a bytes-like object ending with a newline.
+    :param parts: desired number of pieces.
+    :param min_size: minimum size of a piece (except the last one).
+    :return: list of bytes objects. Pieces are copied out of the chunk so
+        that they outlive the buffer it belongs to.
+    """
+    data = memoryview(chunk)
+    step = max(len(data) // parts, min_size)
+    pieces, start = [], 0
+    while start < len(data):
+        end = start + step
+        if end >= len(data):
+            end = len(data)
+        else:
+            eol = eol_ptr.search(data, end - 1)
+            end = len(data) if eol is None else eol.end()
+        pieces.append(data[start:end].tobytes())
+        start = end
+    return pieces
+
+
+# Collectors and parser of a worker process, set once by _init_worker().
+_worker_collectors = []
+_worker_parse = utils.parse_chunk
+
+
+def _init_worker(config):
+    global _worker_collectors, _worker_parse
+    # Interruption is handled by the main process which stops the pool.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for name in ('SIGHUP', 'SIGTERM'):
+        signal.signal(getattr(signal, name), signal.SIG_DFL)
+    _worker_collectors = utils.load(config, 'collectors', _collectors)
+    _worker_parse = get_parser(config, _worker_collectors)
+
+
+def _process_in_worker(task):
+    source, chunk = task
+    process_chunk(_worker_collectors, chunk, source, _worker_parse)
+    return [c.take_partial() for c in _worker_collectors]
+
+
+class WorkerPool(object):
+    """ A pool of processes parsing log lines and running collectors.
+
+    Every worker has its own set of collectors configured the same way as the
+    ones in the main process. Fresh data is split into pieces on line
+    boundaries, each piece is processed by some worker and partial state of
+    its collectors (see BaseCollector.take_partial()) is sent back. Partial
+    states are merged into the main collectors in the order of the pieces,
+    so the result is the same as if all the lines were processed in the
+    main process.
+    """
+
+    def __init__(self, config, workers):
+        """ :param config: initialized ConfigParser object.
+        :param workers: number of worker processes.
+        """
+        super(WorkerPool, self).__init__()
+        self.workers = workers
+        self.pool = multiprocessing.Pool(workers, _init_worker, (config,))
+
+    def _tasks(self, chunks):
+        for source, chunk in chunks:
+            for piece in split_chunk(chunk, self.workers):
+                yield source, piece
+
+    def process(self, collectors, chunks):
+        """ Processes chunks and merges the results into collectors.
+
+        :param collectors: list of collectors of the main process.
+        :param chunks: iterable of (source, chunk) pairs, e.g.
+            MultiTail.read_chunks().
+        :return: None, returns when all the chunks have been merged.
+        """
+        self.merge(collectors, self.pool.imap(_process_in_worker,
+                                              self._tasks(chunks)))
+
+    def compute(self, chunks):
+        """ Processes chunks without touching collectors of the main process.
+
+        :param chunks: iterable of (source, chunk) pairs.
+        :return: list of partial states of worker collectors, a list per
+            piece, to be merged with merge().
+        """
+        return self.pool.map(_process_in_worker, self._tasks(chunks))
+
+    @staticmethod
+    def merge(collectors, results):
+        """ Merges results of compute() into collectors, in order.
+
+        :param collectors: list of collectors of the main process.
+        :param results: iterable of lists of partial states.
+        """
+        for partials in results:
+            for collector, partial in zip(collectors, partials):
+                collector.merge_partial(partial)
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+
+class BoundedQueue(object):
+    """ A bounded queue of chunks between the reader and the processor.
+
+    The policy defines what happens when the reader outpaces the processor
+    and the queue is full:
+     * 'block' makes the reader wait (and the log wait in page cache);
+     * 'drop-oldest' discards the oldest queued chunk to make room;
+     * 'sample' discards incoming chunks except every sample_ratio-th one,
+       which replaces the oldest queued chunk.
+    Whatever is discarded is accounted for, so that an overload is visible
+    as a metric rather than as distorted rates.
+    """
+
+    policies = ('block', 'drop-oldest', 'sample')
+    stat_msg = "Read queue: %d/%d chunks, %d lines dropped"
+
+    def __init__(self, maxsize, policy='block', sample_ratio=10):
+        """ :param maxsize: maximum number of queued chunks.
+        :param policy: one of policies.
+        :param sample_ratio: one of how many chunks to keep when sampling.
+        :raises: ValueError on unknown policy.
+        """
+        super(BoundedQueue, self).__init__()
+        if policy not in self.policies:
+            raise ValueError("Unknown queue policy: %s" % policy)
+        self.maxsize = maxsize
+        self.policy = policy
+        self.sample_ratio = sample_ratio
+        self.items = collections.deque()
+        self.cond = threading.Condition()
+        self.closed = False
+        self.overflows = 0
+        self.dropped_chunks = self.dropped_lines = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def _drop(self, lines):
+        self.dropped_chunks += 1
+        self.dropped_lines += lines
+
+    def put(self, item, lines):
+        """ Enqueues an item according to the policy.
+
+        :param item: an item to enqueue.
+        :param lines: number of log lines in the item (for accounting).
+        :return: None
+        """
+        with self.cond:
+            if self.policy == 'block':
+                while len(self.items) >= self.maxsize and not self.closed:
+                    self.cond.wait()
+            elif len(self.items) >= self.maxsize:
+                self.overflows += 1
+                if (self.policy == 'sample' and
+                        self.overflows % self.sample_ratio):
+                    self._drop(lines)
+                    return
+                self._drop(self.items.popleft()[1])
+            if self.closed:
+                return
+            self.items.append((item, lines))
+            self.cond.notify_all()
+
+    def get(self):
+        """ Dequeues an item, waiting for it if necessary.
+
+        :return: an item or None if the queue is closed and empty.
+        """
+        with self.cond:
+            while not self.items and not self.closed:
+                self.cond.wait()
+            if not self.items:
+                return None
+            item = self.items.popleft()[0]
+            self.cond.notify_all()
+            return item
+
+    def drain(self):
+        """ Dequeues all the items available without waiting."""
+        with self.cond:
+            items = [x[0] for x in self.items]
+            self.items.clear()
+            self.cond.notify_all()
+            return items
+
+    def close(self):
+        """ Wakes everybody up, no more items are accepted after that."""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def get_stats(self):
+        return self.stat_msg % (len(self.items), self.maxsize,
+                                self.dropped_lines)
+
+
+class Reader(threading.Thread):
+    """ Thread which reads fresh data from logs into a queue.
+
+    Reading is driven by a watcher (see watchers.py). Patterns of followed
+    files are expanded again every rescan_interval seconds.
+    """
+
+    def __init__(self, tails, watcher, queue, stop, rescan_interval):
+        """ :param tails: tail.MultiTail object.
+        :param watcher: a watcher for the followed files.
+        :param queue: BoundedQueue to put (source, chunk, position) into.
+        :param stop: threading.Event signalling the thread to finish.
+        :param rescan_interval: seconds between two rescans of patterns.
+        """
+        super(Reader, self).__init__(name='reader')
+        self.daemon = True
+        self.tails = tails
+        self.watcher = watcher
+        self.queue = queue
+        self.stop = stop
+        self.rescan_interval = rescan_interval
+
+    def run(self):
+        next_rescan = time.time() + self.rescan_interval
+        while not self.stop.is_set():
+            for source, chunk in self.tails.read_chunks():
+                # NOTE(aovchinnikov): chunks share the buffer of their tail,
+                # thus a chunk has to be copied before being queued.
+                data = chunk.tobytes()
+                self.queue.put((source, data,
+                                self.tails.tails[source].position),
+                               data.count(b'\n'))
+                if self.stop.is_set():
+                    break
+            now = time.time()
+            if now >= next_rescan:
+                for fname in self.tails.rescan():
+                    self.watcher.watch(fname)
+                next_rescan = now + self.rescan_interval
+            self.watcher.wait(next_rescan - time.time())
+
+
+class Processor(threading.Thread):
+    """ Thread which feeds queued chunks to collectors.
+
+    Collectors are only touched while holding the lock, which is shared with
+    whoever sends clock pulses to them. Chunks are parsed (or processed by
+    workers) before the lock is taken, so that a large batch delays pulses
+    only by the time it takes to feed collectors. Positions of processed
+    data (as opposed to data which has been merely read) are kept for
+    saving. A pool replaced while it is processing chunks (see
+    replace_pool()) is closed once it is done with them.
+    """
+
+    def __init__(self, collectors, queue, lock, pool=None,
+                 parse=utils.parse_chunk, positions=None):
+        """ :param collectors: list of collector objects.
+        :param queue: BoundedQueue to get (source, chunk, position) from.
+        :param lock: a lock guarding collectors.
+        :param pool: optional WorkerPool to process chunks with.
+        :param parse: chunk parser to use when there is no pool.
+        :param positions: positions to start with, e.g. saved ones along with
+            the ones of followed files, so that files which get no fresh data
+            keep their positions.
+        """
+        super(Processor, self).__init__(name='processor')
+        self.daemon = True
+        self.collectors = collectors
+        self.queue = queue
+        self.lock = lock
+        self.pool = pool
+        self.parse = parse
+        self.positions = dict(positions or {})
+        self.computing = None  # The pool processing chunks at the moment.
+        self.retired = []  # Replaced pools to close once they are idle.
+
+    def replace_pool(self, pool):
+        """ Makes chunks be processed with another pool from now on.
+
+        Must be called holding the lock. The old pool is closed right away
+        if it is idle, otherwise it is closed by the processor as soon as it
+        returns: a pool terminated in the middle of map() never returns.
+        """
+        old, self.pool = self.pool, pool
+        if old is None:
+            return
+        if old is self.computing:
+            self.retired.append(old)
+        else:
+            old.close()
+
+    def _close_retired(self):
+        with self.lock:
+            retired, self.retired = self.retired, []
+        for pool in retired:
+            pool.close()
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self._close_retired()
+                return
+            items = [item] + self.queue.drain()
+            # NOTE(aovchinnikov): the parser and the pool may be replaced
+            # under the lock (configuration reload), thus they are taken
+            # along with the collectors they have been made for.
+            with self.lock:
+                collectors, pool, parse = (list(self.collectors), self.pool,
+                                           self.parse)
+                self.computing = pool
+            if pool is None:
+                results = [parse(chunk, source)
+                           for source, chunk, _ in items]
+            else:
+                results = pool.compute((x[0], x[1]) for x in items)
+            with self.lock:
+                self.computing = None
+                if collectors != self.collectors or pool is not self.pool:
+                    # Reloaded meanwhile, results may not suit the new
+                    # collectors, thus the chunks are processed anew.
+                    self._process(items)
+                elif pool is None:
+                    for data in results:
+                        for collector in collectors:
+                            collector.process_batch(data)
+                else:
+                    pool.merge(collectors, results)
+                for source, _, position in items:
+                    self.positions[source] = position
+            self._close_retired()
+
+    def _process(self, items):
+        if self.pool is None:
+            for source, chunk, _ in items:
+                process_chunk(self.collectors, chunk, source, self.parse)
+        else:
+            self.pool.process(self.collectors, ((x[0], x[1]) for x in items))
@@ -0,0 +1,122 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+""" Queries statistics saved by logretriever (see store.py)."""
+
+from __future__ import print_function
+
+import argparse
+import calendar
+import collections
+# NOTE(aovchinnikov): the try-block below ensures interoperability between
+# Py2 and Py3.
+try:
+    import ConfigParser
+except ImportError:
+    import configparser as ConfigParser
+import os
+import sys
+import time
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))))
+from logretriever import store
+from logretriever import utils
+
+
+time_formats = ('%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d')
+
+
+def parse_time(value):
+    """ Parses seconds since the epoch or a UTC date and time.
+
+    :raises: argparse.ArgumentTypeError for unrecognized values.
+    """
+    if value.isdigit():
+        return int(value)
+    for fmt in time_formats:
+        try:
+            return calendar.timegm(time.strptime(value, fmt))
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError("Unrecognized time: %s" % value)
+
+
+def format_time(timestamp):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(timestamp))
+
+
+def summarize(records):
+    """ Aggregates records.
+
+    :param records: iterable of (timestamp, interval, hits, sections).
+    :return: (seconds covered, hits, collections.Counter of section hits).
+        Note, that only top sections of every interval are stored, thus
+        section hits are lower bounds.
+    """
+    seconds = hits = 0
+    sections = collections.Counter()
+    for _, interval, count, top in records:
+        seconds += interval
+        hits += count
+        sections.update(dict(top))
+    return seconds, hits, sections
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="Query statistics saved by logretriever.")
+    parser.add_argument('--config', default='/etc/logretriever/config.cfg',
+                        help="Configuration file to take store_dir from.")
+    parser.add_argument('--store_dir',
+                        help="Directory with saved statistics, overrides"
+                        " the one from configuration file.")
+    parser.add_argument('--from', dest='start', type=parse_time,
+                        required=True,
+                        help="Start of the period, seconds since the epoch"
+                        " or YYYY-mm-ddTHH:MM:SS (UTC).")
+    parser.add_argument('--to', dest='end', type=parse_time,
+                        default=int(time.time()) + 1,
+                        help="End of the period (exclusive), now by"
+                        " default.")
+    parser.add_argument('--top', type=int, default=5,
+                        help="Number of most hit sections to show.")
+    parser.add_argument('--list', action='store_true',
+                        help="Show every saved interval as well.")
+    args = parser.parse_args(args)
+
+    store_dir = args.store_dir
+    if store_dir is None:
+        config = ConfigParser.RawConfigParser()
+        config.read([args.config])
+        store_dir = utils.get_option(config, 'DEFAULT', 'store_dir', '')
+    if not store_dir or not os.path.isdir(store_dir):
+        sys.stderr.write("ERROR: No statistics found, see store_dir option\n")
+        return 1
+
+    records = list(store.query(store_dir, args.start, args.end))
+    if args.list:
+        for timestamp, interval, hits, sections in records:
+            print("%s %ds: %d hits, %s" % (
+                format_time(timestamp), interval, hits,
+                ', '.join('%s %d' % x for x in sections) or '-'))
+    seconds, hits, sections = summarize(records)
+    print("Between %s and %s (%d intervals saved):" % (
+        format_time(args.start), format_time(args.end), len(records)))
+    print("Hits: %d, hit rate: %.2f per second" % (
+        hits, float(hits) / seconds if seconds else 0.0))
+    print("%d most hit sections: %s" % (args.top, ', '.join(
+        '%s %d' % x for x in sections.most_common(args.top)) or '-'))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
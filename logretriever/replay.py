@@ -0,0 +1,268 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+""" Replaying complete logs as if they were being tailed live.
+
+Instead of the wall clock, time is taken from log line timestamps: a clock
+pulse is sent every time the log moves on to the next second, so collectors
+and representers see the same sequence of events and pulses as they would
+have seen tailing the log while it was being written (with the exception of
+write delays, which are not in the log). Lines with unparsable timestamps
+are accounted for in the current second.
+
+Logs can be processed by worker processes in parallel: a log is split into
+byte ranges ending at line boundaries, every worker processes a range and
+returns partial state of its collectors (see BaseCollector.take_partial())
+for every second of the range. Partial states are merged into the
+collectors of the main process in log order with clock pulses in between.
+Compressed logs (see archives.py) can not be split, instead every one of
+them is decompressed and processed by a worker of its own.
+"""
+
+import glob
+import itertools
+import multiprocessing
+import operator
+import os
+
+from . import archives
+from . import pipeline
+from . import utils
+
+
+# Ranges larger than that are split further, so that workers' results do not
+# take too much memory and keep coming while a large log is replayed.
+MAX_RANGE_SIZE = 1 << 25
+
+
+def split_file(fname, parts, max_size=MAX_RANGE_SIZE):
+    """ Splits a file into byte ranges which end right after a newline.
+
+    :param fname: file name.
+    :param parts: minimum number of ranges to split a file into, the file is
+        split into more ranges if they exceed max_size.
+    :param max_size: desired maximum range size in bytes.
+    :return: list of (start, end) offsets, empty ranges excluded.
+    """
+    size = os.path.getsize(fname)
+    count = max(parts, -(-size // max_size))
+    bounds = [0]
+    with open(fname, 'rb') as f:
+        for i in range(1, count):
+            pos = size * i // count
+            if pos <= bounds[-1]:
+                continue
+            # Stepping back one byte keeps a range ending right at a newline
+            # intact.
+            f.seek(pos - 1)
+            f.readline()
+            bounds.append(f.tell())
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+def read_range(fname, start, end, buffer_size):
+    """ Reads a byte range of a log in chunks of complete lines.
+
+    :param fname: file name.
+    :param start: offset of the range, must be the start of a line.
+    :param end: offset right after the range, must be the start of a line or
+        the end of the file.
+    :param buffer_size: maximum number of bytes to read at once. Chunks may
+        be larger if lines are.
+    :return: generator of bytes objects.
+    """
+    with archives.open_log(fname, buffer_size) as f:
+        f.seek(start)
+        for chunk in archives.read_lines(f, buffer_size, end - start):
+            yield chunk
+
+
+def read_log(fname, buffer_size):
+    """ Reads a whole plain or compressed log in chunks of complete lines."""
+    with archives.open_log(fname, buffer_size) as f:
+        for chunk in archives.read_lines(f, buffer_size):
+            yield chunk
+
+
+def iter_seconds(chunks, parse):
+    """ Groups parsed lines by consecutive timestamps.
+
+    :param chunks: iterable of chunks of complete lines.
+    :param parse: function turning a chunk into a list of utils.log_line
+        objects with dates.
+    :return: generator of (second, lines) pairs, where second is a timestamp
+        in seconds since the epoch (None if it can not be parsed) and lines
+        is a list of consecutive lines logged during that second.
+    """
+    for chunk in chunks:
+        for date, lines in itertools.groupby(parse(chunk),
+                                             operator.attrgetter('date')):
+            yield utils.parse_clf_date(date), list(lines)
+
+
+def get_parser(collectors):
+    """ Builds a parser extracting fields collectors need and dates."""
+    fields = pipeline.required_fields(collectors)
+    return utils.make_parser(None if fields is None else fields | {'date'})
+
+
+class Replay(object):
+    """ The clock of a log being replayed.
+
+    Keeps track of the second the log is at and sends clock pulses to the
+    representer when the log moves on.
+    """
+
+    def __init__(self, display, collectors):
+        """ :param display: representer object.
+        :param collectors: list of collector objects, their clocks and the
+            one of display are set to the log time.
+        """
+        super(Replay, self).__init__()
+        self.display = display
+        self.collectors = collectors
+        self.second = None
+        display.set_clock(self.clock)
+        for collector in collectors:
+            collector.set_clock(self.clock)
+
+    def clock(self):
+        return self.second or 0
+
+    def advance(self, second):
+        """ Moves the clock to the given second, sending a pulse for every
+        second passed. Seconds in the past and None are ignored.
+        """
+        if second is None:
+            return
+        if self.second is None:
+            self.second = second
+        while self.second < second:
+            self.second += 1
+            self.display.tick()
+
+    def finish(self):
+        """ Completes the last second and shows final stats."""
+        if self.second is None:
+            return
+        self.second += 1
+        # NOTE(aovchinnikov): a pulse of the representer shows stats before
+        # collectors get it, thus the last second would be missed. Instead
+        # collectors get the last pulse directly and stats of the last
+        # interval are shown once.
+        for collector in self.collectors:
+            collector.tick()
+        self.display.show_stats()
+
+
+# Collectors and parser of a worker process, set once by _init_worker().
+_worker_collectors = []
+_worker_parse = None
+
+
+def _init_worker(config):
+    global _worker_collectors, _worker_parse
+    pipeline._init_worker(config)
+    _worker_collectors = pipeline._worker_collectors
+    _worker_parse = get_parser(_worker_collectors)
+
+
+def _replay_in_worker(task):
+    fname, start, end, buffer_size = task
+    if start is None:
+        chunks = read_log(fname, buffer_size)
+    else:
+        chunks = read_range(fname, start, end, buffer_size)
+    out = []
+    for second, lines in iter_seconds(chunks, _worker_parse):
+        for collector in _worker_collectors:
+            collector.process_batch(lines)
+        out.append((second, [c.take_partial() for c in _worker_collectors]))
+    return out
+
+
+def rotation_key(fname):
+    """ Returns a key putting rotated logs in order of time.
+
+    Rotated copies of a log (access.log.2.gz, access.log.1, access.log) are
+    ordered by rotation number, the highest (thus the oldest) first and the
+    log itself last. Other logs are ordered by name.
+    """
+    name, ext = os.path.splitext(fname)
+    if not archives.is_archive(fname):
+        name, ext = fname, ''
+    base, suffix = os.path.splitext(name)
+    if suffix[1:].isdigit():
+        return base, -int(suffix[1:]), ext
+    return name, 0, ext
+
+
+def expand(patterns):
+    """ Turns log names and glob patterns into a list of existing logs.
+
+    Logs matching a pattern are sorted in order of time (see rotation_key()).
+    """
+    fnames = []
+    for pattern in patterns:
+        for fname in sorted(glob.glob(pattern), key=rotation_key):
+            if fname not in fnames:
+                fnames.append(fname)
+    return fnames
+
+
+def replay(config, collectors, display, fnames, workers=0,
+           buffer_size=1 << 20, stop=None):
+    """ Replays logs one after another.
+
+    :param config: initialized ConfigParser object, used to set up workers.
+    :param collectors: list of collector objects.
+    :param display: representer object.
+    :param fnames: list of log names.
+    :param workers: number of worker processes, 0 to process the logs in the
+        main process. Collectors must support take_partial() and
+        merge_partial() for workers to be used.
+    :param buffer_size: maximum number of bytes to read at once.
+    :param stop: threading.Event to interrupt replaying.
+    :return: None
+    """
+    clock = Replay(display, collectors)
+    stopped = stop.is_set if stop is not None else lambda: False
+    if workers > 0:
+        tasks = []
+        for fname in fnames:
+            if archives.is_archive(fname):
+                tasks.append((fname, None, None, buffer_size))
+                continue
+            tasks.extend((fname, start, end, buffer_size) for start, end
+                         in split_file(fname, workers, MAX_RANGE_SIZE))
+        pool = multiprocessing.Pool(workers, _init_worker, (config,))
+        try:
+            for result in pool.imap(_replay_in_worker, tasks):
+                for second, partials in result:
+                    clock.advance(second)
+                    for collector, partial in zip(collectors, partials):
+                        collector.merge_partial(partial)
+                if stopped():
+                    return
+        finally:
+            pool.terminate()
+            pool.join()
+    else:
+        parse = get_parser(collectors)
+        for fname in fnames:
+            for second, lines in iter_seconds(read_log(fname, buffer_size),
+                                              parse):
+                clock.advance(second)
+                for collector in collectors:
+                    collector.process_batch(lines)
+                if stopped():
+                    return
+    clock.finish()
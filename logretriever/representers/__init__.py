@@ -9,5 +9,6 @@
 # http://creativecommons.org/licenses/by-nc-nd/4.0/
 
 from .simple_representer import SimpleStatsRepresenter
+from .terminal_representer import TerminalRepresenter
 
-__all__ = ['SimpleStatsRepresenter']
+__all__ = ['SimpleStatsRepresenter', 'TerminalRepresenter']
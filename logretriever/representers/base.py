@@ -12,6 +12,7 @@
 
 import abc
 import os
+import time
 
 
 class BaseRepresenter(object):
@@ -31,8 +32,17 @@ class BaseRepresenter(object):
         :param collectors: a list of collector objects.
         """
         super(BaseRepresenter, self).__init__()
+        if not config.has_section(self.config_section):
+            self.config_section = 'DEFAULT'
         self.count = 0
         self.collectors = collectors
+        self.monitors = []
+        # Whether stats are shown as they are collected. When a log is
+        # replayed (see replay.py) a representer is expected to keep the
+        # history of stats rather than update them in place.
+        self.live = True
+        self.sinks = []
+        self.clock = time.time
         self.stats_period = config.getint(self.config_section,
                                           'statistics_interval')
 
@@ -47,10 +57,49 @@ class BaseRepresenter(object):
         self.count += 1
         if self.count == self.stats_period:
             self.count = 0
+            # Sinks go first as stats may be reset once they are shown.
+            for sink in self.sinks:
+                sink.write(self.clock(), self.stats_period, self.collectors)
             self.show_stats()
         for c in self.collectors:
             c.tick()
 
+    def reconfigure(self, config, collectors):
+        """ Applies reloaded configuration.
+
+        :param config: initialized ConfigParser object.
+        :param collectors: a list of collector objects, configured with the
+            new configuration (see utils.reload()).
+        """
+        self.collectors = collectors
+        self.stats_period = config.getint(self.config_section,
+                                          'statistics_interval')
+        # A shorter period which has already passed ends with the next pulse.
+        self.count = min(self.count, self.stats_period - 1)
+
+    def add_monitor(self, monitor):
+        """ Adds a source of metrics about the tool itself.
+
+        Monitors (e.g. a queue of fresh data) are displayed along with
+        collectors, but do not collect anything from the log.
+        :param monitor: an object with get_stats() method.
+        """
+        self.monitors.append(monitor)
+
+    def add_sink(self, sink):
+        """ Adds a destination to save stats of every interval to.
+
+        :param sink: an object with write(timestamp, interval, collectors)
+            method, e.g. store.StoreSink.
+        """
+        self.sinks.append(sink)
+
+    def set_clock(self, clock):
+        """ Replaces the source of current time (see
+        BaseCollector.set_clock()).
+        """
+        self.clock = clock
+
     @abc.abstractmethod
     def alarm_callback(self, alarm):
         """ A handle used by collectors to inform about an alarm (if any)."""
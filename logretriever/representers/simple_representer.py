@@ -32,8 +32,16 @@ class SimpleStatsRepresenter(BaseRepresenter):
         self.alarms = [''] * config.getint(self.config_section,
                                            'alarms_to_keep_track_of')
 
+    def reconfigure(self, config, collectors):
+        super(SimpleStatsRepresenter, self).reconfigure(config, collectors)
+        for c in self.collectors:
+            c.set_alarm_callback(self.alarm_callback)
+        size = config.getint(self.config_section, 'alarms_to_keep_track_of')
+        self.alarms = ([''] * size + self.alarms)[-size:]
+
     def _clear_screen(self):
-        os.system('cls||clear')
+        if self.live:
+            os.system('cls||clear')
 
     def alarm_callback(self, alarm):
         if alarm not in self.alarms:
@@ -52,3 +60,5 @@ class SimpleStatsRepresenter(BaseRepresenter):
         print("-"*30)
         for collector in self.collectors:
             print(collector.get_stats())
+        for monitor in self.monitors:
+            print(monitor.get_stats())
@@ -0,0 +1,178 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+import os
+import sys
+# NOTE(aovchinnikov): curses is missing on some platforms (e.g. Windows), it
+# is only used to look up control sequences, ANSI ones work without it.
+try:
+    import curses
+except ImportError:
+    curses = None
+
+from .base import BaseRepresenter
+from .. import utils
+
+
+class Terminal(object):
+    """ Control sequences of a terminal.
+
+    Sequences are taken from terminfo with curses when it is available and
+    knows the terminal, ANSI (VT100) ones are used otherwise. The screen is
+    not taken over, thus scrollback and Ctrl+C work as usual.
+    """
+
+    ansi = {'cup': '\x1b[%d;%dH', 'el': '\x1b[K', 'ed': '\x1b[J',
+            'clear': '\x1b[H\x1b[2J'}
+
+    def __init__(self, stream):
+        """ :param stream: a file object the terminal is written through."""
+        super(Terminal, self).__init__()
+        self.moves = {}
+        self.cup = None
+        self.el, self.ed, self.clear = (self.ansi['el'], self.ansi['ed'],
+                                        self.ansi['clear'])
+        if curses is None:
+            return
+        try:
+            curses.setupterm(fd=stream.fileno())
+            sequences = [curses.tigetstr(x) for x in ('cup', 'el', 'ed',
+                                                      'clear')]
+        except (curses.error, AttributeError, ValueError, OSError):
+            return
+        if None not in sequences:
+            self.cup = sequences[0]
+            self.el, self.ed, self.clear = [x.decode('latin-1')
+                                            for x in sequences[1:]]
+
+    def move(self, row):
+        """ Returns a sequence moving the cursor to the start of a row."""
+        move = self.moves.get(row)
+        if move is None:
+            if self.cup is not None:
+                move = curses.tparm(self.cup, row, 0).decode('latin-1')
+            else:
+                move = self.ansi['cup'] % (row + 1, 1)
+            self.moves[row] = move
+        return move
+
+
+def terminal_size(stream):
+    """ Returns (columns, rows) of the terminal behind a stream."""
+    try:
+        size = os.get_terminal_size(stream.fileno())
+        # NOTE(aovchinnikov): a pseudo-terminal nobody has set the size of
+        # reports zeros.
+        if size.columns and size.lines:
+            return size.columns, size.lines
+    except (AttributeError, ValueError, OSError):
+        pass
+    try:
+        return (int(os.environ.get('COLUMNS', 80)),
+                int(os.environ.get('LINES', 24)))
+    except ValueError:
+        return 80, 24
+
+
+class TerminalRepresenter(BaseRepresenter):
+    """ Representer updating stats in place on a terminal.
+
+    Shows the same screen as SimpleStatsRepresenter, but instead of clearing
+    the terminal with an external command it keeps a copy of the screen and
+    rewrites only the lines which have changed, all in a single write. Thus
+    a refresh costs a few bytes to the terminal and no processes, there is
+    no flicker even over slow connections. When the output is not a terminal
+    or stats are not live (see BaseRepresenter.live) every screen is printed
+    in full, one after another.
+    """
+
+    config_section = 'TerminalRepresenter'
+
+    def __init__(self, config, collectors, stream=None):
+        """ :param stream: a file object to write to, stdout by default."""
+        super(TerminalRepresenter, self).__init__(config, collectors)
+        for c in self.collectors:
+            c.set_alarm_callback(self.alarm_callback)
+        self.alarms = [''] * utils.get_option(
+            config, self.config_section, 'alarms_to_keep_track_of', 10)
+        self.stream = sys.stdout if stream is None else stream
+        self.terminal = Terminal(self.stream)
+        # Lines currently on the screen, None if the screen is unknown.
+        self.screen = None
+        self.size = None
+        # Lines of the most recent stats, shown again along with alarms.
+        self.stats = []
+
+    def reconfigure(self, config, collectors):
+        super(TerminalRepresenter, self).reconfigure(config, collectors)
+        for c in self.collectors:
+            c.set_alarm_callback(self.alarm_callback)
+        size = utils.get_option(config, self.config_section,
+                                'alarms_to_keep_track_of', 10)
+        self.alarms = ([''] * size + self.alarms)[-size:]
+
+    def _in_place(self):
+        """ Tells whether the screen is updated in place."""
+        try:
+            return self.live and self.stream.isatty()
+        except (AttributeError, ValueError):
+            return False
+
+    def render(self):
+        """ Returns lines of the screen."""
+        lines = ['', "Most recent alarms", "-" * 30]
+        lines.extend(self.alarms)
+        lines.extend(['', "Statistics over last %d seconds:" %
+                      self.stats_period, "-" * 30])
+        lines.extend(self.stats)
+        return lines
+
+    def redraw(self):
+        """ Brings the screen up to date in a single write."""
+        lines = self.render()
+        if not self._in_place():
+            self.stream.write('\n'.join(lines) + '\n')
+            self.stream.flush()
+            return
+        size = terminal_size(self.stream)
+        columns, rows = size
+        # Lines which do not fit would wrap or scroll the screen and shift
+        # the rest of it.
+        lines = [x[:columns - 1] for x in lines[:rows - 1]]
+        out = []
+        if self.screen is None or size != self.size:
+            out.append(self.terminal.clear)
+            self.screen, self.size = [], size
+        term, screen = self.terminal, self.screen
+        for row, line in enumerate(lines):
+            if row >= len(screen) or screen[row] != line:
+                out.append(term.move(row) + line + term.el)
+        # Park the cursor below the stats, clearing leftovers of a longer
+        # screen.
+        out.append(term.move(len(lines)) + term.ed)
+        self.screen = lines
+        self.stream.write(''.join(out))
+        self.stream.flush()
+
+    def alarm_callback(self, alarm):
+        if alarm not in self.alarms:
+            self.alarms.pop(0)
+            self.alarms.append(alarm)
+            if self._in_place():
+                self.redraw()
+            else:
+                self.stream.write(alarm + '\n')
+                self.stream.flush()
+
+    def show_stats(self):
+        self.stats = []
+        for source in self.collectors + self.monitors:
+            self.stats.extend(source.get_stats().split('\n'))
+        self.redraw()
@@ -0,0 +1,62 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+""" Clock pulse scheduling."""
+
+import time
+
+# NOTE(aovchinnikov): the try-block below ensures interoperability between
+# Py2 and Py3. Py2 has no monotonic clock in its standard library, thus the
+# wall clock is used there and steps of system time affect pulses.
+try:
+    monotonic = time.monotonic
+except AttributeError:
+    monotonic = time.time
+
+
+class Ticker(object):
+    """ Source of clock pulses with fixed absolute deadlines.
+
+    The n-th pulse is due at start + n * interval on a monotonic clock. Time
+    spent between pulses (processing, rendering) therefore does not shift
+    the following ones and pulses do not drift over time. If the consumer
+    falls behind, the pulses it missed are reported as due all at once
+    rather than silently stretching a single interval.
+    """
+
+    def __init__(self, interval, clock=monotonic):
+        """ :param interval: seconds between two successive pulses.
+        :param clock: function returning current time in seconds.
+        """
+        super(Ticker, self).__init__()
+        self.interval = interval
+        self.clock = clock
+        self.start = clock()
+        self.ticks = 0  # Number of pulses handed out so far.
+
+    @property
+    def next_deadline(self):
+        return self.start + (self.ticks + 1) * self.interval
+
+    def timeout(self):
+        """ Seconds left until the next pulse is due (0 if overdue)."""
+        return max(self.next_deadline - self.clock(), 0)
+
+    def due(self):
+        """ Hands out pulses which are due by now.
+
+        :return: number of pulses due; more than one means some deadlines
+            have been missed.
+        """
+        due = int((self.clock() - self.start) // self.interval) - self.ticks
+        if due <= 0:
+            return 0
+        self.ticks += due
+        return due
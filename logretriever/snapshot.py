@@ -0,0 +1,114 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+""" Snapshots of collector state for warm restarts.
+
+A snapshot consists of a header (magic, format version and the time it has
+been taken at) followed by a pickled list of entries, one per collector:
+class name, state version (see BaseCollector.state_version), settings (see
+utils.collector_settings()) and state (see BaseCollector.get_state()).
+State is made of counters, arrays and the like, thus pickling it takes a
+single pass in C both ways, even for large heavy-hitter tables.
+
+A state is restored only into a collector of the same class and state
+version configured the same way, the rest start afresh. Note, that
+snapshots are unpickled, thus a snapshot file must not be writable by
+anyone but the tool itself.
+"""
+
+import os
+import pickle
+import struct
+import time
+
+from . import utils
+
+
+MAGIC = b'LRSS'
+VERSION = 1
+
+header = struct.Struct('<4sHd')
+
+
+def _key(config, collector):
+    return (collector.__class__.__name__, collector.state_version,
+            utils.collector_settings(config, collector.config_section))
+
+
+def save(fname, config, collectors, clock=time.time):
+    """ Saves state of collectors.
+
+    The snapshot file is replaced atomically, so it is never left
+    half-written.
+    :param fname: path to a snapshot file.
+    :param config: ConfigParser object collectors have been configured with.
+    :param collectors: list of collector objects.
+    :param clock: function returning seconds since the epoch.
+    :return: None
+    """
+    entries = [_key(config, c) + (c.get_state(),) for c in collectors]
+    tmp = fname + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(header.pack(MAGIC, VERSION, clock()))
+        pickle.dump(entries, f, pickle.HIGHEST_PROTOCOL)
+    os.rename(tmp, fname)
+
+
+def load(fname):
+    """ Reads a snapshot saved by save().
+
+    :param fname: path to a snapshot file.
+    :return: (time taken at, list of entries) or None if the snapshot is
+        missing, unreadable or of another format version.
+    """
+    try:
+        with open(fname, 'rb') as f:
+            magic, version, taken_at = header.unpack(f.read(header.size))
+            if magic != MAGIC or version != VERSION:
+                return None
+            return taken_at, pickle.load(f)
+    except (IOError, OSError, EOFError, struct.error, pickle.PickleError,
+            AttributeError, ImportError, IndexError, TypeError, ValueError):
+        return None
+
+
+def restore(fname, config, collectors, max_age, clock=time.time):
+    """ Restores state of collectors from a recent enough snapshot.
+
+    Collectors are then sent a clock pulse for every second passed since
+    the snapshot, so that their windows account for the downtime as seconds
+    without events.
+    :param fname: path to a snapshot file.
+    :param config: ConfigParser object collectors have been configured with.
+    :param collectors: list of collector objects.
+    :param max_age: maximum age of a snapshot in seconds.
+    :param clock: function returning seconds since the epoch.
+    :return: list of restored collectors.
+    """
+    snapshot = load(fname)
+    if snapshot is None:
+        return []
+    taken_at, entries = snapshot
+    age = clock() - taken_at
+    if not 0 <= age <= max_age:
+        return []
+    states = {}
+    for entry in entries:
+        states.setdefault(entry[:3], []).append(entry[3])
+    restored = []
+    for collector in collectors:
+        candidates = states.get(_key(config, collector))
+        if candidates:
+            collector.set_state(candidates.pop(0))
+            restored.append(collector)
+    for _ in range(int(age)):
+        for collector in restored:
+            collector.tick()
+    return restored
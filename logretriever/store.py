@@ -0,0 +1,282 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+""" Compact on-disk storage of statistics.
+
+Statistics of every interval are appended to a segment file as a
+fixed-width record, a segment per day (UTC). A segment consists of:
+ * a header: magic, format version, number of top sections per record,
+   maximum length of a section name and the number of records in a complete
+   segment (0 while it is being written);
+ * records in order of time: end of the interval (seconds since the epoch),
+   its length, number of hits and top sections with their hit counts;
+ * a footer written when a segment is complete: a sparse index of record
+   timestamps followed by a trailer with the first and the last timestamp,
+   the number of records and the offset of the index.
+A segment which is still being written (or has not been closed properly)
+has no footer, but records being fixed-width are still found by binary
+search. The number of records is put into the header before the footer is
+written, so that a footer cut short by a crash is not taken for records.
+Section names longer than name_size bytes are truncated.
+"""
+
+import mmap
+import os
+import struct
+import time
+
+
+MAGIC = b'LRTS'
+TRAILER_MAGIC = b'LRTE'
+VERSION = 1
+# Every INDEX_STEP-th record gets into the footer index.
+INDEX_STEP = 256
+
+header = struct.Struct('<4sHHH2xI')
+# Offset of the number of records in the header.
+COUNT_OFFSET = 12
+index_entry = struct.Struct('<qI')
+trailer = struct.Struct('<qqIQ4s')
+
+
+def record_struct(top_k, name_size):
+    return struct.Struct('<qIQ' + ('%dsQ' % name_size) * top_k)
+
+
+def segment_name(timestamp):
+    return time.strftime('stats-%Y%m%d.lrts', time.gmtime(timestamp))
+
+
+class Segment(object):
+    """ Read-only view of a segment file."""
+
+    def __init__(self, fname):
+        """ :raises: ValueError if the file is not a segment."""
+        super(Segment, self).__init__()
+        self.fname = fname
+        with open(fname, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < header.size:
+                raise ValueError("Not a statistics segment: %s" % fname)
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.top_k, self.name_size, total = (
+            header.unpack_from(self.data))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a statistics segment: %s" % fname)
+        self.record = record_struct(self.top_k, self.name_size)
+        self.index = []
+        # A record cut short by a crash is ignored.
+        self.count = (size - header.size) // self.record.size
+        if total:
+            # The segment has been completed, but its footer may have been
+            # cut short by a crash, so that it must not be taken for records.
+            self.count = min(self.count, total)
+        if size >= header.size + trailer.size:
+            first, last, count, index_offset, magic = trailer.unpack_from(
+                self.data, size - trailer.size)
+            if (magic == TRAILER_MAGIC and total in (0, count) and
+                    index_offset == header.size + count * self.record.size):
+                self.count = count
+                self.index = [index_entry.unpack_from(self.data, pos)
+                              for pos in range(index_offset,
+                                               size - trailer.size,
+                                               index_entry.size)]
+
+    def close(self):
+        self.data.close()
+
+    def __len__(self):
+        return self.count
+
+    def timestamp(self, i):
+        return struct.unpack_from('<q', self.data,
+                                  header.size + i * self.record.size)[0]
+
+    def __getitem__(self, i):
+        """ Returns i-th record as (timestamp, interval, hits, sections)."""
+        values = self.record.unpack_from(self.data,
+                                         header.size + i * self.record.size)
+        sections = [(values[j].rstrip(b'\0').decode('utf-8', 'replace'),
+                     values[j + 1])
+                    for j in range(3, len(values), 2) if values[j + 1]]
+        return values[0], values[1], values[2], sections
+
+    def bisect(self, timestamp):
+        """ Finds the first record with timestamp not less than given."""
+        lo, hi = 0, self.count
+        # The sparse index narrows the search down to INDEX_STEP records.
+        for ts, i in self.index:
+            if ts < timestamp:
+                lo = i
+            else:
+                hi = min(hi, i)
+                break
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.timestamp(mid) < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def between(self, start, end):
+        """ Yields records with timestamps in [start, end)."""
+        for i in range(self.bisect(start), self.count):
+            record = self[i]
+            if record[0] >= end:
+                break
+            yield record
+
+
+class Store(object):
+    """ Appends records to segments in a directory."""
+
+    def __init__(self, path, top_k=5, name_size=24):
+        """ :param path: directory to keep segments in, created if missing.
+        :param top_k: number of top sections per record.
+        :param name_size: maximum section name length in bytes.
+        """
+        super(Store, self).__init__()
+        self.path = path
+        self.top_k = top_k
+        self.name_size = name_size
+        self.record = record_struct(top_k, name_size)
+        self.f = None
+        self.fname = None
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def _open(self, fname):
+        """ Opens a segment for appending, reopens a complete one."""
+        self.fname = fname
+        self.first = self.last = None
+        self.index = []
+        self.count = 0
+        if not os.path.exists(fname):
+            self.f = open(fname, 'wb')
+            self.f.write(header.pack(MAGIC, VERSION, self.top_k,
+                                     self.name_size, 0))
+            self.f.flush()
+            return
+        segment = Segment(fname)
+        try:
+            if (segment.top_k, segment.name_size) != (self.top_k,
+                                                      self.name_size):
+                raise ValueError("Statistics segment %s has a different"
+                                 " layout" % fname)
+            self.count = len(segment)
+            if self.count:
+                self.first = segment.timestamp(0)
+                self.last = segment.timestamp(self.count - 1)
+            self.index = [(segment.timestamp(i), i)
+                          for i in range(0, self.count, INDEX_STEP)]
+        finally:
+            segment.close()
+        self.f = open(fname, 'r+b')
+        self._set_count(0)
+        # Drop the footer (or a partial record) to append more records.
+        self.f.truncate(header.size + self.count * self.record.size)
+        self.f.seek(0, os.SEEK_END)
+
+    def _set_count(self, count):
+        """ Puts the number of records into the header."""
+        self.f.seek(COUNT_OFFSET)
+        self.f.write(struct.pack('<I', count))
+        self.f.flush()
+        self.f.seek(0, os.SEEK_END)
+
+    def write(self, timestamp, interval, hits, sections):
+        """ Appends a record.
+
+        :param timestamp: end of the interval, seconds since the epoch.
+        :param interval: interval length in seconds.
+        :param hits: number of hits during the interval.
+        :param sections: list of (section, hits) pairs, only top_k of them
+            are stored.
+        """
+        timestamp = int(timestamp)
+        fname = os.path.join(self.path, segment_name(timestamp))
+        if fname != self.fname:
+            self.close()
+            self._open(fname)
+        values = [timestamp, interval, hits]
+        sections = list(sections)[:self.top_k]
+        sections += [('', 0)] * (self.top_k - len(sections))
+        for name, count in sections:
+            values.append(name.encode('utf-8')[:self.name_size])
+            values.append(count)
+        if self.count % INDEX_STEP == 0:
+            self.index.append((timestamp, self.count))
+        self.f.write(self.record.pack(*values))
+        self.f.flush()
+        self.count += 1
+        if self.first is None:
+            self.first = timestamp
+        self.last = timestamp
+
+    def close(self):
+        """ Completes the current segment with a footer."""
+        if self.f is None:
+            return
+        self._set_count(self.count)
+        offset = self.f.tell()
+        for entry in self.index:
+            self.f.write(index_entry.pack(*entry))
+        self.f.write(trailer.pack(self.first or 0, self.last or 0, self.count,
+                                  offset, TRAILER_MAGIC))
+        self.f.close()
+        self.f = self.fname = None
+
+
+def segments(path, start, end):
+    """ Lists names of segments which may have records in [start, end)."""
+    first = segment_name(start)
+    last = segment_name(max(start, end - 1))
+    return [os.path.join(path, x) for x in sorted(os.listdir(path))
+            if x.startswith('stats-') and first <= x <= last]
+
+
+def query(path, start, end):
+    """ Yields records with timestamps in [start, end) from a store.
+
+    :param path: store directory.
+    :param start: seconds since the epoch.
+    :param end: seconds since the epoch.
+    """
+    for fname in segments(path, start, end):
+        segment = Segment(fname)
+        try:
+            for record in segment.between(start, end):
+                yield record
+        finally:
+            segment.close()
+
+
+class StoreSink(object):
+    """ Saves statistics of every interval to a Store.
+
+    Numbers are taken from get_metrics() of collectors: 'hits' and
+    'sections' (see SimpleCollector and SectionCollector).
+    """
+
+    def __init__(self, path, top_k=5):
+        super(StoreSink, self).__init__()
+        self.top_k = top_k
+        self.store = Store(path, top_k)
+
+    def write(self, timestamp, interval, collectors):
+        metrics = {}
+        for collector in collectors:
+            metrics.update(collector.get_metrics(self.top_k))
+        self.store.write(timestamp, interval, metrics.get('hits', 0),
+                         metrics.get('sections', []))
+
+    def close(self):
+        self.store.close()
@@ -0,0 +1,354 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+""" Bytes-mode log file tailing."""
+
+import collections
+import glob
+import json
+import os
+import re
+import sys
+
+from . import archives
+
+
+DEFAULT_BUFFER_SIZE = 1 << 20
+
+line_ptr = re.compile(b'[^\n]*\n')
+glob_ptr = re.compile('[*?[]')
+
+
+def iter_lines(chunk):
+    """ Splits a chunk into lines without copying.
+
+    :param chunk: A memoryview (or any bytes-like object) of complete lines.
+    :return: A generator of memoryview slices, one per line, newlines
+        excluded.
+    """
+    view = memoryview(chunk)
+    for res in line_ptr.finditer(view):
+        yield view[res.start():res.end() - 1]
+
+
+class FileTail(object):
+    """ Reads fresh complete lines appended to a file.
+
+    The file is read in binary mode with readinto() into a single buffer
+    allocated once. Each read is capped by the buffer size, so a burst of
+    data is consumed in several bounded steps rather than in one huge read.
+    Chunks are handed out as memoryview slices of the buffer and thus are
+    valid only until the next read. A partial line at the end of a read is
+    moved to the start of the buffer and completed by the next read.
+
+    The followed file is identified by its (device, inode) pair rather than
+    by its name. When the name starts pointing to another file (e.g. after
+    logrotate renamed the log and created a new one) the old file is read to
+    its end first and only then the new one is opened and read from its
+    beginning.
+    """
+
+    def __init__(self, fname, buffer_size=DEFAULT_BUFFER_SIZE, position=None,
+                 from_start=False):
+        """ Opens a file and positions at its end, ignoring historic data.
+
+        :param fname: path of a file to follow.
+        :param buffer_size: maximum number of bytes to read at once. It also
+            limits the length of a single line, longer lines are discarded.
+        :param position: a position saved earlier (see position property).
+            If the file it refers to is still around, either at fname or
+            under a rotated name next to it, reading resumes from there.
+        :param from_start: read the file from its beginning rather than from
+            its end when there is no saved position to resume from.
+        """
+        super(FileTail, self).__init__()
+        self.fname = fname
+        self.buf = bytearray(buffer_size)
+        self.view = memoryview(self.buf)
+        # Buffer bookkeeping: buf[:consumed] has been handed out already,
+        # buf[consumed:end] is the partial line awaiting completion.
+        self.consumed = self.end = 0
+        self.skipping = False  # Whether an overlong line is being discarded.
+        self.drained = True  # Whether the last read reached end of file.
+        self.f = None
+        if position is None or self._resume(position) is None:
+            self._open(fname, end=not from_start)
+
+    def _open(self, path, end=False, offset=0):
+        """ Starts reading a file from the given offset or from its end."""
+        # NOTE(aovchinnikov): an unbuffered file object is used so that data
+        # goes straight from the kernel into our buffer without an extra copy.
+        f = open(path, 'rb', 0)
+        if self.f is not None:
+            self.f.close()
+        self.f = f
+        self.f.seek(0, 2) if end else self.f.seek(offset)
+        st = os.fstat(self.f.fileno())
+        self.ident = (st.st_dev, st.st_ino)
+        self.offset = self.f.tell()  # File offset right after buf[:consumed].
+        self.consumed = self.end = 0
+        self.skipping = False
+        return self.f
+
+    def _resume(self, position):
+        """ Looks for a file a saved position refers to and opens it.
+
+        :return: file object or None if the file is gone or has shrunk.
+        """
+        candidates = [self.fname] + sorted(glob.glob(self.fname + '.*'))
+        for path in candidates:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if ((st.st_dev, st.st_ino) == tuple(position['ident']) and
+                    st.st_size >= position['offset']):
+                return self._open(path, offset=position['offset'])
+        return None
+
+    @property
+    def position(self):
+        """ Serializable position right after the last line handed out."""
+        return {'ident': list(self.ident), 'offset': self.offset}
+
+    def rotated(self):
+        """ Checks whether the followed name points to another file now."""
+        try:
+            st = os.stat(self.fname)
+        except OSError:  # Rotated, but a new file has not been created yet.
+            return False
+        return (st.st_dev, st.st_ino) != self.ident
+
+    def gone(self):
+        """ Checks whether the file has been removed and read till its end."""
+        if os.path.exists(self.fname):
+            return False
+        size = os.fstat(self.f.fileno()).st_size
+        return size <= self.offset + self.end - self.consumed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.view.release()
+        self.f.close()
+
+    def read_chunk(self):
+        """ Reads the next portion of complete lines.
+
+        :return: A memoryview with zero or more complete lines, each ending
+            with a newline. An empty view means no fresh lines so far.
+        """
+        pending = self.end - self.consumed
+        if pending:
+            self.view[:pending] = self.view[self.consumed:self.end]
+        self.consumed, self.end = 0, pending
+        # Make sure the file has not been truncated between reads:
+        if os.fstat(self.f.fileno()).st_size < self.offset + pending:
+            self.f.seek(0)
+            self.offset = self.end = 0
+        wanted = len(self.buf) - self.end
+        read = self.f.readinto(self.view[self.end:]) or 0
+        self.drained = read < wanted
+        self.end += read
+        if self.skipping:
+            self._skip_overlong_line()
+        last_eol = self.buf.rfind(b'\n', self.consumed, self.end)
+        if last_eol == -1:
+            if self.end - self.consumed == len(self.buf):
+                sys.stderr.write("WARNING: a line longer than %d bytes in %s "
+                                 "is discarded.\n" % (len(self.buf),
+                                                      self.fname))
+                sys.stderr.flush()
+                self.skipping = True
+                self.offset += self.end
+                self.end = 0
+            return self.view[:0]
+        start, self.consumed = self.consumed, last_eol + 1
+        self.offset += self.consumed - start
+        return self.view[start:self.consumed]
+
+    def _skip_overlong_line(self):
+        """ Drops buffered data up to the end of a discarded line."""
+        eol = self.buf.find(b'\n', 0, self.end)
+        if eol == -1:
+            self.offset += self.end
+            self.end = 0
+        else:
+            self.skipping = False
+            self.consumed = eol + 1
+            self.offset += self.consumed
+
+    def read_chunks(self):
+        """ Generates chunks until no fresh complete lines are left.
+
+        Every chunk must be processed before the next one is requested since
+        they share the same buffer.
+        """
+        while True:
+            chunk = self.read_chunk()
+            if chunk:
+                yield chunk
+            elif self.drained:
+                if not self.rotated():
+                    return
+                if self.end > self.consumed:
+                    sys.stderr.write("WARNING: an incomplete last line of a "
+                                     "rotated %s is discarded.\n" %
+                                     self.fname)
+                    sys.stderr.flush()
+                self._open(self.fname)
+
+    def lines(self):
+        """ Generates fresh lines as memoryview slices (see iter_lines())."""
+        for chunk in self.read_chunks():
+            for line in iter_lines(chunk):
+                yield line
+
+
+class MultiTail(object):
+    """ Follows a set of files given as a list of paths and glob patterns.
+
+    Patterns are expanded again on every rescan(), files which appeared since
+    then are followed from their beginning. A file which is already followed
+    under another name (a freshly rotated log matching the same glob) is not
+    picked up twice. Files which are gone are no longer followed once all of
+    their lines have been read.
+    """
+
+    def __init__(self, patterns, buffer_size=DEFAULT_BUFFER_SIZE,
+                 positions=None):
+        """ :param patterns: list of file paths and glob patterns.
+        :param buffer_size: read buffer size for each of the files.
+        :param positions: dictionary of saved positions by file name.
+        """
+        super(MultiTail, self).__init__()
+        self.patterns = patterns
+        self.buffer_size = buffer_size
+        self.tails = collections.OrderedDict()
+        # Identities of files followed, kept while the files are around.
+        self.seen = set()
+        self.rescan(positions or {}, initial=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __iter__(self):
+        return iter(list(self.tails.values()))
+
+    def close(self):
+        for t in self:
+            t.close()
+
+    @property
+    def fnames(self):
+        return list(self.tails)
+
+    def expand(self):
+        """ Lists existing files matching the patterns, in pattern order.
+
+        Compressed logs never grow, thus they are not followed even if they
+        match.
+        """
+        out = []
+        for pattern in self.patterns:
+            if glob_ptr.search(pattern):
+                matches = [x for x in sorted(glob.glob(pattern))
+                           if not archives.is_archive(x)]
+            else:
+                matches = [pattern] if os.path.exists(pattern) else []
+            out.extend(x for x in matches if x not in out)
+        return out
+
+    def rescan(self, positions=None, initial=False):
+        """ Starts following files which have appeared since the last scan.
+
+        :param positions: dictionary of saved positions by file name.
+        :param initial: whether this is the first scan. Files found during the
+            first scan are followed from their end (or saved positions), the
+            ones found later are new and thus are followed from the start.
+        :return: list of names of files which are followed from now on.
+        """
+        positions = positions or {}
+        for fname, t in list(self.tails.items()):
+            if t.gone():
+                t.close()
+                del self.tails[fname]
+        found = collections.OrderedDict()
+        for fname in self.expand():
+            try:
+                st = os.stat(fname)
+            except OSError:
+                continue
+            found[fname] = (st.st_dev, st.st_ino)
+        # NOTE(aovchinnikov): identities of removed files are forgotten, since
+        # a file created later may well get the same inode.
+        self.seen &= set(found.values())
+        self.seen.update(t.ident for t in self)
+        added = []
+        for fname, ident in found.items():
+            if fname in self.tails or ident in self.seen:
+                continue
+            try:
+                t = FileTail(fname, self.buffer_size, positions.get(fname),
+                             from_start=not initial)
+            except IOError as e:
+                sys.stderr.write("WARNING: can not follow %s: %s\n" %
+                                 (fname, e))
+                sys.stderr.flush()
+                continue
+            self.tails[fname] = t
+            self.seen.add(t.ident)
+            added.append(fname)
+        return added
+
+    def read_chunks(self):
+        """ Generates (file name, chunk) pairs with fresh lines of all files.
+
+        See FileTail.read_chunks() regarding chunk lifetime.
+        """
+        for t in self:
+            for chunk in t.read_chunks():
+                yield t.fname, chunk
+
+
+def load_positions(fname):
+    """ Reads positions saved by save_positions().
+
+    :param fname: path to a state file.
+    :return: dictionary mapping log file names to positions. Empty if the
+        state file is missing or unreadable.
+    """
+    try:
+        with open(fname) as f:
+            return json.load(f)['positions']
+    except (IOError, OSError, ValueError, KeyError):
+        return {}
+
+
+def save_positions(fname, positions):
+    """ Saves positions so that reading can be resumed later.
+
+    The state file is replaced atomically, so it is never left half-written.
+    :param fname: path to a state file.
+    :param positions: dictionary mapping log file names to positions (see
+        FileTail.position).
+    :return: None
+    """
+    tmp = fname + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({'positions': positions}, f)
+    os.rename(tmp, fname)
@@ -10,6 +10,7 @@
 
 """ Handy helper functions for log processor."""
 
+import calendar
 import collections
 import datetime
 import os
@@ -22,15 +23,39 @@ request_line = collections.namedtuple('Request',
 
 log_line = collections.namedtuple('LogLine',
                                   ['ip', 'identifier', 'userid', 'date',
-                                   'request', 'response_code', 'size'])
+                                   'request', 'response_code', 'size',
+                                   'source'])
+# The source (name of a file the line came from) is optional.
+log_line.__new__.__defaults__ = (None,)
 
 # NOTE(aovchinnikov): Proper parsing of date is a non-trivial task given that
 # date could appear in different formats, time zones are not easily accounted
 # for etc. Thus for now I will just store date as is. In the future it might
 # make sense to have a family of classes capable to take care of different date
 # formats and to select one basing on config value for date format.
+# Collectors which need time of events convert CLF dates with
+# parse_clf_date() below.
 
 ptr = re.compile('([(\d\.)]+) (.*?) (.*?) \[(.*?)\] "(.*?)" (\d+) (\d+)')
+# The same pattern anchored to line starts so that a single finditer() over a
+# chunk replaces a match() per line. Non-greedy groups never cross a newline
+# since DOTALL is not set.
+chunk_ptr = re.compile(r'^([(\d\.)]+) (.*?) (.*?) \[(.*?)\] "(.*?)" '
+                       r'(\d+) (\d+)', re.M)
+chunk_bptr = re.compile(chunk_ptr.pattern.encode('ascii'), re.M)
+
+# Encoding of raw log data read in binary mode.
+encoding = 'utf-8'
+
+# Names of fields collectors can ask for (see make_parser()). Parts of the
+# request are separate fields.
+request_fields = ('method', 'path', 'protocol')
+all_fields = ('ip', 'identifier', 'userid', 'date') + request_fields + (
+    'response_code', 'size')
+# Groups of chunk_ptr, in order, and their patterns.
+group_fields = ('ip', 'identifier', 'userid', 'date', 'request',
+                'response_code', 'size')
+group_patterns = (r'[(\d\.)]+', '.*?', '.*?', '.*?', '.*?', r'\d+', r'\d+')
 
 
 def parse_line(line):
@@ -43,11 +68,179 @@ def parse_line(line):
     return log_line(addr, uid, user, date, request, code, size)
 
 
-def get_fresh_events(f):
-    """ Read a fresh batch of newline-separated strings from a file.
+def parse_chunk(chunk, source=None):
+    """ CLF parser for a chunk of newline-separated lines.
+
+    The chunk is scanned in one pass. The result is the same as filtering
+    parse_line() over each line, except that lines with a malformed request
+    part are skipped rather than raising.
+    :param chunk: A string with one or more complete lines. A bytes-like
+        object (e.g. a memoryview from tail.FileTail) is accepted as well, in
+        which case only the matched fields get decoded, never the whole chunk.
+    :param source: A tag to set on every parsed line, e.g. a file name.
+    :return: A list of log_line objects.
+    """
+    if isinstance(chunk, (bytes, bytearray, memoryview)) and bytes is not str:
+        return _parse_binary_chunk(chunk, source)
+    out = []
+    append, make_request = out.append, request_line._make
+    for res in chunk_ptr.finditer(chunk):
+        addr, uid, user, date, request, code, size = res.groups()
+        request = request.split()
+        if len(request) != 3:
+            continue
+        append(log_line(addr, uid, user, date, make_request(request), code,
+                        size, source))
+    return out
+
+
+def _parse_binary_chunk(chunk, source):
+    """ Bytes counterpart of parse_chunk()."""
+    out = []
+    append, make_request = out.append, request_line._make
+    for res in chunk_bptr.finditer(chunk):
+        addr, uid, user, date, request, code, size = [
+            x.decode(encoding, 'replace') for x in res.groups()]
+        request = request.split()
+        if len(request) != 3:
+            continue
+        append(log_line(addr, uid, user, date, make_request(request), code,
+                        size, source))
+    return out
+
+
+def make_chunk_pattern(fields, binary=False):
+    """ Builds a variant of chunk_ptr capturing only some of its groups.
+
+    Groups which are not captured still have to match, so a projected
+    pattern accepts exactly the same lines as chunk_ptr.
+    :param fields: names of groups to capture (see group_fields).
+    :param binary: whether the pattern is for bytes-like input.
+    :return: compiled pattern.
+    """
+    groups = [('(%s)' if f in fields else '(?:%s)') % p
+              for f, p in zip(group_fields, group_patterns)]
+    pattern = '^%s %s %s \\[%s\\] "%s" %s %s' % tuple(groups)
+    return re.compile(pattern.encode('ascii') if binary else pattern, re.M)
+
+
+_parser_template = """
+def parse(chunk, source=None):
+    out = []
+    append = out.append
+    for %(targets)s in pattern.findall(chunk):
+        request = request.split()
+        if len(request) != 3:
+            continue
+        append(log_line(%(args)s, source))
+    return out
+"""
+
+
+def _generate_parser(fields, binary):
+    """ Generates source code of a parser and compiles it."""
+    captured = [f for f in group_fields if f in fields or f == 'request']
+    conv = "%s.decode(encoding, 'replace')" if binary else "%s"
+    args = [conv % f if f in fields else 'None' for f in group_fields]
+    parts = [conv % ('request[%d]' % i) if f in fields else 'None'
+             for i, f in enumerate(request_fields)]
+    args[group_fields.index('request')] = (
+        'request_line(%s)' % ', '.join(parts)
+        if set(request_fields) & set(fields) else 'None')
+    namespace = {'pattern': make_chunk_pattern(captured, binary),
+                 'log_line': log_line, 'request_line': request_line,
+                 'encoding': encoding}
+    exec(_parser_template % {'targets': ', '.join(captured),
+                             'args': ', '.join(args)}, namespace)
+    return namespace['parse']
+
+
+def make_parser(fields=None):
+    """ Builds a chunk parser extracting only the given fields.
+
+    Collectors rarely need every field of a line, so the parser skips
+    extracting, decoding and building objects for fields nobody asked for,
+    leaving them None in log_line objects. The per-line loop of the parser
+    is generated for the particular set of fields, so that it has no
+    per-field checks in it. Lines are accepted or skipped exactly as by
+    parse_chunk().
+    :param fields: iterable of names from all_fields, None for all fields.
+    :return: function with the same signature as parse_chunk().
+    """
+    if fields is None or set(all_fields) <= set(fields):
+        return parse_chunk
+    fields = set(fields)
+    unknown = fields - set(all_fields)
+    if unknown:
+        raise ValueError("Unknown fields: %s" % ', '.join(sorted(unknown)))
+    text, binary = _generate_parser(fields, False), None
+    if bytes is not str:
+        binary = _generate_parser(fields, True)
+
+    def parse(chunk, source=None):
+        if binary is not None and isinstance(chunk, (bytes, bytearray,
+                                                     memoryview)):
+            return binary(chunk, source)
+        return text(chunk, source)
+    return parse
+
+
+months = dict((m, i + 1) for i, m in enumerate(
+    ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct',
+     'Nov', 'Dec')))
+
+
+class DateParser(object):
+    """ CLF date parser with memoization.
+
+    Dates have a resolution of one second and consecutive lines of a log
+    almost always share the same date, thus the last parsed date is
+    remembered and repeated dates are not parsed again.
+    """
+
+    def __init__(self):
+        super(DateParser, self).__init__()
+        # NOTE(aovchinnikov): a single tuple is replaced at once, so that
+        # parsing from several threads is safe.
+        self.last = (None, None)
+
+    def __call__(self, date):
+        """ Converts a CLF date to seconds since the epoch.
+
+        :param date: a date like '01/Jul/2000:00:00:00 +0000'.
+        :return: integer timestamp (UTC) or None if the date is malformed.
+        """
+        key, value = self.last
+        if date == key:
+            return value
+        value = self._parse(date)
+        self.last = (date, value)
+        return value
+
+    @staticmethod
+    def _parse(date):
+        try:
+            if (date[2] + date[6] + date[11] + date[14] + date[17] + date[20]
+                    != '//::: ' or date[21] not in '+-'):
+                return None
+            timestamp = calendar.timegm((
+                int(date[7:11]), months[date[3:6]], int(date[0:2]),
+                int(date[12:14]), int(date[15:17]), int(date[18:20]), 0, 0, 0))
+            offset = int(date[22:24]) * 3600 + int(date[24:26]) * 60
+        except (IndexError, KeyError, ValueError):
+            return None
+        return timestamp - offset if date[21] == '+' else timestamp + offset
+
+
+parse_clf_date = DateParser()
+
+
+def read_fresh_chunk(f):
+    """ Read a fresh chunk of complete newline-separated lines from a file.
 
     :param f: File object to read fresh entries from.
-    :return: A list of strings.
+    :return: A string ending with the last newline read, or an empty string
+        if no complete line is available yet.
     """
     # NOTE(aovchinnikov): the logic below should work fine up to several
     # thousands new entries per second. I have not tested it with higher
@@ -66,9 +259,19 @@ def get_fresh_events(f):
     last_eol = data.rfind('\n')
     if last_eol != -1:  # There is something to return.
         f.seek(pos+last_eol+1)
-        return data[:last_eol].split('\n')
+        return data[:last_eol+1]
     # No newlines in input means no new processable data thus far.
-    return []
+    return ''
+
+
+def get_fresh_events(f):
+    """ Read a fresh batch of newline-separated strings from a file.
+
+    :param f: File object to read fresh entries from.
+    :return: A list of strings.
+    """
+    chunk = read_fresh_chunk(f)
+    return chunk[:-1].split('\n') if chunk else []
 
 
 def load(config, option, from_where, args=None):
@@ -109,6 +312,50 @@ def load(config, option, from_where, args=None):
     return out
 
 
+def reload(config, new_config, option, from_where, objects, args=None,
+           check=None):
+    """ Reloads helper classes keeping the objects which can be kept.
+
+    Objects are matched to the classes listed in new_config by class, in
+    order. A matching object is kept as it is when its settings (see
+    collector_settings()) have not changed, it is kept when it manages to
+    apply the changes in place (see BaseCollector.reconfigure()), and it is
+    replaced with a fresh one otherwise. Objects of classes which are not
+    listed anymore are dropped. Kept objects are only reconfigured once all
+    the classes have been loaded and checked, thus a broken configuration
+    leaves them untouched.
+    :param config: ConfigParser object objects have been configured with.
+    :param new_config: ConfigParser object to reload from.
+    :param option: option name with a list of classes to load.
+    :param from_where: module from which to load these classes.
+    :param objects: list of objects configured with config.
+    :param args: Optional arguments to pass to all classes constructors.
+    :param check: Optional function called with every freshly loaded object,
+        it raises an exception to reject the new configuration.
+    :return: list of objects configured with new_config.
+    """
+    fresh = load(new_config, option, from_where, args)
+    if check is not None:
+        for obj in fresh:
+            check(obj)
+    old = list(objects)
+    pairs = []
+    for obj in fresh:
+        match = next((x for x in old if type(x) is type(obj)), None)
+        if match is not None:
+            old.remove(match)
+        pairs.append((obj, match))
+    out = []
+    for obj, match in pairs:
+        if match is not None and (
+                collector_settings(config, match.config_section) ==
+                collector_settings(new_config, obj.config_section) or
+                match.reconfigure(new_config)):
+            obj = match
+        out.append(obj)
+    return out
+
+
 def file_has_problems(fname):
     """ Simple checker for file accessibility.
 
@@ -124,6 +371,52 @@ def file_has_problems(fname):
     return False
 
 
+def get_option(config, section, option, default):
+    """ Reads an optional configuration value.
+
+    Options introduced after the first release are not required to be present
+    in existing configuration files, thus they are read with a fallback.
+    :param config: ConfigParser object.
+    :param section: section to read the option from.
+    :param option: option name.
+    :param default: value to use when the option is absent. Its type selects
+        the conversion applied to the configured value.
+    :return: configured or default value.
+    """
+    if not config.has_option(section, option):
+        return default
+    getter = {bool: 'getboolean', int: 'getint',
+              float: 'getfloat'}.get(type(default), 'get')
+    return getattr(config, getter)(section, option)
+
+
+# Options of DEFAULT which concern reading, displaying or saving of statistics
+# rather than collecting them, a change of them does not affect collectors.
+program_options = frozenset([
+    'collectors', 'representer', 'log_file', 'rescan_interval', 'state_file',
+    'state_save_interval', 'check_interval', 'watch_mode', 'read_buffer_size',
+    'queue_size', 'queue_policy', 'queue_sample_ratio', 'batch_format',
+    'workers', 'store_dir', 'store_top_k', 'snapshot_file',
+    'snapshot_interval', 'snapshot_max_age', 'replay', 'ignore_missing_bits'])
+
+
+def collector_settings(config, section):
+    """ Lists configuration values a collector may depend on.
+
+    Two collectors of the same class with equal settings are configured
+    identically.
+    :param config: ConfigParser object.
+    :param section: section the collector reads (see config_section).
+    :return: sorted tuple of (option, raw value) pairs.
+    """
+    if section == 'DEFAULT':
+        items = config.defaults().items()
+    else:
+        items = config.items(section, raw=True)
+    return tuple(sorted((k, v) for k, v in items
+                        if k not in program_options))
+
+
 def update_config_from_cli_arguments(config, arguments):
     """ Overrides values loaded from DEFAULT section with CLI arguments.
 
@@ -132,6 +425,9 @@ def update_config_from_cli_arguments(config, arguments):
     :return: None
     :side-effects: Modifies config object.
     """
-    for dopt in config.defaults():
-        if dopt in arguments:
-            config.set('DEFAULT', dopt, getattr(arguments, dopt))
+    # NOTE(aovchinnikov): options which are missing from an older config file
+    # can still be set from CLI, thus all arguments are applied, not only the
+    # ones overriding existing values.
+    for dopt, value in vars(arguments).items():
+        if dopt != 'config':
+            config.set('DEFAULT', dopt, str(value))
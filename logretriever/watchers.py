@@ -0,0 +1,192 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+""" Sources of wake-ups for the log reading loop.
+
+A watcher tells the main loop when it makes sense to look for fresh data in
+log files. InotifyWatcher relies on Linux inotify and wakes up as soon as a
+file changes, PollingWatcher simply wakes up every check_interval seconds and
+serves as a fallback on systems without inotify.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+
+
+IN_MODIFY = 0x00000002
+IN_MOVE_SELF = 0x00000800
+IN_DELETE_SELF = 0x00000400
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_MOVE_SELF | IN_DELETE_SELF
+event_header = struct.Struct('iIII')
+
+
+def _load_libc():
+    """ Returns libc with inotify functions or None if they are missing."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6',
+                           use_errno=True)
+        libc.inotify_init1, libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+_libc = _load_libc()
+
+
+class PollingWatcher(object):
+    """ Watcher which wakes up once in a fixed interval."""
+
+    def __init__(self, fnames, interval):
+        """ :param fnames: list of files to watch (kept for interface parity).
+        :param interval: number of seconds between wake-ups.
+        """
+        super(PollingWatcher, self).__init__()
+        self.fnames = list(fnames)
+        self.interval = interval
+        self._wakeup = threading.Event()
+
+    def wait(self, timeout):
+        """ Waits until files should be checked for changes.
+
+        :param timeout: maximum number of seconds to wait.
+        :return: True, since polling can not tell whether anything changed.
+        """
+        self._wakeup.wait(max(min(timeout, self.interval), 0))
+        self._wakeup.clear()
+        return True
+
+    def watch(self, fname):
+        """ Adds a file to watch."""
+        self.fnames.append(fname)
+
+    def wake(self):
+        """ Interrupts waiting, e.g. from a signal handler."""
+        self._wakeup.set()
+
+    def close(self):
+        return
+
+
+class InotifyWatcher(object):
+    """ Watcher which wakes up on inotify events for watched files.
+
+    Files are watched for modification, move and deletion. Once a file has
+    been moved or deleted its watch is gone, so the watcher keeps trying to
+    watch whatever appears at the same path again, checking files as often as
+    the polling fallback would while the path is missing.
+    """
+
+    def __init__(self, fnames, interval):
+        """ :param fnames: list of files to watch.
+        :param interval: number of seconds between checks while some of the
+            files can not be watched.
+        :raises: OSError if inotify is not available.
+        """
+        super(InotifyWatcher, self).__init__()
+        if _libc is None:
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self.interval = interval
+        self.fd = _libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # Self-pipe to interrupt select() from a signal handler.
+        self._rpipe, self._wpipe = os.pipe()
+        self.watches = {}  # Watch descriptor -> file name.
+        self.unwatched = list(fnames)
+        self._watch_missing()
+
+    def _watch_missing(self):
+        """ Tries to (re)establish watches for files not watched yet."""
+        for fname in list(self.unwatched):
+            wd = _libc.inotify_add_watch(self.fd, fname.encode(), WATCH_MASK)
+            if wd >= 0:
+                self.watches[wd] = fname
+                self.unwatched.remove(fname)
+
+    def watch(self, fname):
+        """ Adds a file to watch."""
+        self.unwatched.append(fname)
+        self._watch_missing()
+
+    def _drain_events(self):
+        """ Consumes pending events and forgets watches that are gone."""
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return
+                raise
+            pos = 0
+            while pos < len(data):
+                wd, mask, _, length = event_header.unpack_from(data, pos)
+                pos += event_header.size + length
+                if mask & (IN_MOVE_SELF | IN_DELETE_SELF | IN_IGNORED):
+                    fname = self.watches.pop(wd, None)
+                    if fname is not None:
+                        _libc.inotify_rm_watch(self.fd, wd)
+                        self.unwatched.append(fname)
+
+    def wait(self, timeout):
+        """ Waits for changes in watched files.
+
+        :param timeout: maximum number of seconds to wait.
+        :return: True if the files should be checked, False on timeout.
+        """
+        if self.unwatched:
+            self._watch_missing()
+        if self.unwatched:
+            timeout = min(timeout, self.interval)
+        ready = select.select([self.fd, self._rpipe], [], [],
+                              max(timeout, 0))[0]
+        if self._rpipe in ready:
+            os.read(self._rpipe, 512)
+        if self.fd in ready:
+            self._drain_events()
+            return True
+        return bool(self.unwatched)
+
+    def wake(self):
+        """ Interrupts waiting, e.g. from a signal handler."""
+        os.write(self._wpipe, b'x')
+
+    def close(self):
+        for fd in (self.fd, self._rpipe, self._wpipe):
+            os.close(fd)
+
+
+def make_watcher(fnames, mode, interval):
+    """ Creates a watcher according to configuration.
+
+    :param fnames: list of files to watch.
+    :param mode: one of 'auto', 'inotify' or 'poll'. In 'auto' mode inotify
+        is used when available.
+    :param interval: polling interval in seconds.
+    :return: a watcher object.
+    """
+    if mode in ('auto', 'inotify'):
+        try:
+            return InotifyWatcher(fnames, interval)
+        except OSError as e:
+            if mode == 'inotify':
+                sys.stderr.write("WARNING: falling back to polling: %s\n" % e)
+                sys.stderr.flush()
+    return PollingWatcher(fnames, interval)
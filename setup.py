@@ -1,6 +1,7 @@
 from setuptools import setup, find_packages
 
-console_scripts = ['logretriever = logretriever.main:main']
+console_scripts = ['logretriever = logretriever.main:main',
+                   'logretriever-query = logretriever.query:main']
 
 setup(
     name="LogRetriever",
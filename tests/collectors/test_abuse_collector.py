@@ -0,0 +1,112 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+import types
+import unittest
+
+import logretriever.columns as columns
+import logretriever.utils as utils
+import logretriever.collectors as collectors
+
+
+def make_line(ip):
+    return utils.log_line(ip, '-', 'foo', '01/Jul/2000:00:00:00 +0000',
+                          utils.request_line('GET', '/foo', 'HTTP/1.0'),
+                          '200', '100')
+
+
+class TestAbuseCollector(unittest.TestCase):
+
+    def setUp(self):
+        self.values = values = {'alarm_interval': 2, 'statistics_interval': 1,
+                                'ip_rate_limit': 2.0, 'ip_burst': 3.0,
+                                'ip_table_size': 3}
+        getint = lambda self, _, x: values[x]
+        has_section = lambda self, *x: True
+        has_option = lambda self, _, x: x in values
+        self.fake_config = type('Fcon', (object,), {})
+        self.fake_config.getint = types.MethodType(getint, self.fake_config)
+        self.fake_config.getfloat = types.MethodType(getint, self.fake_config)
+        self.fake_config.has_section = types.MethodType(has_section,
+                                                        self.fake_config)
+        self.fake_config.has_option = types.MethodType(has_option,
+                                                       self.fake_config)
+        self.now = 100
+        self.collector = collectors.AbuseCollector(self.fake_config)
+        self.collector.set_clock(lambda: self.now)
+        self.alarms = []
+        self.collector.set_alarm_callback(self.set_alarm)
+
+    def set_alarm(self, x):
+        self.alarms.append(' '.join(x.split(' ')[2:]))
+
+    def feed(self, ips):
+        self.collector.process_batch([make_line(x) for x in ips])
+        self.collector.tick()
+        self.now += 1
+
+    def test_burst_and_refill(self):
+        self.feed(['a'] * 3)
+        self.feed(['a'] * 2)
+        self.assertEqual([], self.alarms)
+
+        self.feed(['a'] * 3)
+        self.assertEqual([self.collector.lh_msg.split(': ', 1)[1] % {
+            'n': 1, 'rate': 2, 'ips': 'a'}], self.alarms)
+
+    def test_coalesced_alarms(self):
+        expected1 = self.collector.lh_msg.split(': ', 1)[1] % {
+            'n': 2, 'rate': 2, 'ips': 'a, b'}
+        expected2 = self.collector.hl_msg.split(': ', 1)[1] % {
+            'n': 2, 'ips': 'a, b'}
+
+        self.feed(['a'] * 4 + ['b'] * 5 + ['c'])
+        self.assertEqual([expected1], self.alarms)
+        self.assertEqual(self.collector.stat_msg % (2, ': b, a'),
+                         self.collector.get_stats())
+
+        self.feed(['a'])
+        self.feed([])
+        self.assertEqual([expected1, expected2], self.alarms)
+        self.assertEqual(self.collector.stat_msg % (0, ''),
+                         self.collector.get_stats())
+
+    def test_format_many(self):
+        self.collector.ips_shown = 2
+
+        self.assertEqual('a, b and 2 more',
+                         self.collector._format(['a', 'b', 'c', 'd']))
+
+    def test_table_is_bounded(self):
+        self.feed(['a', 'b', 'c'])
+        self.feed(['a', 'd'])
+
+        self.assertEqual(['c', 'a', 'd'], list(self.collector.buckets))
+
+    def test_process_batch_columns(self):
+        batch = columns.parse_chunk(''.join(
+            '%s - foo [01/Jul/2000:00:00:00 +0000] '
+            '"GET /foo HTTP/1.0" 200 100\n' % x
+            for x in ['1.1.1.1', '2.2.2.2', '1.1.1.1']))
+
+        self.collector.process_batch(batch)
+
+        self.assertEqual({'1.1.1.1': 2, '2.2.2.2': 1},
+                         self.collector.pending)
+
+    def test_take_merge_partial(self):
+        peer = collectors.AbuseCollector(self.fake_config)
+        self.collector.process_line(make_line('a'))
+        peer.process_line(make_line('a'))
+
+        self.collector.merge_partial(peer.take_partial())
+
+        self.assertEqual({'a': 2}, self.collector.pending)
+        self.assertEqual({}, peer.pending)
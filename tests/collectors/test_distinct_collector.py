@@ -0,0 +1,104 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+import types
+import unittest
+
+import logretriever.columns as columns
+import logretriever.utils as utils
+import logretriever.collectors as collectors
+
+
+def make_line(ip, user):
+    return utils.log_line(ip, '-', user, '01/Jul/2000:00:00:00 +0000',
+                          utils.request_line('GET', '/foo', 'HTTP/1.0'),
+                          '200', '100')
+
+
+class TestDistinctCollector(unittest.TestCase):
+
+    def setUp(self):
+        self.values = values = {'statistics_interval': 1,
+                                'distinct_horizon': 4}
+        getint = lambda self, _, x: values[x]
+        get = lambda self, _, x: values[x]
+        has_section = lambda self, *x: True
+        has_option = lambda self, _, x: x in values
+        self.fake_config = type('Fcon', (object,), {})
+        self.fake_config.getint = types.MethodType(getint, self.fake_config)
+        self.fake_config.get = types.MethodType(get, self.fake_config)
+        self.fake_config.has_section = types.MethodType(has_section,
+                                                        self.fake_config)
+        self.fake_config.has_option = types.MethodType(has_option,
+                                                       self.fake_config)
+        self.collector = collectors.DistinctCollector(self.fake_config)
+
+    def test_process_line(self):
+        expected = (self.collector.message % ('ip', 2, 2, 4) + ', ' +
+                    self.collector.message % ('userid', 1, 1, 4))
+
+        self.collector.process_line(make_line('127.0.0.1', 'foo'))
+        self.collector.process_line(make_line('127.0.0.2', 'foo'))
+        self.collector.process_line(make_line('127.0.0.1', 'foo'))
+
+        self.assertEqual(expected, self.collector.get_stats())
+
+    def test_process_batch_columns(self):
+        batch = columns.parse_chunk(
+            '127.0.0.1 - foo [01/Jul/2000:00:00:00 +0000] '
+            '"GET /foo HTTP/1.0" 200 100\n'
+            '127.0.0.2 - bar [01/Jul/2000:00:00:00 +0000] '
+            '"GET /bar HTTP/1.0" 200 100\n'
+            '127.0.0.1 - baz [01/Jul/2000:00:00:00 +0000] '
+            '"GET /foo HTTP/1.0" 200 100\n')
+        expected = (self.collector.message % ('ip', 2, 2, 4) + ', ' +
+                    self.collector.message % ('userid', 3, 3, 4))
+
+        self.collector.process_batch(batch)
+
+        self.assertEqual(expected, self.collector.get_stats())
+
+    def test_rolling(self):
+        collector = self.collector
+        collector.past = {'ip': [collector.past['ip'][0]],
+                          'userid': [collector.past['userid'][0]]}
+        collector.slot_length = 2
+
+        collector.process_line(make_line('127.0.0.1', 'foo'))
+        collector.tick()
+        collector.tick()
+        collector.process_line(make_line('127.0.0.2', 'foo'))
+        collector.tick()
+
+        self.assertEqual(collector.message % ('ip', 2, 2, 4),
+                         collector.get_stats().split(', ')[0])
+        self.assertEqual(collector.message % ('ip', 0, 2, 4),
+                         collector.get_stats().split(', ')[0])
+
+        collector.tick()
+        self.assertEqual(collector.message % ('ip', 0, 1, 4),
+                         collector.get_stats().split(', ')[0])
+
+    def test_take_merge_partial(self):
+        peer = collectors.DistinctCollector(self.fake_config)
+        self.collector.process_line(make_line('127.0.0.1', 'foo'))
+        peer.process_line(make_line('127.0.0.2', 'bar'))
+
+        self.collector.merge_partial(peer.take_partial())
+
+        self.assertEqual(2, self.collector.interval['ip'].count())
+        self.assertEqual(2, self.collector.count_rolling('userid'))
+        self.assertEqual(0, peer.interval['ip'].count())
+
+    def test_unknown_field(self):
+        self.values['distinct_fields'] = 'ip, foo'
+
+        self.assertRaises(ValueError, collectors.DistinctCollector,
+                          self.fake_config)
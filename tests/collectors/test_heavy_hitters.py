@@ -0,0 +1,127 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+import collections
+import pickle
+import types
+import unittest
+
+import logretriever.collectors.heavy_hitters as heavy_hitters
+
+
+class TestSpaceSaving(unittest.TestCase):
+
+    def setUp(self):
+        self.counter = heavy_hitters.SpaceSaving(3)
+
+    def test_exact_under_capacity(self):
+        self.counter.update('abacab')
+
+        self.assertEqual([('a', 3), ('b', 2), ('c', 1)],
+                         self.counter.most_common(3))
+        self.assertEqual(0, self.counter.error('a'))
+
+    def test_eviction(self):
+        self.counter.update('aaabbc')
+        self.counter['d'] += 1
+
+        self.assertEqual(3, len(self.counter))
+        self.assertEqual(0, self.counter['c'])
+        self.assertEqual(2, self.counter['d'])
+        self.assertEqual(1, self.counter.error('d'))
+
+    def test_eviction_after_growth(self):
+        self.counter.update('abc')
+        self.counter.update({'a': 5, 'b': 5})
+        self.counter.add('d')
+        self.counter.add('e')
+
+        self.assertEqual({'a': 6, 'b': 6, 'e': 3}, self.counter.counts)
+        self.assertEqual(3, len(self.counter.heap))
+
+    def test_heavy_hitters_kept(self):
+        stream = ['x%d' % i for i in range(1000)] + ['a'] * 600
+        stream += ['b'] * 300
+        counter = heavy_hitters.SpaceSaving(10)
+
+        for x in stream:
+            counter.add(x)
+
+        top = counter.most_common(2)
+        self.assertEqual(['a', 'b'], [x for x, _ in top])
+        for key, count in top:
+            self.assertLessEqual(count - counter.error(key),
+                                 stream.count(key))
+            self.assertLessEqual(counter.error(key), len(stream) / 10)
+
+    def test_update_merge(self):
+        peer = heavy_hitters.SpaceSaving(3)
+        peer.update('aaabbc')
+        peer.add('d')
+        self.counter.update('ab')
+
+        self.counter.update(peer.copy())
+
+        self.assertEqual({'a': 4, 'b': 3, 'd': 2}, self.counter.counts)
+        self.assertEqual(1, self.counter.error('d'))
+        self.assertEqual(3, len(peer))
+
+    def test_pickle(self):
+        self.counter.update('aaabbc')
+        self.counter.add('d')
+
+        other = pickle.loads(pickle.dumps(self.counter))
+        other.add('e')
+        self.counter.add('e')
+
+        self.assertEqual(self.counter.counts, other.counts)
+        self.assertEqual(self.counter.errors, other.errors)
+        self.assertEqual(sorted(self.counter.heap)[0][0],
+                         sorted(other.heap)[0][0])
+
+    def test_clear(self):
+        self.counter.update('abcd')
+
+        self.counter.clear()
+
+        self.assertEqual([], self.counter.most_common(1))
+        self.assertEqual(0, self.counter.total)
+
+
+class TestMakeCounter(unittest.TestCase):
+
+    def setUp(self):
+        self.values = values = {}
+        self.fake_config = type('Fcon', (object,), {})
+        self.fake_config.has_option = types.MethodType(
+            lambda self, _, x: x in values, self.fake_config)
+        self.fake_config.get = types.MethodType(
+            lambda self, _, x: values[x], self.fake_config)
+        self.fake_config.getint = types.MethodType(
+            lambda self, _, x: int(values[x]), self.fake_config)
+
+    def test_default(self):
+        counter = heavy_hitters.make_counter(self.fake_config, 'DEFAULT')
+
+        self.assertIsInstance(counter, collections.Counter)
+
+    def test_space_saving(self):
+        self.values.update(top_k_engine='space-saving', top_k_capacity='5')
+
+        counter = heavy_hitters.make_counter(self.fake_config, 'DEFAULT')
+
+        self.assertIsInstance(counter, heavy_hitters.SpaceSaving)
+        self.assertEqual(5, counter.capacity)
+
+    def test_unknown(self):
+        self.values['top_k_engine'] = 'foo'
+
+        self.assertRaises(ValueError, heavy_hitters.make_counter,
+                          self.fake_config, 'DEFAULT')
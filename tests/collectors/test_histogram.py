@@ -0,0 +1,72 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+import unittest
+
+import logretriever.collectors.histogram as histogram
+
+
+class TestLogHistogram(unittest.TestCase):
+
+    def setUp(self):
+        self.histogram = histogram.LogHistogram(significant_bits=4,
+                                                max_bits=12)
+
+    def test_buckets(self):
+        h = self.histogram
+        self.assertEqual([0, 7, 15, 16, 16, 17],
+                         [h.index(x) for x in [0, 7, 15, 16, 17, 18]])
+        self.assertEqual([0, 7, 15, 17, 19, 4095],
+                         [h.highest(x) for x in [0, 7, 15, 16, 17,
+                                                 h.index(4095)]])
+        self.assertEqual(len(h.counts) - 1, h.index(4095))
+
+    def test_percentiles_exact(self):
+        for x in range(1, 11):
+            self.histogram.add(x)
+
+        self.assertEqual([5, 10, 10, 1],
+                         self.histogram.percentiles([50, 95, 100, 10]))
+
+    def test_percentiles_relative_error(self):
+        for x in range(100, 4000, 7):
+            self.histogram.add(x)
+        values = list(range(100, 4000, 7))
+        for p, actual in zip([50, 90, 99],
+                             self.histogram.percentiles([50, 90, 99])):
+            expected = values[-(-p * len(values) // 100) - 1]
+            self.assertLessEqual(expected, actual)
+            self.assertLessEqual(actual, expected * (1 + 2.0 ** -3))
+
+    def test_percentiles_clamped_to_max(self):
+        self.histogram.add(17)
+
+        self.assertEqual([17], self.histogram.percentiles([99]))
+
+    def test_empty(self):
+        self.assertEqual([0, 0], self.histogram.percentiles([50, 99]))
+
+    def test_overflow(self):
+        self.histogram.add(10 ** 6)
+
+        self.assertEqual(4095, self.histogram.max)
+        self.assertEqual(1, self.histogram.counts[-1])
+
+    def test_merge_remove(self):
+        other = histogram.LogHistogram(significant_bits=4, max_bits=12)
+        self.histogram.add(3, 2)
+        other.add(100)
+
+        self.histogram.merge(other)
+        self.assertEqual(3, self.histogram.total)
+        self.assertEqual(100, self.histogram.max)
+
+        self.histogram.remove_index(self.histogram.index(3), 2)
+        self.assertEqual([100], self.histogram.percentiles([50]))
@@ -0,0 +1,71 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+import unittest
+
+import logretriever.collectors.hyperloglog as hyperloglog
+
+
+class TestHyperLogLog(unittest.TestCase):
+
+    def test_empty(self):
+        self.assertEqual(0, hyperloglog.HyperLogLog().count())
+
+    def test_small(self):
+        counter = hyperloglog.HyperLogLog()
+
+        counter.update(['a', 'b', 'a', 'c', None, 'c'])
+
+        self.assertEqual(4, counter.count())
+
+    def test_large(self):
+        counter = hyperloglog.HyperLogLog(10)
+
+        counter.update('10.0.%d.%d' % (i // 256, i % 256)
+                       for i in range(50000))
+
+        # Standard error is ~3.3% for precision 10, allow for 3 sigmas.
+        self.assertLess(abs(counter.count() - 50000), 50000 * 0.1)
+
+    def test_merge(self):
+        counter = hyperloglog.HyperLogLog(8)
+        other = hyperloglog.HyperLogLog(8)
+        counter.update(range(100))
+        other.update(range(50, 150))
+        expected = hyperloglog.HyperLogLog(8)
+        expected.update(range(150))
+
+        counter.merge(other)
+
+        self.assertEqual(expected.registers, counter.registers)
+
+    def test_union(self):
+        counters = [hyperloglog.HyperLogLog(8) for _ in range(3)]
+        for i, counter in enumerate(counters):
+            counter.update(range(i * 10, i * 10 + 20))
+        expected = hyperloglog.HyperLogLog(8)
+        expected.update(range(40))
+
+        union = hyperloglog.HyperLogLog.union(counters)
+
+        self.assertEqual(expected.registers, union.registers)
+
+    def test_merge_precision_mismatch(self):
+        self.assertRaises(ValueError, hyperloglog.HyperLogLog(8).merge,
+                          hyperloglog.HyperLogLog(9))
+
+    def test_bad_precision(self):
+        self.assertRaises(ValueError, hyperloglog.HyperLogLog, 3)
+        self.assertRaises(ValueError, hyperloglog.HyperLogLog, 17)
+
+    def test_hash_value_is_stable(self):
+        self.assertEqual(hyperloglog.hash_value('foo'),
+                         hyperloglog.hash_value(b'foo'))
+        self.assertEqual(0x5cf8c24cdb18bdac, hyperloglog.hash_value('foo'))
@@ -12,6 +12,7 @@ import collections
 import unittest
 import types
 
+import logretriever.columns as columns
 import logretriever.utils as utils
 import logretriever.collectors as collectors
 
@@ -21,10 +22,13 @@ class TestSectionCollector(unittest.TestCase):
     def setUp(self):
         getint = lambda self, *x: 1
         has_section = lambda self, *x: True
+        has_option = lambda self, *x: False
         self.fake_config = type('Fcon', (object,), {})
         self.fake_config.getint = types.MethodType(getint, self.fake_config)
         self.fake_config.has_section = types.MethodType(has_section,
                                                         self.fake_config)
+        self.fake_config.has_option = types.MethodType(has_option,
+                                                       self.fake_config)
         self.collector = collectors.SectionCollector(self.fake_config)
 
     def test_process_line(self):
@@ -39,6 +43,32 @@ class TestSectionCollector(unittest.TestCase):
 
         self.assertEqual(expected, self.collector.hist)
 
+    def test_process_batch(self):
+        line = utils.log_line(
+            '127.0.0.1', '-', 'foo',
+            '01/Jul/2000:00:00:00 +0000',
+            utils.request_line('GET', '/foo', 'HTTP/1.0'),
+            '200', '100')
+        expected = collections.Counter(['foo', 'foo'])
+
+        self.collector.process_batch([line, line])
+
+        self.assertEqual(expected, self.collector.hist)
+
+    def test_process_batch_columns(self):
+        batch = columns.parse_chunk(
+            '127.0.0.1 - foo [01/Jul/2000:00:00:00 +0000] '
+            '"GET /foo/x HTTP/1.0" 200 100\n'
+            '127.0.0.1 - bar [01/Jul/2000:00:00:00 +0000] '
+            '"GET /bar HTTP/1.0" 200 100\n'
+            '127.0.0.1 - foo [01/Jul/2000:00:00:00 +0000] '
+            '"GET /foo/y HTTP/1.0" 200 100\n')
+        expected = collections.Counter(['foo', 'bar', 'foo'])
+
+        self.collector.process_batch(batch)
+
+        self.assertEqual(expected, self.collector.hist)
+
     def test_get_stats_normal(self):
         line = utils.log_line(
             '127.0.0.1', '-', 'foo',
@@ -58,3 +88,77 @@ class TestSectionCollector(unittest.TestCase):
         actual = self.collector.get_stats()
 
         self.assertEqual(expected, actual)
+
+    def test_take_merge_partial(self):
+        line = utils.log_line(
+            '127.0.0.1', '-', 'foo',
+            '01/Jul/2000:00:00:00 +0000',
+            utils.request_line('GET', '/foo', 'HTTP/1.0'),
+            '200', '100')
+        peer = collectors.SectionCollector(self.fake_config)
+        expected = collections.Counter(['foo', 'foo'])
+
+        self.collector.process_line(line)
+        peer.process_line(line)
+        self.collector.merge_partial(peer.take_partial())
+
+        self.assertEqual(expected, self.collector.hist)
+        self.assertEqual(collections.Counter(), peer.hist)
+
+    def test_space_saving(self):
+        values = {'top_k_engine': 'space-saving', 'top_k_capacity': 2}
+        self.fake_config.has_option = lambda _, x: x in values
+        self.fake_config.get = lambda _, x: values[x]
+        self.fake_config.getint = lambda _, x: values.get(x, 1)
+        collector = collectors.SectionCollector(self.fake_config)
+        batch = columns.parse_chunk(''.join(
+            '127.0.0.1 - foo [01/Jul/2000:00:00:00 +0000] '
+            '"GET /%s HTTP/1.0" 200 100\n' % x
+            for x in ['foo', 'bar', 'foo', 'baz', 'foo']))
+
+        collector.process_batch(batch)
+
+        self.assertEqual(2, len(collector.hist))
+        self.assertEqual("1 most hit sections are: foo 3",
+                         collector.get_stats())
+
+    def test_window(self):
+        values = {'section_window': 2}
+        self.fake_config.has_option = lambda _, x: x in values
+        self.fake_config.getint = lambda _, x: values.get(x, 1)
+        collector = collectors.SectionCollector(self.fake_config)
+        line = lambda x: utils.log_line(
+            '127.0.0.1', '-', 'foo', '01/Jul/2000:00:00:00 +0000',
+            utils.request_line('GET', x, 'HTTP/1.0'), '200', '100')
+
+        collector.process_batch([line('/foo'), line('/foo/x'), line('/bar')])
+        collector.tick()
+        collector.process_batch([line('/bar'), line('/bar')])
+        collector.tick()
+        self.assertEqual(collector.window_message % (1, 2, 'bar 3'),
+                         collector.get_stats())
+        self.assertEqual(collector.window_message % (1, 2, 'bar 3'),
+                         collector.get_stats())
+
+        collector.tick()
+        self.assertEqual(collector.window_message % (1, 2, 'bar 2'),
+                         collector.get_stats())
+
+    def test_window_metrics(self):
+        values = {'section_window': 3}
+        self.fake_config.has_option = lambda _, x: x in values
+        self.fake_config.getint = lambda _, x: values.get(x, 1)
+        collector = collectors.SectionCollector(self.fake_config)
+        line = lambda x: utils.log_line(
+            '127.0.0.1', '-', 'foo', '01/Jul/2000:00:00:00 +0000',
+            utils.request_line('GET', x, 'HTTP/1.0'), '200', '100')
+
+        collector.process_batch([line('/foo'), line('/bar')])
+        collector.tick()
+        collector.get_stats()
+        collector.process_batch([line('/foo')])
+        collector.tick()
+        collector.process_batch([line('/bar'), line('/baz'), line('/baz')])
+
+        self.assertEqual({'sections': [('baz', 2), ('foo', 1)]},
+                         collector.get_metrics(2))
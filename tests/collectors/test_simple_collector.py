@@ -11,21 +11,26 @@
 import types
 import unittest
 
+import logretriever.columns as columns
 import logretriever.utils as utils
 import logretriever.collectors as collectors
+import logretriever.collectors.windows as windows
 
 
 class TestSimpleCollector(unittest.TestCase):
 
     def setUp(self):
-        values = {'alarm_interval': 2, 'statistics_interval': 1,
-                  'alarm_threshold': 2}
+        self.values = values = {'alarm_interval': 2, 'statistics_interval': 1,
+                                'alarm_threshold': 2}
         getint = lambda self, _, x: values[x]
         has_section = lambda self, *x: True
+        has_option = lambda self, _, x: x in values
         self.fake_config = type('Fcon', (object,), {})
         self.fake_config.getint = types.MethodType(getint, self.fake_config)
         self.fake_config.has_section = types.MethodType(has_section,
                                                         self.fake_config)
+        self.fake_config.has_option = types.MethodType(has_option,
+                                                       self.fake_config)
         self.collector = collectors.SimpleCollector(self.fake_config)
         self.alarm = ''
         self.collector.set_alarm_callback(self.set_alarm)
@@ -45,6 +50,26 @@ class TestSimpleCollector(unittest.TestCase):
 
         self.assertEqual(expected, self.alarm)
 
+    def test_reconfigure(self):
+        for _ in range(3):
+            self.collector.process_batch(['foo'] * 3)
+            self.collector.tick()
+        self.values.update({'alarm_interval': 3, 'statistics_interval': 2,
+                            'alarm_threshold': 4})
+
+        self.assertTrue(self.collector.reconfigure(self.fake_config))
+
+        self.assertEqual(4, self.collector.alarm_threshold)
+        self.assertEqual([0, 3, 3], list(self.collector.alarm_window))
+        self.assertEqual([0, 3], list(self.collector.stats_window))
+        self.assertEqual('Hit rate: 1', self.collector.get_stats())
+        self.alarm = ''
+        self.collector.process_batch(['foo'] * 6)
+        self.collector.tick()
+        self.assertEqual('', self.alarm)
+        self.collector.tick()
+        self.assertFalse(self.collector.alarm_is_on)
+
     def test_alarm_goes_away(self):
         expected1 = ': '.join(self.collector.lh_msg.split(': ')[1:]) % {
             'hr': 2}
@@ -64,6 +89,11 @@ class TestSimpleCollector(unittest.TestCase):
 
         self.assertEqual(expected2, self.alarm)
 
+    def test_process_batch(self):
+        self.collector.process_batch(['foo', 'bar'])
+
+        self.assertEqual(2, self.collector.events_count)
+
     def test_get_stats(self):
         expected = self.collector.stat_msg % 1
 
@@ -73,3 +103,65 @@ class TestSimpleCollector(unittest.TestCase):
         actual = self.collector.get_stats()
 
         self.assertEqual(expected, actual)
+
+    def test_take_merge_partial(self):
+        peer = collectors.SimpleCollector(self.fake_config)
+
+        self.collector.process_line('foo')
+        peer.process_line('foo')
+        self.collector.merge_partial(peer.take_partial())
+
+        self.assertEqual(2, self.collector.events_count)
+        self.assertEqual(0, peer.events_count)
+
+    def test_event_time(self):
+        self.collector.event_window = windows.EventTimeWindow(1, lambda: 12)
+        self.collector.event_window.closed = 9
+        date = '01/Jan/1970:00:00:%02d +0000'
+        line = lambda x: utils.log_line(None, None, None, date % x, None,
+                                        None, None)
+
+        self.collector.process_batch([line(10), line(11), line(11), line(9)])
+        self.collector.process_batch(columns.parse_chunk(
+            '1.1.1.1 - - [%s] "GET / HTTP/1.0" 200 1\n' % (date % 11)))
+        self.collector.tick()
+
+        self.assertEqual([1, 3], list(self.collector.alarm_window))
+        self.assertEqual(1, self.collector.event_window.late)
+        self.assertEqual(0, self.collector.events_count)
+
+    def test_event_time_mode(self):
+        self.values['time_mode'] = 'event'
+        self.fake_config.get = lambda _, x: self.values[x]
+
+        collector = collectors.SimpleCollector(self.fake_config)
+
+        self.assertEqual(frozenset(['date']), collector.required_fields)
+        self.assertEqual(2, collector.event_window.allowed_lateness)
+
+    def test_rate_horizons(self):
+        self.values['rate_horizons'] = '60, 100000'
+        self.fake_config.get = lambda _, x: self.values[x]
+        self.collector = collectors.SimpleCollector(self.fake_config)
+        expected = ', '.join([self.collector.stat_msg % 3,
+                              self.collector.horizon_msg % (60, 3),
+                              self.collector.horizon_msg % (86400, 0.125)])
+
+        for _ in range(3600):
+            self.collector.process_batch(['foo'] * 3)
+            self.collector.tick()
+
+        self.assertEqual(expected, self.collector.get_stats())
+
+    def test_rate_horizon_not_aligned(self):
+        self.values['rate_horizons'] = '90'
+        self.fake_config.get = lambda _, x: self.values[x]
+        self.collector = collectors.SimpleCollector(self.fake_config)
+
+        for _ in range(600):
+            self.collector.process_batch(['foo'] * 10)
+            self.collector.tick()
+
+        self.assertEqual(', '.join([self.collector.stat_msg % 10,
+                                    self.collector.horizon_msg % (90, 10)]),
+                         self.collector.get_stats())
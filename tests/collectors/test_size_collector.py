@@ -0,0 +1,103 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+import types
+import unittest
+
+import logretriever.columns as columns
+import logretriever.utils as utils
+import logretriever.collectors as collectors
+
+
+def make_line(size):
+    return utils.log_line('127.0.0.1', '-', 'foo',
+                          '01/Jul/2000:00:00:00 +0000',
+                          utils.request_line('GET', '/foo', 'HTTP/1.0'),
+                          '200', str(size))
+
+
+class TestSizeCollector(unittest.TestCase):
+
+    def setUp(self):
+        self.values = values = {'statistics_interval': 1, 'alarm_interval': 2,
+                                'size_percentiles': '50, 100'}
+        getint = lambda self, _, x: values[x]
+        get = lambda self, _, x: values[x]
+        has_section = lambda self, *x: True
+        has_option = lambda self, _, x: x in values
+        self.fake_config = type('Fcon', (object,), {})
+        self.fake_config.getint = types.MethodType(getint, self.fake_config)
+        self.fake_config.getfloat = types.MethodType(getint, self.fake_config)
+        self.fake_config.get = types.MethodType(get, self.fake_config)
+        self.fake_config.has_section = types.MethodType(has_section,
+                                                        self.fake_config)
+        self.fake_config.has_option = types.MethodType(has_option,
+                                                       self.fake_config)
+        self.collector = collectors.SizeCollector(self.fake_config)
+        self.alarm = ''
+        self.collector.set_alarm_callback(self.set_alarm)
+
+    def set_alarm(self, x):
+        self.alarm = ' '.join(x.split(' ')[2:])
+
+    def test_get_stats(self):
+        expected = self.collector.stat_msg % ('p50/p100/max', '10/30/30', 2,
+                                              '0/0/0')
+
+        for size in [10, 20, 30, 5]:
+            self.collector.process_line(make_line(size))
+
+        self.assertEqual(expected, self.collector.get_stats())
+        self.assertEqual(0, self.collector.interval.total)
+
+    def test_window(self):
+        self.collector.process_batch([make_line(10), make_line(20)])
+        self.collector.tick()
+        self.collector.process_batch(columns.parse_chunk(
+            '127.0.0.1 - foo [01/Jul/2000:00:00:00 +0000] '
+            '"GET /foo HTTP/1.0" 200 30\n'))
+        self.collector.tick()
+        self.assertEqual('20/30/30', self.collector._format(
+            self.collector.window))
+
+        self.collector.tick()
+        self.assertEqual('30/30/30', self.collector._format(
+            self.collector.window))
+
+        self.collector.tick()
+        self.assertEqual('0/0/0', self.collector._format(
+            self.collector.window))
+
+    def test_alarm(self):
+        self.collector.alarm_threshold = 1000
+        expected1 = self.collector.lh_msg.split(': ', 1)[1] % {
+            'p': '99', 'v': 2000}
+        expected2 = self.collector.hl_msg.split(': ', 1)[1]
+
+        self.collector.process_line(make_line(2000))
+        self.collector.tick()
+        self.assertEqual(expected1, self.alarm)
+
+        self.collector.tick()
+        self.collector.tick()
+        self.assertEqual(expected2, self.alarm)
+
+    def test_take_merge_partial(self):
+        peer = collectors.SizeCollector(self.fake_config)
+        self.collector.process_line(make_line(10))
+        peer.process_line(make_line(20))
+
+        self.collector.merge_partial(peer.take_partial())
+        self.collector.tick()
+
+        self.assertEqual('10/20/20', self.collector._format(
+            self.collector.window))
+        self.assertEqual(2, self.collector.interval.total)
+        self.assertEqual(0, peer.interval.total)
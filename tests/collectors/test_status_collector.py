@@ -0,0 +1,126 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+import types
+import unittest
+
+import logretriever.columns as columns
+import logretriever.utils as utils
+import logretriever.collectors as collectors
+import logretriever.representers as representers
+
+
+def make_line(code):
+    return utils.log_line('127.0.0.1', '-', 'foo',
+                          '01/Jul/2000:00:00:00 +0000',
+                          utils.request_line('GET', '/foo', 'HTTP/1.0'),
+                          code, '100')
+
+
+class TestStatusCollector(unittest.TestCase):
+
+    def setUp(self):
+        values = {'alarm_interval': 2, 'statistics_interval': 1,
+                  'alarms_to_keep_track_of': 1}
+        getint = lambda self, _, x: values[x]
+        has_section = lambda self, *x: True
+        has_option = lambda self, *x: False
+        self.fake_config = type('Fcon', (object,), {})
+        self.fake_config.getint = types.MethodType(getint, self.fake_config)
+        self.fake_config.has_section = types.MethodType(has_section,
+                                                        self.fake_config)
+        self.fake_config.has_option = types.MethodType(has_option,
+                                                       self.fake_config)
+        self.collector = collectors.StatusCollector(self.fake_config)
+        self.alarm = ''
+        self.collector.set_alarm_callback(self.set_alarm)
+
+    def set_alarm(self, x):
+        self.alarm = ' '.join(x.split(' ')[2:])
+
+    def test_process_line(self):
+        for code in ['200', '200', '404', '503', '999']:
+            self.collector.process_line(make_line(code))
+
+        self.assertEqual(2, self.collector.codes[200])
+        self.assertEqual(1, self.collector.codes[0])
+
+    def test_process_batch(self):
+        self.collector.process_batch([make_line(x) for x in
+                                      ['200', '302', '302', '700']])
+
+        self.assertEqual(2, self.collector.codes[302])
+        self.assertEqual(2, self.collector.pending[302])
+        self.assertEqual(1, self.collector.codes[0])
+
+    def test_process_batch_columns(self):
+        batch = columns.parse_chunk(''.join(
+            '127.0.0.1 - foo [01/Jul/2000:00:00:00 +0000] '
+            '"GET /foo HTTP/1.0" %s 100\n' % x
+            for x in ['200', '302', '302', '700']))
+
+        self.collector.process_batch(batch)
+
+        self.assertEqual(2, self.collector.codes[302])
+        self.assertEqual(1, self.collector.codes[0])
+
+    def test_get_stats(self):
+        expected = self.collector.stat_msg % (
+            2, 0, 1, 1, '200: 2, 404: 1, 500: 1', 2, 25.0)
+        for code in ['200', '404', '500', '200']:
+            self.collector.process_line(make_line(code))
+        self.collector.tick()
+
+        self.assertEqual(expected, self.collector.get_stats())
+        self.assertEqual(0, sum(self.collector.codes))
+
+    def test_alarm(self):
+        expected1 = self.collector.lh_msg.split(': ', 1)[1] % {'ratio': 50}
+        expected2 = self.collector.hl_msg.split(': ', 1)[1]
+
+        self.collector.process_line(make_line('200'))
+        self.collector.process_line(make_line('500'))
+        self.collector.tick()
+        self.assertEqual(expected1, self.alarm)
+
+        self.collector.get_stats()
+        for _ in range(10):
+            self.collector.process_line(make_line('200'))
+        self.collector.tick()
+        self.assertEqual(expected1, self.alarm)
+
+        self.collector.process_line(make_line('200'))
+        self.collector.tick()
+        self.assertEqual(expected2, self.alarm)
+
+    def test_take_merge_partial(self):
+        peer = collectors.StatusCollector(self.fake_config)
+        self.collector.process_line(make_line('200'))
+        peer.process_line(make_line('200'))
+
+        self.collector.merge_partial(peer.take_partial())
+
+        self.assertEqual(2, self.collector.codes[200])
+        self.assertEqual(2, self.collector.pending[200])
+        self.assertEqual(0, sum(peer.codes))
+
+    def test_stats_shown_every_second(self):
+        display = representers.SimpleStatsRepresenter(self.fake_config,
+                                                      [self.collector])
+        display.show_stats = lambda: self.collector.get_stats()
+        self.collector.set_alarm_callback(self.set_alarm)
+        expected = self.collector.lh_msg.split(': ', 1)[1] % {'ratio': 100}
+
+        self.collector.process_line(make_line('503'))
+        display.tick()
+
+        self.assertEqual(1, self.collector.total_window.total)
+        self.assertEqual(100.0, self.collector.error_ratio())
+        self.assertEqual(expected, self.alarm)
@@ -12,6 +12,7 @@ import collections
 import unittest
 import types
 
+import logretriever.columns as columns
 import logretriever.utils as utils
 import logretriever.collectors as collectors
 
@@ -21,10 +22,13 @@ class TestUserCollector(unittest.TestCase):
     def setUp(self):
         getint = lambda self, *x: 1
         has_section = lambda self, *x: True
+        has_option = lambda self, *x: False
         self.fake_config = type('Fcon', (object,), {})
         self.fake_config.getint = types.MethodType(getint, self.fake_config)
         self.fake_config.has_section = types.MethodType(has_section,
                                                         self.fake_config)
+        self.fake_config.has_option = types.MethodType(has_option,
+                                                       self.fake_config)
         self.collector = collectors.UserCollector(self.fake_config)
 
     def test_process_line(self):
@@ -39,6 +43,32 @@ class TestUserCollector(unittest.TestCase):
 
         self.assertEqual(expected, self.collector.hist)
 
+    def test_process_batch(self):
+        line = utils.log_line(
+            '127.0.0.1', '-', 'foo',
+            '01/Jul/2000:00:00:00 +0000',
+            utils.request_line('GET', '/foo', 'HTTP/1.0'),
+            '200', '100')
+        expected = collections.Counter(['foo', 'foo'])
+
+        self.collector.process_batch([line, line])
+
+        self.assertEqual(expected, self.collector.hist)
+
+    def test_process_batch_columns(self):
+        batch = columns.parse_chunk(
+            '127.0.0.1 - foo [01/Jul/2000:00:00:00 +0000] '
+            '"GET /foo/x HTTP/1.0" 200 100\n'
+            '127.0.0.1 - bar [01/Jul/2000:00:00:00 +0000] '
+            '"GET /bar HTTP/1.0" 200 100\n'
+            '127.0.0.1 - foo [01/Jul/2000:00:00:00 +0000] '
+            '"GET /foo/y HTTP/1.0" 200 100\n')
+        expected = collections.Counter(['foo', 'bar', 'foo'])
+
+        self.collector.process_batch(batch)
+
+        self.assertEqual(expected, self.collector.hist)
+
     def test_get_stats_data_ok(self):
         line = utils.log_line(
             '127.0.0.1', '-', 'foo',
@@ -58,3 +88,19 @@ class TestUserCollector(unittest.TestCase):
         actual = self.collector.get_stats()
 
         self.assertEqual(expected, actual)
+
+    def test_take_merge_partial(self):
+        line = utils.log_line(
+            '127.0.0.1', '-', 'foo',
+            '01/Jul/2000:00:00:00 +0000',
+            utils.request_line('GET', '/foo', 'HTTP/1.0'),
+            '200', '100')
+        peer = collectors.UserCollector(self.fake_config)
+        expected = collections.Counter(['foo', 'foo'])
+
+        self.collector.process_line(line)
+        peer.process_line(line)
+        self.collector.merge_partial(peer.take_partial())
+
+        self.assertEqual(expected, self.collector.hist)
+        self.assertEqual(collections.Counter(), peer.hist)
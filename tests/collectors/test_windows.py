@@ -0,0 +1,155 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+import collections
+import unittest
+
+import logretriever.collectors.windows as windows
+
+
+class TestEventTimeWindow(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 100
+        self.window = windows.EventTimeWindow(2, lambda: self.now)
+
+    def test_first_close(self):
+        self.window.add(97, 3)
+        self.window.add(98)
+
+        self.assertEqual([1], self.window.close())
+        self.assertEqual(98, self.window.closed)
+        self.assertEqual(3, self.window.late)
+
+    def test_allowed_lateness(self):
+        self.window.close()
+        self.window.add(99)
+        self.window.add(100, 2)
+
+        self.now = 101
+        self.assertEqual([1], self.window.close())
+        self.now = 102
+        self.assertEqual([2], self.window.close())
+        self.assertEqual(0, self.window.late)
+
+    def test_late(self):
+        self.window.close()
+
+        self.assertFalse(self.window.add(98, 5))
+        self.assertTrue(self.window.add(99))
+        self.assertEqual(5, self.window.late)
+
+    def test_catch_up(self):
+        self.window.close()
+        self.window.add(99)
+        self.window.add(103, 4)
+
+        self.now = 105
+        self.assertEqual([1, 0, 0, 0, 4], self.window.close())
+
+    def test_catch_up_limit(self):
+        self.window.close()
+        self.window.add(99)
+        self.window.add(103, 4)
+
+        self.now = 105
+        self.assertEqual([0, 4], self.window.close(2))
+        self.assertEqual(103, self.window.closed)
+        self.assertEqual(1, self.window.late)
+
+    def test_take_merge_buckets(self):
+        peer = windows.EventTimeWindow(2, lambda: self.now)
+        peer.add(99, 2)
+        self.window.add(99)
+
+        self.window.merge_buckets(peer.take_buckets())
+
+        self.assertEqual({99: 3}, self.window.buckets)
+        self.assertEqual({}, peer.buckets)
+
+
+class TestRingBuffer(unittest.TestCase):
+
+    def test_push(self):
+        ring = windows.RingBuffer(3)
+
+        for x in range(1, 5):
+            ring.push(x)
+
+        self.assertEqual([2, 3, 4], list(ring))
+        self.assertEqual(9, ring.total)
+        self.assertEqual(4, ring.push(5) + 2)
+
+    def test_last(self):
+        ring = windows.RingBuffer(4)
+        for x in range(1, 7):
+            ring.push(x)
+
+        self.assertEqual(11, ring.last(2))
+        self.assertEqual(18, ring.last(4))
+        self.assertEqual(18, ring.last(10))
+
+    def test_resize(self):
+        ring = windows.RingBuffer(3)
+        for x in range(1, 5):
+            ring.push(x)
+
+        ring.resize(5)
+        self.assertEqual([0, 0, 2, 3, 4], list(ring))
+        ring.push(5)
+        ring.resize(2)
+
+        self.assertEqual([4, 5], list(ring))
+        self.assertEqual(9, ring.total)
+        self.assertEqual(4, ring.push(6))
+
+
+class TestRateHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.history = windows.RateHistory(((1, 4), (2, 3), (6, 2)))
+
+    def test_rollup(self):
+        for x in range(1, 13):
+            self.history.push(x)
+
+        self.assertEqual([9, 10, 11, 12], list(self.history.levels[0]))
+        self.assertEqual([15, 19, 23], list(self.history.levels[1]))
+        self.assertEqual([21, 57], list(self.history.levels[2]))
+
+    def test_total(self):
+        for x in range(1, 13):
+            self.history.push(x)
+
+        self.assertEqual((23, 2), self.history.total(2))
+        self.assertEqual((42, 4), self.history.total(4))
+        self.assertEqual((57, 6), self.history.total(5))
+        self.assertEqual((57, 6), self.history.total(6))
+        self.assertEqual((78, 12), self.history.total(7))
+        self.assertEqual((78, 12), self.history.total(100))
+        self.assertEqual(12, self.history.span)
+
+
+class TestSlidingCounter(unittest.TestCase):
+
+    def test_push(self):
+        counter = windows.SlidingCounter(2)
+
+        counter.push(collections.Counter('aab'))
+        counter.push(collections.Counter('bc'))
+        self.assertEqual({'a': 2, 'b': 2, 'c': 1}, counter.total)
+
+        counter.push(collections.Counter('c'))
+        self.assertEqual({'b': 1, 'c': 2}, counter.total)
+        self.assertEqual([('c', 2)], counter.most_common(1))
+
+        counter.push({})
+        counter.push({})
+        self.assertEqual({}, counter.total)
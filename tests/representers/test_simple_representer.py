@@ -53,6 +53,20 @@ class TestSimpleRepresenter(unittest.TestCase):
         self.assertTrue('foo' in self.representer.alarms)
         self.assertEqual(1, self.representer.alarms.count('foo'))
 
+    def test_reconfigure(self):
+        getint = lambda self, _, x: {'statistics_interval': 3,
+                                     'alarms_to_keep_track_of': 2}[x]
+        self.fake_config.getint = types.MethodType(getint, self.fake_config)
+        self.representer.alarm_callback('foo')
+        collector = type("Fcol", (object,), {})()
+        collector.set_alarm_callback = lambda x: setattr(collector, 'cb', x)
+
+        self.representer.reconfigure(self.fake_config, [collector])
+
+        self.assertEqual(3, self.representer.stats_period)
+        self.assertEqual(['', 'foo'], self.representer.alarms)
+        self.assertEqual(self.representer.alarm_callback, collector.cb)
+
     def test_show_stats(self):
 
         os.system = lambda *x: True
@@ -62,6 +76,19 @@ class TestSimpleRepresenter(unittest.TestCase):
 
         self.representer.alarm_callback(alarm_code)
         self.representer.show_stats()
+        sys.stdout = old_stdout
 
         self.assertTrue(alarm_code in new_stdout.getvalue())
         self.assertTrue('fake stats' in new_stdout.getvalue())
+
+    def test_show_stats_monitors(self):
+        os.system = lambda *x: True
+        old_stdout = sys.stdout
+        sys.stdout = new_stdout = StringIO.StringIO()
+        monitor = type("Fmon", (object,), {'get_stats': lambda *x: 'meep'})()
+
+        self.representer.add_monitor(monitor)
+        self.representer.show_stats()
+        sys.stdout = old_stdout
+
+        self.assertTrue('meep' in new_stdout.getvalue())
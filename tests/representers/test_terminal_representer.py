@@ -0,0 +1,142 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+try:
+    import ConfigParser
+except ImportError:
+    import configparser as ConfigParser
+try:
+    import StringIO
+except ImportError:
+    import io as StringIO
+import os
+import unittest
+
+import logretriever.representers as representers
+import logretriever.representers.terminal_representer as terminal
+
+
+class FakeTerminal(StringIO.StringIO):
+
+    writes = 0
+
+    def isatty(self):
+        return True
+
+    def write(self, data):
+        self.writes += 1
+        return StringIO.StringIO.write(self, data)
+
+    def take(self):
+        value = self.getvalue()
+        self.seek(0)
+        self.truncate()
+        return value
+
+
+class FakeCollector(object):
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def set_alarm_callback(self, callback):
+        self.alarm = callback
+
+    def get_stats(self):
+        return self.stats
+
+
+class TestTerminalRepresenter(unittest.TestCase):
+
+    def setUp(self):
+        self.old_environ = dict(os.environ)
+        os.environ.update({'COLUMNS': '40', 'LINES': '20'})
+        config = ConfigParser.RawConfigParser()
+        config.set('DEFAULT', 'statistics_interval', '1')
+        config.add_section('TerminalRepresenter')
+        config.set('TerminalRepresenter', 'alarms_to_keep_track_of', '2')
+        self.collectors = [FakeCollector('foo'), FakeCollector('bar')]
+        self.stream = FakeTerminal()
+        self.representer = representers.TerminalRepresenter(
+            config, self.collectors, self.stream)
+        # ANSI sequences regardless of the terminal tests are run in.
+        self.representer.terminal = terminal.Terminal(None)
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self.old_environ)
+
+    def test_first_screen(self):
+        self.representer.show_stats()
+
+        out = self.stream.take()
+        self.assertTrue(out.startswith('\x1b[H\x1b[2J'))
+        self.assertIn('\x1b[9;1Hfoo\x1b[K\x1b[10;1Hbar\x1b[K', out)
+        self.assertTrue(out.endswith('\x1b[11;1H\x1b[J'))
+        self.assertEqual(1, self.stream.writes)
+
+    def test_only_changes_written(self):
+        self.representer.show_stats()
+        self.stream.take()
+
+        self.representer.show_stats()
+        self.assertEqual('\x1b[11;1H\x1b[J', self.stream.take())
+        self.collectors[1].stats = 'baz'
+        self.representer.show_stats()
+        self.assertEqual('\x1b[10;1Hbaz\x1b[K\x1b[11;1H\x1b[J',
+                         self.stream.take())
+
+    def test_shorter_screen(self):
+        self.collectors[1].stats = 'bar\nquux'
+        self.representer.show_stats()
+        self.collectors[1].stats = 'bar'
+        self.stream.take()
+
+        self.representer.show_stats()
+
+        self.assertEqual('\x1b[11;1H\x1b[J', self.stream.take())
+
+    def test_alarm(self):
+        self.representer.show_stats()
+        self.stream.take()
+
+        self.collectors[0].alarm('fire')
+
+        self.assertEqual('\x1b[5;1Hfire\x1b[K\x1b[11;1H\x1b[J',
+                         self.stream.take())
+        self.assertEqual(['', 'fire'], self.representer.alarms)
+
+    def test_fit(self):
+        self.collectors[0].stats = 'x' * 50
+        os.environ['LINES'] = '10'
+
+        self.representer.show_stats()
+
+        self.assertEqual(['x' * 39], self.representer.screen[8:])
+
+    def test_resize(self):
+        self.representer.show_stats()
+        self.stream.take()
+        os.environ['COLUMNS'] = '50'
+
+        self.representer.show_stats()
+
+        self.assertIn('\x1b[H\x1b[2J', self.stream.take())
+
+    def test_not_live(self):
+        self.representer.live = False
+
+        self.representer.show_stats()
+        self.collectors[0].alarm('fire')
+
+        self.assertEqual(
+            '\nMost recent alarms\n%s\n\n\n\nStatistics over last 1 seconds:'
+            '\n%s\nfoo\nbar\nfire\n' % ('-' * 30, '-' * 30),
+            self.stream.getvalue())
@@ -0,0 +1,69 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+import bz2
+import gzip
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import logretriever.archives as archives
+
+
+class TestArchives(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.data = b''.join(b'line %d\n' % i for i in range(1000))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def check_roundtrip(self, ext, compress):
+        fname = os.path.join(self.tmpdir, 'access.log' + ext)
+        with compress(fname, 'wb') as f:
+            f.write(self.data)
+
+        with archives.open_log(fname, 1024) as f:
+            chunks = list(archives.read_lines(f, 100))
+
+        self.assertEqual(self.data, b''.join(chunks))
+        self.assertTrue(all(x.endswith(b'\n') for x in chunks))
+
+    def test_plain(self):
+        self.check_roundtrip('', io.open)
+
+    def test_gzip(self):
+        self.check_roundtrip('.gz', gzip.open)
+
+    def test_bzip2(self):
+        self.check_roundtrip('.bz2', bz2.BZ2File)
+
+    @unittest.skipIf(archives.lzma is None, "lzma is not available")
+    def test_xz(self):
+        self.check_roundtrip('.xz', archives.lzma.open)
+
+    def test_is_archive(self):
+        self.assertTrue(archives.is_archive('/var/log/access.log.1.gz'))
+        self.assertFalse(archives.is_archive('/var/log/access.log.1'))
+
+    def test_read_lines(self):
+        f = io.BytesIO(b'foo\nbarbaz\nquux\nx')
+
+        self.assertEqual([b'foo\n', b'barbaz\n', b'quux\n', b'x'],
+                         list(archives.read_lines(f, 5)))
+
+    def test_read_lines_limit(self):
+        f = io.BytesIO(b'foo\nbar\nbaz\n')
+
+        self.assertEqual([b'foo\n', b'bar\n'],
+                         list(archives.read_lines(f, 3, 8)))
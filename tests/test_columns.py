@@ -0,0 +1,115 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+import collections
+import unittest
+
+import logretriever.columns as columns
+import logretriever.utils as utils
+
+
+chunk = ('127.0.0.1 - foo [01/Jul/2000:00:00:00 +0000] '
+         '"GET /foo HTTP/1.0" 200 100\n'
+         'spam\n'
+         '127.0.0.2 - bar [01/Jul/2000:00:00:01 +0000] '
+         '"POST /bar/baz HTTP/1.1" 404 7\n'
+         '127.0.0.1 - foo [01/Jul/2000:00:00:01 +0000] '
+         '"GET /foo" 200 100\n'
+         '127.0.0.1 - foo [01/Jul/2000:00:00:01 +0000] '
+         '"GET /foo HTTP/1.0" 304 0\n')
+
+
+class TestDictColumn(unittest.TestCase):
+
+    def test_encoding(self):
+        column = columns.DictColumn(['b', 'a', 'b'])
+
+        self.assertEqual(['b', 'a'], column.values)
+        self.assertEqual([0, 1, 0], list(column.codes))
+        self.assertEqual(['b', 'a', 'b'], list(column))
+        self.assertEqual('a', column[1])
+
+    def test_decode(self):
+        column = columns.DictColumn([b'a', b'a'], lambda x: x.decode())
+
+        self.assertEqual(['a'], column.values)
+
+    def test_counts(self):
+        column = columns.DictColumn(['b', 'a', 'b'])
+        expected = collections.Counter(['b', 'a', 'b'])
+
+        actual = column.counts()
+
+        self.assertEqual(expected, actual)
+        self.assertEqual(['b', 'a'], list(actual))
+
+
+class TestParseChunk(unittest.TestCase):
+
+    def test_same_as_rows(self):
+        expected = utils.parse_chunk(chunk, 'access.log')
+
+        actual = columns.parse_chunk(chunk, 'access.log')
+
+        self.assertEqual(3, len(actual))
+        self.assertEqual(expected, list(actual))
+
+    def test_binary(self):
+        expected = utils.parse_chunk(chunk)
+
+        actual = columns.parse_chunk(memoryview(chunk.encode('ascii')))
+
+        self.assertEqual(expected, list(actual))
+
+    def test_numeric_columns(self):
+        actual = columns.parse_chunk(chunk)
+
+        self.assertEqual([200, 404, 304],
+                         list(actual.column('response_code')))
+        self.assertEqual([100, 7, 0], list(actual.column('size')))
+
+    def test_numeric_columns_overflow(self):
+        actual = columns.parse_chunk(
+            '127.0.0.1 - foo [01/Jul/2000:00:00:00 +0000] '
+            '"GET /foo HTTP/1.0" 99999 100000000000000000000\n')
+
+        self.assertEqual([65535], list(actual.column('response_code')))
+        self.assertTrue(actual.column('size')[0] > 0)
+
+    def test_projected(self):
+        expected = [utils.log_line(None, None, x.userid, None, None,
+                                   x.response_code, None)
+                    for x in utils.parse_chunk(chunk)]
+
+        actual = columns.parse_chunk(chunk, fields=['userid',
+                                                    'response_code'])
+
+        self.assertEqual(set(['userid', 'response_code']),
+                         set(actual.columns))
+        self.assertEqual(expected, list(actual))
+
+    def test_make_parser(self):
+        parse = columns.make_parser(['path'])
+
+        actual = parse(chunk, 'access.log')
+
+        self.assertEqual(['/foo', '/bar/baz', '/foo'],
+                         list(actual.column('path')))
+        self.assertEqual('access.log', actual.source)
+
+    def test_make_parser_unknown(self):
+        with self.assertRaises(ValueError):
+            columns.make_parser(['spam'])
+
+    def test_empty(self):
+        actual = columns.parse_chunk('spam\n')
+
+        self.assertEqual(0, len(actual))
+        self.assertEqual([], list(actual))
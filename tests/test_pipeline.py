@@ -0,0 +1,281 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+try:
+    import ConfigParser
+except ImportError:
+    import configparser as ConfigParser
+import threading
+import unittest
+
+import logretriever.collectors as collectors
+import logretriever.columns as columns
+import logretriever.pipeline as pipeline
+import logretriever.utils as utils
+
+
+def make_chunk(lines):
+    return b''.join(
+        b'127.0.0.1 - user%d [01/Jul/2000:00:00:00 +0000] '
+        b'"GET /s%d/x HTTP/1.0" 200 100\n' % (i % 7, i % 5)
+        for i in range(lines))
+
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.config = ConfigParser.RawConfigParser()
+        for option, value in (('collectors', 'SimpleCollector, '
+                               'SectionCollector, UserCollector'),
+                              ('statistics_interval', '3'),
+                              ('alarm_interval', '10'),
+                              ('alarm_threshold', '5'),
+                              ('ignore_missing_bits', 'False')):
+            self.config.set('DEFAULT', option, value)
+
+    def test_split_chunk(self):
+        chunk = b'foo\nbar\nbaz\nquux\n'
+        expected = [b'foo\nbar\n', b'baz\nquux\n']
+
+        actual = pipeline.split_chunk(memoryview(chunk), 2, min_size=1)
+
+        self.assertEqual(expected, actual)
+
+    def test_split_chunk_small(self):
+        chunk = b'foo\nbar\n'
+
+        actual = pipeline.split_chunk(chunk, 4)
+
+        self.assertEqual([chunk], actual)
+
+    def test_process_chunk(self):
+        cols = utils.load(self.config, 'collectors', collectors)
+
+        pipeline.process_chunk(cols, make_chunk(10))
+
+        self.assertEqual(10, cols[0].events_count)
+
+    def test_required_fields(self):
+        cols = utils.load(self.config, 'collectors', collectors)
+        everything = type('Fcol', (object,), {'required_fields': None})()
+
+        self.assertEqual(set(['path', 'userid']),
+                         pipeline.required_fields(cols))
+        self.assertEqual(None, pipeline.required_fields(cols + [everything]))
+
+    def test_get_parser(self):
+        cols = utils.load(self.config, 'collectors', collectors)
+        rows = pipeline.get_parser(self.config, cols)(make_chunk(1))
+        self.config.set('DEFAULT', 'batch_format', 'columns')
+        batch = pipeline.get_parser(self.config, cols)(make_chunk(1))
+
+        self.assertEqual('user0', rows[0].userid)
+        self.assertEqual(None, rows[0].ip)
+        self.assertTrue(isinstance(batch, columns.LogBatch))
+        self.assertEqual(set(['path', 'userid']), set(batch.columns))
+
+    def test_process_chunk_columns(self):
+        self.config.set('DEFAULT', 'batch_format', 'columns')
+        expected = utils.load(self.config, 'collectors', collectors)
+        actual = utils.load(self.config, 'collectors', collectors)
+
+        pipeline.process_chunk(expected, make_chunk(20))
+        pipeline.process_chunk(actual, make_chunk(20),
+                               parse=pipeline.get_parser(self.config, actual))
+
+        for e, a in zip(expected, actual):
+            e.tick()
+            a.tick()
+            self.assertEqual(e.get_stats(), a.get_stats())
+
+    def test_worker_pool_same_as_single_process(self):
+        chunks = [('a', make_chunk(1000)), ('b', make_chunk(7))]
+        expected_cols = utils.load(self.config, 'collectors', collectors)
+        actual_cols = utils.load(self.config, 'collectors', collectors)
+        for source, chunk in chunks:
+            pipeline.process_chunk(expected_cols, chunk, source)
+
+        pool = pipeline.WorkerPool(self.config, 2)
+        try:
+            pool.process(actual_cols, iter(chunks))
+        finally:
+            pool.close()
+
+        for expected, actual in zip(expected_cols, actual_cols):
+            expected.tick()
+            actual.tick()
+            self.assertEqual(expected.get_stats(), actual.get_stats())
+
+
+class TestBoundedQueue(unittest.TestCase):
+
+    def test_get_put(self):
+        queue = pipeline.BoundedQueue(2)
+
+        queue.put('foo', 1)
+        queue.put('bar', 1)
+
+        self.assertEqual(['foo', 'bar'], [queue.get(), queue.get()])
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            pipeline.BoundedQueue(2, 'spam')
+
+    def test_block(self):
+        queue = pipeline.BoundedQueue(1)
+        queue.put('foo', 1)
+        putter = threading.Thread(target=queue.put, args=('bar', 1))
+
+        putter.start()
+        putter.join(0.05)
+        blocked = putter.is_alive()
+        first = queue.get()
+        putter.join()
+
+        self.assertTrue(blocked)
+        self.assertEqual('foo', first)
+        self.assertEqual('bar', queue.get())
+        self.assertEqual(0, queue.dropped_lines)
+
+    def test_drop_oldest(self):
+        queue = pipeline.BoundedQueue(2, 'drop-oldest')
+
+        for i in range(4):
+            queue.put(i, 10)
+
+        self.assertEqual([2, 3], queue.drain())
+        self.assertEqual(2, queue.dropped_chunks)
+        self.assertEqual(20, queue.dropped_lines)
+
+    def test_sample(self):
+        queue = pipeline.BoundedQueue(1, 'sample', sample_ratio=2)
+
+        for i in range(5):
+            queue.put(i, 1)
+
+        self.assertEqual([4], queue.drain())
+        self.assertEqual(4, queue.dropped_chunks)
+
+    def test_close(self):
+        queue = pipeline.BoundedQueue(1)
+        queue.put('foo', 1)
+
+        queue.close()
+
+        self.assertEqual('foo', queue.get())
+        self.assertEqual(None, queue.get())
+
+    def test_get_stats(self):
+        queue = pipeline.BoundedQueue(1, 'drop-oldest')
+        queue.put('foo', 3)
+        queue.put('bar', 1)
+
+        actual = queue.get_stats()
+
+        self.assertEqual(queue.stat_msg % (1, 1, 3), actual)
+
+
+class TestProcessor(unittest.TestCase):
+
+    def test_run(self):
+        config = ConfigParser.RawConfigParser()
+        for option, value in (('statistics_interval', '1'),
+                              ('alarm_interval', '1'),
+                              ('alarm_threshold', '1')):
+            config.set('DEFAULT', option, value)
+        collector = collectors.SimpleCollector(config)
+        queue = pipeline.BoundedQueue(4)
+        processor = pipeline.Processor([collector], queue, threading.Lock())
+
+        queue.put(('a', make_chunk(3), 'pos1'), 3)
+        queue.put(('a', make_chunk(2), 'pos2'), 2)
+        queue.close()
+        processor.run()
+
+        self.assertEqual(5, collector.events_count)
+        self.assertEqual({'a': 'pos2'}, processor.positions)
+
+    def test_positions_kept(self):
+        queue = pipeline.BoundedQueue(4)
+        processor = pipeline.Processor([], queue, threading.Lock(),
+                                       positions={'a': 'pos0', 'b': 'pos1'})
+
+        queue.put(('a', make_chunk(1), 'pos2'), 1)
+        queue.close()
+        processor.run()
+
+        self.assertEqual({'a': 'pos2', 'b': 'pos1'}, processor.positions)
+
+    def test_parse_outside_lock(self):
+        lock = threading.Lock()
+        held = []
+
+        def parse(chunk, source=None):
+            held.append(lock.locked())
+            return utils.parse_chunk(chunk, source)
+        queue = pipeline.BoundedQueue(4)
+        collector = type('Fcol', (object,), {})()
+        collector.process_batch = lambda lines: held.append(lock.locked())
+        processor = pipeline.Processor([collector], queue, lock, parse=parse)
+
+        queue.put(('a', make_chunk(1), 'pos1'), 1)
+        queue.close()
+        processor.run()
+
+        self.assertEqual([False, True], held)
+
+    def test_replace_pool_while_computing(self):
+        lock = threading.Lock()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        class FakePool(object):
+            def __init__(self, name):
+                self.name = name
+
+            def compute(self, chunks):
+                list(chunks)
+                started.set()
+                release.wait(5)
+                return []
+
+            def process(self, collectors, chunks):
+                calls.append((self.name, 'process', len(list(chunks))))
+
+            def close(self):
+                calls.append((self.name, 'close'))
+        queue = pipeline.BoundedQueue(4)
+        processor = pipeline.Processor([], queue, lock, FakePool('old'))
+        processor.start()
+
+        queue.put(('a', make_chunk(1), 'pos1'), 1)
+        started.wait(5)
+        with lock:
+            processor.replace_pool(FakePool('new'))
+        closed_early = list(calls)
+        release.set()
+        queue.close()
+        processor.join(5)
+
+        self.assertEqual([], closed_early)
+        self.assertEqual([('new', 'process', 1), ('old', 'close')], calls)
+        self.assertEqual({'a': 'pos1'}, processor.positions)
+
+    def test_replace_idle_pool(self):
+        closed = []
+        pool = type('Fpool', (object,), {})()
+        pool.close = lambda: closed.append(pool)
+        processor = pipeline.Processor([], pipeline.BoundedQueue(4),
+                                       threading.Lock(), pool)
+
+        processor.replace_pool(None)
+
+        self.assertEqual([pool], closed)
+        self.assertIsNone(processor.pool)
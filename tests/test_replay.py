@@ -0,0 +1,198 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+try:
+    import ConfigParser
+except ImportError:
+    import configparser as ConfigParser
+import bz2
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+import logretriever.collectors as collectors
+import logretriever.replay as replay
+import logretriever.utils as utils
+
+
+def make_log(seconds):
+    """ Makes a log with i + 1 lines logged at i-th second of seconds."""
+    return b''.join(
+        b'127.0.0.1 - user%d [01/Jul/2000:00:00:%02d +0000] '
+        b'"GET /s%d/x HTTP/1.0" 200 100\n' % (i % 3, s, i % 5)
+        for s in seconds for i in range(s + 1))
+
+
+class FakeDisplay(object):
+
+    def __init__(self, collectors):
+        self.collectors = collectors
+        self.count = 0
+        self.shown = []
+
+    def tick(self):
+        self.count += 1
+        if self.count == 2:
+            self.count = 0
+            self.show_stats()
+        for c in self.collectors:
+            c.tick()
+
+    def set_clock(self, clock):
+        pass
+
+    def show_stats(self):
+        self.shown.append([c.get_stats() for c in self.collectors])
+
+
+class TestReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.fname = os.path.join(self.tmpdir, 'access.log')
+        self.config = ConfigParser.RawConfigParser()
+        for option, value in (('collectors', 'SimpleCollector, '
+                               'SectionCollector, UserCollector'),
+                              ('statistics_interval', '2'),
+                              ('alarm_interval', '2'),
+                              ('alarm_threshold', '5'),
+                              ('ignore_missing_bits', 'False')):
+            self.config.set('DEFAULT', option, value)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, data):
+        with open(self.fname, 'wb') as f:
+            f.write(data)
+
+    def test_expand_rotated_in_order(self):
+        for name in ('access.log', 'access.log.1', 'access.log.2.gz',
+                     'access.log.10.gz', 'error.log'):
+            open(os.path.join(self.tmpdir, name), 'wb').close()
+        expected = [os.path.join(self.tmpdir, x)
+                    for x in ('access.log.10.gz', 'access.log.2.gz',
+                              'access.log.1', 'access.log', 'error.log')]
+
+        actual = replay.expand([os.path.join(self.tmpdir, '*.log*')])
+
+        self.assertEqual(expected, actual)
+
+    def test_split_file(self):
+        self.write(b'foo\nbar\nbazquux\n\nx')
+
+        ranges = replay.split_file(self.fname, 3)
+
+        self.assertEqual([(0, 8), (8, 16), (16, 18)], ranges)
+
+    def test_split_file_at_newline(self):
+        self.write(b'foo\nbar\n')
+
+        self.assertEqual([(0, 4), (4, 8)], replay.split_file(self.fname, 2))
+
+    def test_split_file_max_size(self):
+        self.write(b'foo\n' * 4)
+
+        self.assertEqual(4, len(replay.split_file(self.fname, 1, 4)))
+
+    def test_read_range(self):
+        self.write(b'foo\nbarbaz\nquux\nx')
+
+        self.assertEqual([b'foo\n', b'barbaz\n', b'quux\n'],
+                         list(replay.read_range(self.fname, 0, 16, 5)))
+        self.assertEqual([b'quux\n', b'x'],
+                         list(replay.read_range(self.fname, 11, 17, 100)))
+
+    def test_replay_archives(self):
+        data = make_log([0, 1, 2, 5])
+        self.write(data)
+        expected_cols = utils.load(self.config, 'collectors', collectors)
+        expected = FakeDisplay(expected_cols)
+        replay.replay(self.config, expected_cols, expected, [self.fname])
+        fnames = []
+        for ext, compress in (('.gz', gzip.open), ('.bz2', bz2.BZ2File)):
+            fnames.append(self.fname + ext)
+            with compress(fnames[-1], 'wb') as f:
+                f.write(data)
+
+        for fname in fnames:
+            for workers in (0, 2):
+                cols = utils.load(self.config, 'collectors', collectors)
+                actual = FakeDisplay(cols)
+                replay.replay(self.config, cols, actual, [fname], workers)
+                self.assertEqual(expected.shown, actual.shown)
+
+    def test_iter_seconds(self):
+        parse = utils.make_parser(['date'])
+
+        result = list(replay.iter_seconds([make_log([0, 1]), make_log([1])],
+                                          parse))
+
+        self.assertEqual([962409600, 962409601, 962409601],
+                         [s for s, _ in result])
+        self.assertEqual([1, 2, 2], [len(x) for _, x in result])
+
+    def test_advance(self):
+        display = FakeDisplay([])
+        clock = replay.Replay(display, [])
+
+        clock.advance(None)
+        clock.advance(100)
+        clock.advance(103)
+        clock.advance(101)
+        self.assertEqual(103, clock.clock())
+        self.assertEqual(1, len(display.shown))
+
+        clock.finish()
+        self.assertEqual(2, len(display.shown))
+
+    def test_replay(self):
+        self.write(make_log([0, 1, 2, 5]))
+        cols = utils.load(self.config, 'collectors', collectors)
+        display = FakeDisplay(cols)
+
+        replay.replay(self.config, cols, display, [self.fname])
+
+        # Stats are shown every other second: before pulses completing the
+        # 1st and 3rd seconds of the log and once the log is over.
+        self.assertEqual(['Hit rate: 0', 'Hit rate: 2', 'Hit rate: 3'],
+                         [x[0] for x in display.shown])
+
+    def test_replay_last_screen(self):
+        self.write(b''.join(
+            b'127.0.0.1 - user1 [01/Jul/2000:00:00:%02d +0000] '
+            b'"GET /%s/x HTTP/1.0" 200 100\n' % (i, s)
+            for i, s in enumerate([b'a', b'a', b'b'])))
+        cols = utils.load(self.config, 'collectors', collectors)
+        display = FakeDisplay(cols)
+
+        replay.replay(self.config, cols, display, [self.fname])
+
+        self.assertEqual(2, len(display.shown))
+        self.assertEqual(['Hit rate: 1', '2 most hit sections are: b 1, - -',
+                          'Most active user: user1'], display.shown[-1])
+
+    def test_replay_workers_same_as_single_process(self):
+        self.write(make_log(range(40)))
+        expected_cols = utils.load(self.config, 'collectors', collectors)
+        expected = FakeDisplay(expected_cols)
+        actual_cols = utils.load(self.config, 'collectors', collectors)
+        actual = FakeDisplay(actual_cols)
+        replay.replay(self.config, expected_cols, expected, [self.fname])
+
+        replay.MAX_RANGE_SIZE, old = 1000, replay.MAX_RANGE_SIZE
+        try:
+            replay.replay(self.config, actual_cols, actual, [self.fname], 2)
+        finally:
+            replay.MAX_RANGE_SIZE = old
+
+        self.assertEqual(expected.shown, actual.shown)
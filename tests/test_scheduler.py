@@ -0,0 +1,50 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+import unittest
+
+import logretriever.scheduler as scheduler
+
+
+class TestTicker(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 100.0
+        self.ticker = scheduler.Ticker(1, clock=lambda: self.now)
+
+    def test_not_due(self):
+        self.now = 100.5
+
+        self.assertEqual(0, self.ticker.due())
+        self.assertEqual(0.5, self.ticker.timeout())
+
+    def test_due(self):
+        self.now = 101.2
+
+        self.assertEqual(1, self.ticker.due())
+        self.assertEqual(0, self.ticker.due())
+        self.assertAlmostEqual(0.8, self.ticker.timeout())
+
+    def test_no_drift(self):
+        for i in range(1, 1001):
+            self.now = 100 + i + 0.3
+            self.ticker.due()
+
+        self.assertEqual(1000, self.ticker.ticks)
+        self.assertEqual(1101, self.ticker.next_deadline)
+
+    def test_catch_up(self):
+        self.now = 103.5
+
+        self.assertEqual(3, self.ticker.due())
+        self.assertEqual(0.5, self.ticker.timeout())
+        self.now = 104
+
+        self.assertEqual(1, self.ticker.due())
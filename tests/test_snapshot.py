@@ -0,0 +1,174 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+try:
+    import ConfigParser
+except ImportError:
+    import configparser as ConfigParser
+import os
+import shutil
+import tempfile
+import unittest
+
+import logretriever.collectors as collectors
+import logretriever.snapshot as snapshot
+import logretriever.utils as utils
+
+
+NOW = 962409600  # 01/Jul/2000:00:00:00 +0000
+
+line = (b'10.0.0.%d - user%d [01/Jul/2000:00:00:00 +0000] '
+        b'"GET /s%d/x HTTP/1.0" %d %d\n')
+log = b''.join(line % (i % 7, i % 3, i % 5, (200, 404, 500)[i % 3], i * 10)
+               for i in range(100))
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.fname = os.path.join(self.tmpdir, 'snapshot')
+        self.config = ConfigParser.RawConfigParser()
+        for option, value in (('collectors', ', '.join(collectors.__all__)),
+                              ('statistics_interval', '3'),
+                              ('alarm_interval', '4'),
+                              ('alarm_threshold', '10'),
+                              ('log_file', '/tmp/access.log'),
+                              ('ignore_missing_bits', 'False')):
+            self.config.set('DEFAULT', option, value)
+        self.config.add_section('SectionCollector')
+        self.config.set('SectionCollector', 'section_window', '5')
+        self.alarms = []
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def make_collectors(self):
+        out = utils.load(self.config, 'collectors', collectors)
+        for c in out:
+            c.set_clock(lambda: NOW)
+            c.set_alarm_callback(self.alarms.append)
+        return out
+
+    def feed(self, collectors, ticks=2):
+        data = utils.parse_chunk(log)
+        for _ in range(ticks):
+            for c in collectors:
+                c.process_batch(data)
+                c.tick()
+        for c in collectors:
+            c.process_batch(data)
+
+    def test_roundtrip(self):
+        old = self.make_collectors()
+        self.feed(old)
+        snapshot.save(self.fname, self.config, old, lambda: NOW)
+        new = self.make_collectors()
+
+        restored = snapshot.restore(self.fname, self.config, new, 10,
+                                    lambda: NOW)
+
+        self.assertEqual(new, restored)
+        for c in old + new:
+            c.tick()
+        self.assertEqual([c.get_stats() for c in old],
+                         [c.get_stats() for c in new])
+        self.assertEqual([c.get_metrics() for c in old],
+                         [c.get_metrics() for c in new])
+
+    def test_downtime_is_ticked(self):
+        old = self.make_collectors()
+        self.feed(old, 3)
+        snapshot.save(self.fname, self.config, old, lambda: NOW)
+        new = self.make_collectors()
+
+        snapshot.restore(self.fname, self.config, new, 10, lambda: NOW + 2.5)
+
+        for _ in range(2):
+            for c in old:
+                c.tick()
+        self.assertEqual([c.get_stats() for c in old],
+                         [c.get_stats() for c in new])
+
+    def test_alarm_survives_restart(self):
+        self.config.set('DEFAULT', 'alarm_threshold', '50')
+        old = self.make_collectors()
+        self.feed(old)
+        snapshot.save(self.fname, self.config, old, lambda: NOW)
+        self.alarms = []
+        new = self.make_collectors()
+        snapshot.restore(self.fname, self.config, new, 10, lambda: NOW)
+
+        new[0].tick()
+
+        self.assertTrue(new[0].alarm_is_on)
+        self.assertEqual([], self.alarms)
+
+    def test_too_old(self):
+        old = self.make_collectors()
+        self.feed(old)
+        snapshot.save(self.fname, self.config, old, lambda: NOW)
+        new = self.make_collectors()
+
+        self.assertEqual([], snapshot.restore(self.fname, self.config, new,
+                                              10, lambda: NOW + 11))
+        self.assertEqual([], snapshot.restore(self.fname, self.config, new,
+                                              10, lambda: NOW - 1))
+        self.assertEqual(0, new[0].alarm_window.total)
+
+    def test_changed_settings(self):
+        old = self.make_collectors()
+        self.feed(old)
+        snapshot.save(self.fname, self.config, old, lambda: NOW)
+        self.config.set('SectionCollector', 'section_window', '6')
+        self.config.set('DEFAULT', 'log_file', '/tmp/other.log')
+        new = self.make_collectors()
+
+        restored = snapshot.restore(self.fname, self.config, new, 10,
+                                    lambda: NOW)
+
+        self.assertEqual(['SimpleCollector', 'UserCollector'],
+                         [c.__class__.__name__ for c in restored][:2])
+        self.assertNotIn('SectionCollector',
+                         [c.__class__.__name__ for c in restored])
+
+    def test_state_version(self):
+        old = self.make_collectors()[:1]
+        self.feed(old)
+        snapshot.save(self.fname, self.config, old, lambda: NOW)
+        new = self.make_collectors()[:1]
+        new[0].state_version = 2
+
+        self.assertEqual([], snapshot.restore(self.fname, self.config, new,
+                                              10, lambda: NOW))
+
+    def test_event_time(self):
+        self.config.set('DEFAULT', 'time_mode', 'event')
+        old = self.make_collectors()[:1]
+        self.feed(old)
+        snapshot.save(self.fname, self.config, old, lambda: NOW)
+        new = self.make_collectors()[:1]
+        snapshot.restore(self.fname, self.config, new, 10, lambda: NOW)
+
+        self.assertEqual(old[0].event_window.buckets,
+                         new[0].event_window.buckets)
+        self.assertEqual(NOW, new[0].event_window.clock())
+
+    def test_unreadable(self):
+        new = self.make_collectors()
+        self.assertEqual([], snapshot.restore(self.fname, self.config, new,
+                                              10, lambda: NOW))
+        for data in (b'', b'LRSS', b'XXXX' + b'\0' * 20,
+                     snapshot.header.pack(snapshot.MAGIC, snapshot.VERSION,
+                                          NOW) + b'garbage'):
+            with open(self.fname, 'wb') as f:
+                f.write(data)
+            self.assertEqual([], snapshot.restore(self.fname, self.config,
+                                                  new, 10, lambda: NOW))
@@ -0,0 +1,184 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+# NOTE(aovchinnikov): the try-block below ensures interoperability between
+# Py2 and Py3.
+try:
+    import StringIO
+except ImportError:
+    import io as StringIO
+
+import logretriever.query as query
+import logretriever.store as store
+
+
+DAY = 1562025600  # 2019-07-02 00:00:00 UTC
+
+
+class TestStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = store.Store(self.tmpdir, top_k=2, name_size=4)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tmpdir)
+
+    def fill(self, start, count, step=3):
+        for i in range(count):
+            self.store.write(start + i * step, step, i,
+                             [('foo', i), ('sections', 1), ('bar', 1)])
+
+    def segment(self, timestamp=DAY):
+        return store.Segment(os.path.join(self.tmpdir,
+                                          store.segment_name(timestamp)))
+
+    def test_roundtrip(self):
+        self.fill(DAY, 2)
+        self.store.close()
+        segment = self.segment()
+
+        self.assertEqual(2, len(segment))
+        self.assertEqual((DAY + 3, 3, 1, [('foo', 1), ('sect', 1)]),
+                         segment[1])
+        self.assertEqual((DAY, 3, 0, [('sect', 1)]), segment[0])
+        segment.close()
+
+    def test_record_is_fixed_width(self):
+        self.fill(DAY, 10)
+        self.store.close()
+        record_size = store.record_struct(2, 4).size
+
+        size = os.path.getsize(os.path.join(self.tmpdir,
+                                            store.segment_name(DAY)))
+
+        self.assertEqual(store.header.size + 10 * record_size +
+                         store.index_entry.size + store.trailer.size, size)
+
+    def test_bisect(self):
+        self.fill(DAY, 1000)
+        self.store.close()
+        segment = self.segment()
+
+        self.assertEqual(0, segment.bisect(0))
+        self.assertEqual(300, segment.bisect(DAY + 900))
+        self.assertEqual(301, segment.bisect(DAY + 901))
+        self.assertEqual(1000, segment.bisect(DAY + 86400))
+        self.assertEqual(4, len(segment.index))
+        segment.close()
+
+    def test_open_segment_without_footer(self):
+        self.fill(DAY, 10)
+        with open(self.store.fname, 'ab') as f:
+            f.write(b'\0' * 5)  # A record cut short.
+        segment = self.segment()
+
+        self.assertEqual(10, len(segment))
+        self.assertEqual(5, segment.bisect(DAY + 15))
+        segment.close()
+
+    def test_footer_cut_short(self):
+        self.fill(DAY, 1000)
+        fname = self.store.fname
+        self.store.close()
+        with open(fname, 'r+b') as f:
+            f.truncate(os.path.getsize(fname) - store.trailer.size)
+        segment = self.segment()
+
+        self.assertEqual(1000, len(segment))
+        self.assertEqual(DAY + 2997, segment.timestamp(999))
+        segment.close()
+        self.store = store.Store(self.tmpdir, top_k=2, name_size=4)
+        self.fill(DAY + 3000, 1)
+        self.store.close()
+        segment = self.segment()
+
+        self.assertEqual(1001, len(segment))
+        self.assertEqual(DAY + 3000, segment.timestamp(1000))
+        segment.close()
+
+    def test_reopen(self):
+        self.fill(DAY, 3)
+        self.store.close()
+        self.store = store.Store(self.tmpdir, top_k=2, name_size=4)
+
+        self.fill(DAY + 9, 2)
+        self.store.close()
+        segment = self.segment()
+
+        self.assertEqual([DAY, DAY + 3, DAY + 6, DAY + 9, DAY + 12],
+                         [segment.timestamp(i) for i in range(len(segment))])
+        segment.close()
+
+    def test_reopen_different_layout(self):
+        self.fill(DAY, 1)
+        self.store.close()
+        self.store = store.Store(self.tmpdir, top_k=3, name_size=4)
+
+        self.assertRaises(ValueError, self.fill, DAY + 3, 1)
+
+    def test_query_across_days(self):
+        self.fill(DAY - 6, 4)
+
+        actual = [x[0] for x in store.query(self.tmpdir, DAY - 3, DAY + 4)]
+
+        self.assertEqual([DAY - 3, DAY, DAY + 3], actual)
+        self.assertEqual(2, len(os.listdir(self.tmpdir)))
+
+    def test_sink(self):
+        collector = type('Fake', (object,), {})()
+        collector.get_metrics = lambda top_k: {'hits': 5,
+                                               'sections': [('foo', 5)]}
+        sink = store.StoreSink(self.tmpdir)
+
+        sink.write(DAY, 3, [collector])
+        sink.close()
+
+        self.assertEqual([(DAY, 3, 5, [('foo', 5)])],
+                         list(store.query(self.tmpdir, DAY, DAY + 1)))
+
+
+class TestQuery(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.old_stdout = sys.stdout
+        sys.stdout = self.new_stdout = StringIO.StringIO()
+
+    def tearDown(self):
+        sys.stdout = self.old_stdout
+        shutil.rmtree(self.tmpdir)
+
+    def test_parse_time(self):
+        self.assertEqual(DAY, query.parse_time(str(DAY)))
+        self.assertEqual(DAY, query.parse_time('2019-07-02'))
+        self.assertEqual(DAY + 61, query.parse_time('2019-07-02T00:01:01'))
+
+    def test_main(self):
+        s = store.Store(self.tmpdir)
+        s.write(DAY, 2, 10, [('foo', 6), ('bar', 4)])
+        s.write(DAY + 2, 2, 6, [('bar', 6)])
+        s.write(DAY + 4, 2, 100, [('baz', 100)])
+        s.close()
+
+        result = query.main(['--store_dir', self.tmpdir, '--from', str(DAY),
+                             '--to', str(DAY + 4), '--top', '1'])
+
+        self.assertEqual(0, result)
+        self.assertEqual(
+            "Between 2019-07-02 00:00:00 and 2019-07-02 00:00:04 (2 intervals"
+            " saved):\nHits: 16, hit rate: 4.00 per second\n"
+            "1 most hit sections: bar 10\n", self.new_stdout.getvalue())
@@ -0,0 +1,243 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+try:
+    import StringIO
+except ImportError:
+    import io as StringIO
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import logretriever.tail as tail
+
+
+class TestFileTail(unittest.TestCase):
+
+    def setUp(self):
+        self.old_stderr = sys.stderr
+        sys.stderr = self.new_stderr = StringIO.StringIO()
+        self.tmpdir = tempfile.mkdtemp()
+        self.fname = os.path.join(self.tmpdir, 'access.log')
+        self.write(b'historic\n')
+
+    def tearDown(self):
+        sys.stderr = self.old_stderr
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, data, mode='ab'):
+        with open(self.fname, mode) as f:
+            f.write(data)
+
+    def test_ignores_historic_data(self):
+        with tail.FileTail(self.fname) as t:
+            actual = bytes(t.read_chunk())
+
+        self.assertEqual(b'', actual)
+
+    def test_read_chunk_partial(self):
+        with tail.FileTail(self.fname) as t:
+            self.write(b'foo\nbar\nba')
+            actual1 = bytes(t.read_chunk())
+            self.write(b'z\n')
+            actual2 = bytes(t.read_chunk())
+
+        self.assertEqual(b'foo\nbar\n', actual1)
+        self.assertEqual(b'baz\n', actual2)
+
+    def test_read_chunks_bounded(self):
+        with tail.FileTail(self.fname, buffer_size=8) as t:
+            self.write(b'foo\nbar\nbaz\nquux\n')
+            actual = [bytes(x) for x in t.read_chunks()]
+
+        self.assertEqual([b'foo\nbar\n', b'baz\n', b'quux\n'], actual)
+        self.assertTrue(all(len(x) <= 8 for x in actual))
+
+    def test_read_chunk_truncated(self):
+        with tail.FileTail(self.fname) as t:
+            self.write(b'foo\n', mode='wb')
+            actual = bytes(t.read_chunk())
+
+        self.assertEqual(b'foo\n', actual)
+
+    def test_overlong_line_discarded(self):
+        with tail.FileTail(self.fname, buffer_size=4) as t:
+            self.write(b'foobarbaz\nqux\n')
+            actual = [bytes(x) for x in t.read_chunks()]
+
+        self.assertEqual([b'qux\n'], actual)
+        self.assertTrue('WARNING' in self.new_stderr.getvalue())
+
+    def test_lines(self):
+        with tail.FileTail(self.fname) as t:
+            self.write(b'foo\n\nbar\n')
+            actual = [bytes(x) for x in t.lines()]
+
+        self.assertEqual([b'foo', b'', b'bar'], actual)
+
+    def test_offset(self):
+        with tail.FileTail(self.fname) as t:
+            self.write(b'foo\nba')
+            t.read_chunk()
+
+            self.assertEqual(13, t.offset)
+
+    def test_rotation_drains_old_file(self):
+        with tail.FileTail(self.fname) as t:
+            self.write(b'foo\n')
+            os.rename(self.fname, self.fname + '.1')
+            with open(self.fname + '.1', 'ab') as f:
+                f.write(b'bar\n')
+            self.write(b'baz\n', mode='wb')
+            actual = b''.join(bytes(x) for x in t.read_chunks())
+
+        self.assertEqual(b'foo\nbar\nbaz\n', actual)
+
+    def test_rotation_new_file_missing(self):
+        with tail.FileTail(self.fname) as t:
+            os.rename(self.fname, self.fname + '.1')
+            with open(self.fname + '.1', 'ab') as f:
+                f.write(b'foo\n')
+            actual = b''.join(bytes(x) for x in t.read_chunks())
+
+        self.assertEqual(b'foo\n', actual)
+
+    def test_resume_position(self):
+        with tail.FileTail(self.fname) as t:
+            self.write(b'foo\n')
+            t.read_chunk()
+            position = t.position
+        self.write(b'bar\n')
+
+        with tail.FileTail(self.fname, position=position) as t:
+            actual = bytes(t.read_chunk())
+
+        self.assertEqual(b'bar\n', actual)
+
+    def test_resume_position_rotated(self):
+        with tail.FileTail(self.fname) as t:
+            position = t.position
+        self.write(b'foo\n')
+        os.rename(self.fname, self.fname + '.1')
+        self.write(b'bar\n', mode='wb')
+
+        with tail.FileTail(self.fname, position=position) as t:
+            actual = b''.join(bytes(x) for x in t.read_chunks())
+
+        self.assertEqual(b'foo\nbar\n', actual)
+
+    def test_resume_position_unknown_file(self):
+        position = {'ident': [0, 0], 'offset': 0}
+
+        with tail.FileTail(self.fname, position=position) as t:
+            actual = bytes(t.read_chunk())
+
+        self.assertEqual(b'', actual)
+
+    def test_save_load_positions(self):
+        state = os.path.join(self.tmpdir, 'state')
+        with tail.FileTail(self.fname) as t:
+            tail.save_positions(state, {t.fname: t.position})
+            expected = {self.fname: t.position}
+
+        actual = tail.load_positions(state)
+
+        self.assertEqual(expected, actual)
+
+    def test_load_positions_missing(self):
+        actual = tail.load_positions(os.path.join(self.tmpdir, 'nope'))
+
+        self.assertEqual({}, actual)
+
+
+class TestMultiTail(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.write('a.log', b'historic\n')
+        self.write('b.log', b'historic\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def path(self, name):
+        return os.path.join(self.tmpdir, name)
+
+    def write(self, name, data, mode='ab'):
+        with open(self.path(name), mode) as f:
+            f.write(data)
+
+    def test_glob(self):
+        with tail.MultiTail([self.path('*.log')]) as t:
+            self.write('a.log', b'foo\n')
+            self.write('b.log', b'bar\n')
+            actual = [(x, bytes(y)) for x, y in t.read_chunks()]
+
+        self.assertEqual([(self.path('a.log'), b'foo\n'),
+                          (self.path('b.log'), b'bar\n')], actual)
+
+    def test_glob_skips_archives(self):
+        self.write('c.log.gz', b'')
+
+        with tail.MultiTail([self.path('*.log*')]) as t:
+            self.assertEqual([self.path('a.log'), self.path('b.log')],
+                             t.fnames)
+
+    def test_plain_paths(self):
+        with tail.MultiTail([self.path('b.log'), self.path('c.log')]) as t:
+            self.assertEqual([self.path('b.log')], t.fnames)
+
+    def test_rescan_new_file(self):
+        with tail.MultiTail([self.path('*.log')]) as t:
+            self.write('c.log', b'foo\n')
+            added = t.rescan()
+            actual = [(x, bytes(y)) for x, y in t.read_chunks()]
+
+        self.assertEqual([self.path('c.log')], added)
+        self.assertEqual([(self.path('c.log'), b'foo\n')], actual)
+
+    def test_rescan_skips_rotated(self):
+        with tail.MultiTail([self.path('*')]) as t:
+            os.rename(self.path('a.log'), self.path('a.log.1'))
+            self.write('a.log', b'foo\n')
+            added1 = t.rescan()
+            actual = [(x, bytes(y)) for x, y in t.read_chunks()]
+            added2 = t.rescan()
+
+        self.assertEqual([], added1)
+        self.assertEqual([], added2)
+        self.assertEqual([(self.path('a.log'), b'foo\n')], actual)
+
+    def test_rescan_drops_removed(self):
+        with tail.MultiTail([self.path('*.log')]) as t:
+            ident = t.tails[self.path('a.log')].ident
+            self.write('a.log', b'foo\n')
+            os.remove(self.path('a.log'))
+            added = t.rescan()
+            actual = [(x, bytes(y)) for x, y in t.read_chunks()]
+            t.rescan()
+
+            self.assertEqual([], added)
+            self.assertEqual([(self.path('a.log'), b'foo\n')], actual)
+            self.assertEqual([self.path('b.log')], t.fnames)
+            self.assertNotIn(ident, t.seen)
+
+
+class TestIterLines(unittest.TestCase):
+
+    def test_iter_lines(self):
+        chunk = memoryview(bytearray(b'xxfoo\nbar\n'))[2:]
+        expected = [b'foo', b'bar']
+
+        actual = [bytes(x) for x in tail.iter_lines(chunk)]
+
+        self.assertEqual(expected, actual)
@@ -8,6 +8,10 @@
 # For full license agreement please see:
 # http://creativecommons.org/licenses/by-nc-nd/4.0/
 
+try:
+    import ConfigParser
+except ImportError:
+    import configparser as ConfigParser
 try:
     import StringIO
 except ImportError:
@@ -17,6 +21,7 @@ import types
 import os
 import unittest
 
+import logretriever.collectors as collectors
 import logretriever.utils as utils
 
 
@@ -59,6 +64,97 @@ class TestUtils(unittest.TestCase):
 
         self.assertEqual(expected, actual)
 
+    def test_parse_chunk_ok(self):
+        chunk = ('127.0.0.1 - foo [01/Jul/2000:00:00:00 +0000] '
+                 '"GET /foo HTTP/1.0" 200 100\n'
+                 'spam\n'
+                 '127.0.0.2 - bar [01/Jul/2000:00:00:01 +0000] '
+                 '"POST /bar/baz HTTP/1.1" 404 7\n')
+        expected = [utils.parse_line(x) for x in chunk.split('\n')]
+        expected = [x for x in expected if x is not None]
+
+        actual = utils.parse_chunk(chunk)
+
+        self.assertEqual(2, len(actual))
+        self.assertEqual(expected, actual)
+
+    def test_parse_chunk_source(self):
+        chunk = ('127.0.0.1 - foo [01/Jul/2000:00:00:00 +0000] '
+                 '"GET /foo HTTP/1.0" 200 100\n')
+
+        actual = utils.parse_chunk(chunk, 'access.log')
+
+        self.assertEqual('access.log', actual[0].source)
+
+    def test_parse_chunk_malformed_request(self):
+        chunk = ('127.0.0.1 - foo [01/Jul/2000:00:00:00 +0000] '
+                 '"GET /foo" 200 100\n')
+        expected = []
+
+        actual = utils.parse_chunk(chunk)
+
+        self.assertEqual(expected, actual)
+
+    def test_parse_chunk_binary(self):
+        chunk = memoryview(bytearray(
+            b'127.0.0.1 - foo [01/Jul/2000:00:00:00 +0000] '
+            b'"GET /foo HTTP/1.0" 200 100\n'))
+        expected = [utils.parse_line(bytes(chunk).decode('ascii'))]
+
+        actual = utils.parse_chunk(chunk)
+
+        self.assertEqual(expected, actual)
+
+    def test_make_chunk_pattern_all(self):
+        actual = utils.make_chunk_pattern(utils.group_fields)
+
+        self.assertEqual(utils.chunk_ptr.pattern, actual.pattern)
+
+    def test_make_parser_all(self):
+        self.assertEqual(utils.parse_chunk, utils.make_parser())
+        self.assertEqual(utils.parse_chunk,
+                         utils.make_parser(utils.all_fields))
+
+    def test_make_parser_projected(self):
+        chunk = ('127.0.0.1 - foo [01/Jul/2000:00:00:00 +0000] '
+                 '"GET /foo HTTP/1.0" 200 100\n'
+                 '127.0.0.1 - foo [01/Jul/2000:00:00:00 +0000] '
+                 '"GET /foo" 200 100\n')
+        expected = [utils.log_line(
+            None, None, 'foo', None, utils.request_line(None, '/foo', None),
+            None, '100', 'access.log')]
+        parse = utils.make_parser(['userid', 'path', 'size'])
+
+        actual1 = parse(chunk, 'access.log')
+        actual2 = parse(memoryview(chunk.encode('ascii')), 'access.log')
+
+        self.assertEqual(expected, actual1)
+        self.assertEqual(expected, actual2)
+
+    def test_make_parser_nothing(self):
+        chunk = ('127.0.0.1 - foo [01/Jul/2000:00:00:00 +0000] '
+                 '"GET /foo HTTP/1.0" 200 100\nspam\n')
+        expected = [utils.log_line(None, None, None, None, None, None, None)]
+
+        actual = utils.make_parser([])(chunk)
+
+        self.assertEqual(expected, actual)
+
+    def test_make_parser_unknown(self):
+        with self.assertRaises(ValueError):
+            utils.make_parser(['spam'])
+
+    def test_read_fresh_chunk_partial(self):
+        data_in = 'spam\nfoo\nbar\nbaz'
+        fakefile = StringIO.StringIO(data_in)
+        expected = 'foo\nbar\n'
+
+        fakefile.seek(5)
+        actual = utils.read_fresh_chunk(fakefile)
+
+        self.assertEqual(expected, actual)
+        self.assertEqual(13, fakefile.tell())
+
     def test_get_fresh_events_ok(self):
         data_in = 'spam\nfoo\nbar\n'
         fakefile = StringIO.StringIO(data_in)
@@ -151,6 +247,48 @@ class TestUtils(unittest.TestCase):
         self.assertEqual(expected_stderr, self.new_stderr.getvalue())
         self.assertEqual(expected, actual)
 
+    def test_get_option(self):
+        has_option = lambda self, _, x: x == 'foo'
+        getint = lambda self, *x: 42
+        fake_config = type('Fcon', (object,), {})
+        fake_config.has_option = types.MethodType(has_option, fake_config)
+        fake_config.getint = types.MethodType(getint, fake_config)
+
+        self.assertEqual(42, utils.get_option(fake_config, 'S', 'foo', 1))
+        self.assertEqual(1, utils.get_option(fake_config, 'S', 'bar', 1))
+
+    def test_parse_clf_date(self):
+        self.assertEqual(962409600,
+                         utils.parse_clf_date('01/Jul/2000:00:00:00 +0000'))
+        self.assertEqual(962409600,
+                         utils.parse_clf_date('01/Jul/2000:02:00:00 +0200'))
+        self.assertEqual(962416800,
+                         utils.parse_clf_date('30/Jun/2000:23:00:00 -0300'))
+
+    def test_parse_clf_date_bad(self):
+        self.assertIsNone(utils.parse_clf_date('01/Jul/2000'))
+        self.assertIsNone(utils.parse_clf_date('01/Foo/2000:00:00:00 +0000'))
+        self.assertIsNone(utils.parse_clf_date('01-Jul-2000:00:00:00 +0000'))
+
+    def test_date_parser_cache(self):
+        parser = utils.DateParser()
+        first = parser('01/Jul/2000:00:00:00 +0000')
+        parser._parse = None  # Must not be called for a repeated date.
+
+        self.assertEqual(first, parser('01/Jul/2000:00:00:00 +0000'))
+
+    def test_update_config_from_cli_arguments(self):
+        options = {}
+        setopt = lambda self, _, x, y: options.update({x: y})
+        fake_config = type('Fcon', (object,), {})
+        fake_config.set = types.MethodType(setopt, fake_config)
+        arguments = type('Args', (object,), {})()
+        arguments.config, arguments.workers = '/foo/bar.cfg', 2
+
+        utils.update_config_from_cli_arguments(fake_config, arguments)
+
+        self.assertEqual({'workers': '2'}, options)
+
     def test_file_has_problems_notfound(self):
         os.path.isfile = lambda *x: False
         expected_stderr = 'ERROR: File not found: /foo/bar.baz\n'
@@ -177,3 +315,87 @@ class TestUtils(unittest.TestCase):
         result = utils.file_has_problems('/foo/bar.baz')
 
         self.assertFalse(result)
+
+
+class TestReload(unittest.TestCase):
+
+    def setUp(self):
+        self.config = self.make_config()
+        self.collectors = utils.load(self.config, 'collectors', collectors)
+
+    def make_config(self, **overrides):
+        config = ConfigParser.RawConfigParser()
+        options = {'collectors': 'SimpleCollector, SectionCollector,'
+                   ' DistinctCollector', 'statistics_interval': '3',
+                   'alarm_interval': '10', 'alarm_threshold': '5',
+                   'log_file': '/tmp/access.log',
+                   'ignore_missing_bits': 'False'}
+        options.update(overrides)
+        for option, value in options.items():
+            config.set('DEFAULT', option, value)
+        config.add_section('DistinctCollector')
+        config.set('DistinctCollector', 'distinct_fields', 'ip')
+        return config
+
+    def test_collector_settings(self):
+        settings = utils.collector_settings(self.config, 'DistinctCollector')
+
+        self.assertEqual(('alarm_threshold', '5'), settings[1])
+        self.assertIn(('distinct_fields', 'ip'), settings)
+        self.assertNotIn('log_file', dict(settings))
+        self.assertEqual(dict(settings)['statistics_interval'],
+                         dict(utils.collector_settings(self.config,
+                                                       'DEFAULT'))[
+                             'statistics_interval'])
+
+    def test_unchanged(self):
+        config = self.make_config(log_file='/tmp/other.log')
+
+        actual = utils.reload(self.config, config, 'collectors', collectors,
+                              self.collectors)
+
+        self.assertEqual(self.collectors, actual)
+
+    def test_reconfigured(self):
+        config = self.make_config(alarm_threshold='7')
+
+        actual = utils.reload(self.config, config, 'collectors', collectors,
+                              self.collectors)
+
+        self.assertEqual(self.collectors, actual)
+        self.assertEqual(7, actual[0].alarm_threshold)
+
+    def test_replaced(self):
+        config = self.make_config(time_mode='event')
+        config.set('DistinctCollector', 'hll_precision', '10')
+
+        actual = utils.reload(self.config, config, 'collectors', collectors,
+                              self.collectors)
+
+        self.assertIsNot(self.collectors[0], actual[0])
+        self.assertEqual('event', actual[0].time_mode)
+        self.assertIs(self.collectors[1], actual[1])
+        self.assertIsNot(self.collectors[2], actual[2])
+        self.assertEqual(10, actual[2].precision)
+
+    def test_added_removed(self):
+        config = self.make_config(collectors='StatusCollector,'
+                                  ' SimpleCollector')
+
+        actual = utils.reload(self.config, config, 'collectors', collectors,
+                              self.collectors)
+
+        self.assertEqual(['StatusCollector', 'SimpleCollector'],
+                         [c.__class__.__name__ for c in actual])
+        self.assertIs(self.collectors[0], actual[1])
+
+    def test_rejected_keeps_objects_intact(self):
+        config = self.make_config(alarm_threshold='7')
+
+        def check(obj):
+            raise ValueError("rejected")
+
+        with self.assertRaises(ValueError):
+            utils.reload(self.config, config, 'collectors', collectors,
+                         self.collectors, check=check)
+        self.assertEqual(5, self.collectors[0].alarm_threshold)
@@ -0,0 +1,86 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import logretriever.watchers as watchers
+
+
+class TestPollingWatcher(unittest.TestCase):
+
+    def test_wait_interval(self):
+        watcher = watchers.PollingWatcher([], 0.01)
+
+        start = time.time()
+        actual = watcher.wait(10)
+
+        self.assertTrue(actual)
+        self.assertTrue(time.time() - start < 1)
+
+    def test_wake(self):
+        watcher = watchers.PollingWatcher([], 10)
+
+        watcher.wake()
+        start = time.time()
+        watcher.wait(10)
+
+        self.assertTrue(time.time() - start < 1)
+
+
+@unittest.skipIf(watchers._libc is None, "inotify is not available")
+class TestInotifyWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.fname = os.path.join(self.tmpdir, 'access.log')
+        open(self.fname, 'w').close()
+        self.watcher = watchers.InotifyWatcher([self.fname], 10)
+
+    def tearDown(self):
+        self.watcher.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_wait_timeout(self):
+        actual = self.watcher.wait(0.01)
+
+        self.assertFalse(actual)
+
+    def test_wait_modified(self):
+        with open(self.fname, 'a') as f:
+            f.write('foo\n')
+
+        actual = self.watcher.wait(10)
+
+        self.assertTrue(actual)
+
+    def test_wake(self):
+        self.watcher.wake()
+        start = time.time()
+        actual = self.watcher.wait(10)
+
+        self.assertFalse(actual)
+        self.assertTrue(time.time() - start < 1)
+
+    def test_rewatch_after_move(self):
+        os.rename(self.fname, self.fname + '.1')
+        self.watcher.wait(0.01)
+        open(self.fname, 'w').close()
+        self.watcher.wait(0.01)
+
+        with open(self.fname, 'a') as f:
+            f.write('foo\n')
+        actual = self.watcher.wait(10)
+
+        self.assertTrue(actual)
+        self.assertEqual([], self.watcher.unwatched)
@@ -0,0 +1,89 @@
+# (c) 2019 Alexey Ovchinnikov
+#
+# This is an illustrative work intended for demonstration purposes only.
+# Any other use is discouraged.
+#
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-NoDerivatives 4.0 International License.
+# For full license agreement please see:
+# http://creativecommons.org/licenses/by-nc-nd/4.0/
+
+""" A tool to compare throughput of CLF parsers on the same corpus"""
+from __future__ import print_function
+
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+import logretriever.columns as columns  # noqa
+import logretriever.utils as utils  # noqa
+
+
+# Dummy values (kept in line with logfiller.py).
+addresses = ('127.0.0.1', '127.0.0.2', '127.0.0.3', '127.0.0.4',)
+names = ('jamest', 'jannet', 'jennie', 'johndr', 'joshua', 'julia2')
+methods = ('GET', 'PUT', 'POST', 'HEAD')
+sections = ('foo', 'bar', 'baz', 'qux')
+pages = ('spam', 'eggs', 'quux', 'meep', 'flob', 'acme', 'frob', 'yolo')
+responses = ('200', '403', '404', '503')
+
+
+parser = argparse.ArgumentParser(
+    formatter_class=argparse.ArgumentDefaultsHelpFormatter
+)
+parser.add_argument('--lines', type=int, default=100000,
+                    help="Number of log lines in the corpus.")
+parser.add_argument('--repeat', type=int, default=5,
+                    help="Number of timed runs; the best one is reported.")
+parser.add_argument('--seed', type=int, default=42,
+                    help="Seed value for the corpus generator.")
+
+
+def generate_corpus(lines):
+    """ Generates a chunk of fake CLF lines separated by newlines."""
+    out = []
+    for i in range(lines):
+        out.append('%s - %s [01/Jul/2000:00:%02d:%02d +0000] "%s /%s/%s '
+                   'HTTP/1.0" %s %d' % (
+                       random.choice(addresses), random.choice(names),
+                       (i // 60) % 60, i % 60, random.choice(methods),
+                       random.choice(sections), random.choice(pages),
+                       random.choice(responses), random.randint(15, 5000)))
+    return '\n'.join(out) + '\n'
+
+
+def per_line(chunk):
+    return list(filter(None, [utils.parse_line(x) for x in
+                              chunk[:-1].split('\n')]))
+
+
+def main():
+    args = parser.parse_args()
+    random.seed(args.seed)
+    chunk = generate_corpus(args.lines)
+    if (per_line(chunk) != utils.parse_chunk(chunk) or
+            per_line(chunk) != list(columns.parse_chunk(chunk))):
+        sys.stderr.write("ERROR: parsers disagree on the corpus!\n")
+        sys.exit(1)
+    binary = chunk.encode('ascii')
+    # Fields needed by the default set of collectors.
+    fields = ['userid', 'path']
+    for name, func, data in (
+            ('parse_line', per_line, chunk),
+            ('parse_chunk', utils.parse_chunk, chunk),
+            ('parse_chunk (bytes)', utils.parse_chunk, binary),
+            ('projected', utils.make_parser(fields), chunk),
+            ('projected (bytes)', utils.make_parser(fields), binary),
+            ('columns', columns.parse_chunk, chunk),
+            ('columns (bytes)', columns.parse_chunk, binary),
+            ('columns projected', columns.make_parser(fields), binary)):
+        best = min(timeit.repeat(lambda: func(data), number=1,
+                                 repeat=args.repeat))
+        print("%-20s %10d lines/sec" % (name, args.lines / best))
+
+
+if __name__ == "__main__":
+    main()